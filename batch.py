@@ -0,0 +1,84 @@
+import io
+import os
+import glob
+import time
+from functools import partial
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from errorHandler import ErrorHandler
+from interpreter import Interpreter, deepen_stack
+from program import Program
+from programImage import ImageError, is_image, read_image
+from moduleGraph import link_imports
+from budget import Budget
+
+ScriptResult = namedtuple("ScriptResult", "path, status, output, elapsed")
+
+
+def expand_scripts(patterns: list[str]) -> list[str]:
+    scripts = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            scripts.extend(sorted(glob.glob(os.path.join(pattern, "**", "*.hx"),
+                                            recursive=True)))
+        elif glob.has_magic(pattern):
+            scripts.extend(sorted(glob.glob(pattern, recursive=True)))
+        else:
+            scripts.append(pattern)
+    return scripts
+
+
+def run_script(path: str, budget: Budget = None) -> ScriptResult:
+    start = time.perf_counter()
+    output = io.StringIO()
+    error_handler = ErrorHandler(output)
+    try:
+        if is_image(path):
+            # workers running the same image share its mapped pages
+            program = read_image(path)
+        else:
+            with open(path, 'r') as file:
+                program = Program.compile(file.read(), error_handler)
+        # the batch already runs one script per worker process
+        program = link_imports(program, path, error_handler, jobs=1)
+        if program is not None:
+            interpreter = Interpreter(error_handler, output)
+            interpreter.set_budget(budget)
+            try:
+                program.execute(interpreter)
+            finally:
+                interpreter.close_events()
+    except (OSError, UnicodeDecodeError, ImageError) as error:
+        output.write(f"{error}\n")
+        return ScriptResult(path, 1, output.getvalue(), time.perf_counter() - start)
+    except Exception as error:
+        # a failure of the interpreter itself fails this script, not the batch
+        output.write(f"Internal error: {type(error).__name__}: {error}\n")
+        return ScriptResult(path, 1, output.getvalue(), time.perf_counter() - start)
+    status = 1 if error_handler.had_error or error_handler.had_runtime_error else 0
+    return ScriptResult(path, status, output.getvalue(), time.perf_counter() - start)
+
+
+def run_batch(scripts: list[str], jobs: int = None, budget: Budget = None) -> list[ScriptResult]:
+    jobs = jobs or os.cpu_count()
+    # small scripts are handed out a few at a time so workers do not wait on
+    # the parent for every file, large batches still balance across workers
+    chunksize = max(1, min(16, len(scripts) // (jobs * 4)))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=deepen_stack) as executor:
+        return list(executor.map(partial(run_script, budget=budget), scripts,
+                                 chunksize=chunksize))
+
+
+def print_summary(results: list[ScriptResult], elapsed: float):
+    for result in results:
+        print(f"==> {result.path} <==")
+        print(result.output, end="")
+    print()
+    width = max((len(result.path) for result in results), default=0)
+    for result in results:
+        state = "ok" if result.status == 0 else "FAILED"
+        print(f"{result.path:<{width}}  {state:<6}  {result.elapsed * 1000:10.1f} ms")
+    failed = sum(1 for result in results if result.status != 0)
+    total = sum(result.elapsed for result in results)
+    print(f"{len(results)} scripts, {failed} failed, "
+          f"{total:.2f} s script time in {elapsed:.2f} s")
@@ -0,0 +1,532 @@
+import io
+import os
+import sys
+import argparse
+import tempfile
+import time
+import tracemalloc
+from errorHandler import ErrorHandler
+from scanner import Scanner
+from parser import Parser
+from resolver import Resolver
+from runMode import RunMode
+from incremental import Document
+from program import Program
+from interpreter import Interpreter
+from profiler import Profiler
+from budget import Budget
+from snapshot import save_snapshot, load_snapshot
+from programImage import write_image, read_image
+from moduleGraph import ModuleGraph
+from optimizer import Optimizer
+from haxeArray import HaxeArray
+from haxeMap import HaxeMap, IntMap
+from haxeFile import CHUNK_SIZE
+# micro benchmarks for the interpreter, run with: python bench.py <name>
+
+
+def generate_source(lines: int) -> str:
+    source = []
+    for i in range(lines // 5):
+        source.append(f"var v{i} = {i} * 2 + 1;")
+        source.append(f"while (v{i} < {i + 10}) {{")
+        source.append(f"    v{i} = v{i} + 1;")
+        source.append("}")
+        source.append(f"print v{i};")
+    return "\n".join(source) + "\n"
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def bench_reparse(args):
+    source = generate_source(args.lines)
+    handler = ErrorHandler()
+
+    def full_parse(text):
+        return Parser(Scanner(handler, text).scan_tokens(), handler).parse()
+
+    _, full = timed(full_parse, source)
+    document, opened = timed(Document, source)
+    middle = source.index(f"var v{args.lines // 10} =")
+    digit = middle + len(f"var v{args.lines // 10} = ")
+    edits = []
+    for i in range(args.repeat):
+        _, elapsed = timed(document.edit, digit, digit + 1, str(i % 10))
+        edits.append(elapsed)
+    edits.sort()
+    print(f"{args.lines} lines, {len(document.tokens)} tokens")
+    print(f"full scan + parse:      {full * 1000:10.2f} ms")
+    print(f"open document:          {opened * 1000:10.2f} ms")
+    print(f"single character edit:  {edits[len(edits) // 2] * 1000:10.2f} ms "
+          f"(median of {args.repeat}, {document.reparsed} declaration re-parsed)")
+
+
+def bench_fib(args):
+    program = Program.compile(f"""
+function fib(n) {{
+    if (n < 2) return n;
+    return fib(n - 1) + fib(n - 2);
+}}
+print fib({args.n});
+""", ErrorHandler())
+    calls, next_calls = 1, 1
+    for _ in range(args.n):
+        calls, next_calls = next_calls, calls + next_calls + 1
+    result, elapsed = timed(program.run)
+    print(f"fib({args.n}) = {result.output.strip()}: {elapsed * 1000:.1f} ms, "
+          f"{calls / elapsed:,.0f} calls/s")
+
+
+def bench_array(args):
+    values = HaxeArray(range(args.n))
+    boxed = list(range(args.n))
+    packed_size = sys.getsizeof(values.items)
+    boxed_size = sys.getsizeof(boxed) + sum(map(sys.getsizeof, boxed))
+    print(f"{args.n:,} ints: {packed_size / args.n:.1f} bytes each packed, "
+          f"{boxed_size / args.n:.1f} bytes each as a list")
+    native = Program.compile("print values.sum();", ErrorHandler())
+    result, elapsed = timed(native.run, {"values": values})
+    print(f"values.sum() = {result.output.strip()}: {elapsed * 1000:.1f} ms")
+    # the scripted loop is far slower, so it runs on a slice and is scaled up
+    size = min(args.n, 200000)
+    scripted = Program.compile("""
+var total = 0;
+var i = 0;
+var n = values.length;
+while (i < n) {
+    total = total + values[i];
+    i = i + 1;
+}
+print total;
+""", ErrorHandler())
+    _, loop = timed(scripted.run, {"values": HaxeArray(range(size))})
+    loop = loop * args.n / size
+    print(f"scripted while loop:    {loop * 1000:.1f} ms (estimated from {size:,}), "
+          f"{loop / elapsed:.0f}x slower")
+
+
+def bench_map(args):
+    keys = HaxeArray(range(args.n))
+    for kind in (HaxeMap, IntMap):
+        inserts = Program.compile("map.setAll(keys, keys);", ErrorHandler())
+        bulk = kind()
+        _, inserted = timed(inserts.run, {"map": bulk, "keys": keys})
+        lookups = Program.compile("""
+var i = 0;
+var total = 0;
+while (i < n) {
+    total = total + map[i];
+    i = i + 1;
+}
+print total;
+""", ErrorHandler())
+        result, looked_up = timed(lookups.run, {"map": bulk, "n": args.n})
+        scripted = Program.compile("""
+var i = 0;
+while (i < n) {
+    map[i] = i;
+    i = i + 1;
+}
+""", ErrorHandler())
+        _, stored = timed(scripted.run, {"map": kind(), "n": args.n})
+        print(f"{kind.name}: {args.n:,} keys")
+        print(f"  setAll:           {inserted * 1000:10.1f} ms")
+        print(f"  scripted inserts: {stored * 1000:10.1f} ms")
+        print(f"  scripted lookups: {looked_up * 1000:10.1f} ms "
+              f"(sum {result.output.strip()})")
+
+
+def bench_lines(args):
+    line = "2024-01-01T00:00:00 INFO request served in 12 ms from 10.0.0.1\n"
+    block = line * (CHUNK_SIZE // len(line))
+    with tempfile.NamedTemporaryFile("w", suffix=".log", delete=False) as file:
+        for _ in range(args.mb * (1 << 20) // len(block)):
+            file.write(block)
+        path = file.name
+    try:
+        def plain_loop():
+            count = 0
+            with open(path) as file:
+                for _ in file:
+                    count += 1
+            return count
+
+        count, plain = timed(plain_loop)
+        program = Program.compile("""
+var input = sys.io.File.read(path);
+var count = 0;
+var lines = input.readLines(100000);
+while (lines.length > 0) {
+    count = count + lines.length;
+    lines = input.readLines(100000);
+}
+input.close();
+print count;
+""", ErrorHandler())
+        result, scripted = timed(program.run, {"path": path})
+        print(f"{os.path.getsize(path) / (1 << 20):.0f} MB, {count:,} lines")
+        print(f"python for loop:        {plain * 1000:10.1f} ms")
+        print(f"readLines(100000) loop: {scripted * 1000:10.1f} ms "
+              f"({result.output.strip()} lines)")
+    finally:
+        os.unlink(path)
+
+
+def bench_timers(args):
+    program = Program.compile("""
+var fired = 0;
+function fire() { fired = fired + 1; }
+var i = 0;
+while (i < n) {
+    haxe.Timer.delay(fire, 100);
+    i = i + 1;
+}
+""", ErrorHandler())
+    result, elapsed = timed(program.run, {"n": args.n})
+    print(f"{result.globals['fired']:,} of {args.n:,} timers of 100 ms fired "
+          f"in {elapsed * 1000:.1f} ms on one thread")
+
+
+def bench_threads(args):
+    produce = """
+var queue = sys.thread.Deque();
+function producer() {
+    var i = 0;
+    while (i < n) {
+        queue.add(i);
+        i = i + 1;
+    }
+    queue.add(nil);
+}
+var total = 0;
+function consumer() {
+    var item = queue.pop(true);
+    while (item != nil) {
+        total = total + item;
+        item = queue.pop(true);
+    }
+}
+"""
+    sequential = Program.compile(produce + "producer();\nconsumer();\nprint total;",
+                                 ErrorHandler())
+    threaded = Program.compile(produce + """
+var consuming = sys.thread.Thread.create(consumer);
+sys.thread.Thread.create(producer).join();
+consuming.join();
+print total;
+""", ErrorHandler())
+    for name, program in (("one thread", sequential), ("producer + consumer", threaded)):
+        result, elapsed = timed(program.run, {"n": args.n})
+        print(f"{name + ':':<21}{elapsed * 1000:10.1f} ms, {args.n / elapsed:,.0f} items/s "
+              f"(total {result.output.strip()})")
+
+
+def bench_hooks(args):
+    programs = {
+        "fib(20)": Program.compile("""
+function fib(n) {
+    if (n < 2) return n;
+    return fib(n - 1) + fib(n - 2);
+}
+print fib(20);
+""", ErrorHandler()),
+        "generated loops": Program.compile(generate_source(args.lines), ErrorHandler()),
+    }
+
+    def hook(event, token, value):
+        pass
+
+    def run(program, hooked, removed):
+        output = io.StringIO()
+        interpreter = Interpreter(ErrorHandler(output), output)
+        if hooked:
+            interpreter.add_hook(hook)
+            if removed:
+                interpreter.remove_hook(hook)
+        return timed(program.execute, interpreter)[1]
+
+    for name, program in programs.items():
+        plain = min(run(program, False, False) for _ in range(args.repeat))
+        removed = min(run(program, True, True) for _ in range(args.repeat))
+        hooked = min(run(program, True, False) for _ in range(args.repeat))
+        print(f"{name}:")
+        print(f"  no hooks:            {plain * 1000:10.1f} ms")
+        print(f"  hook added, removed: {removed * 1000:10.1f} ms ({removed / plain - 1:+.1%})")
+        print(f"  no-op hook:          {hooked * 1000:10.1f} ms ({hooked / plain - 1:+.1%})")
+
+
+def bench_profile(args):
+    programs = {
+        "fib(20)": Program.compile("""
+function fib(n) {
+    if (n < 2) return n;
+    return fib(n - 1) + fib(n - 2);
+}
+print fib(20);
+""", ErrorHandler()),
+        "generated loops": Program.compile(generate_source(args.lines), ErrorHandler()),
+    }
+    for name, program in programs.items():
+        plain = min(timed(program.run)[1] for _ in range(args.repeat))
+        profiler = Profiler(1 / args.rate)
+        profiler.start()
+        try:
+            runs = [timed(program.run)[1] for _ in range(args.repeat)]
+        finally:
+            profiler.stop()
+        profiled = min(runs)
+        # the time spent in the sampler is steadier than the difference of
+        # two noisy wall clock timings
+        print(f"{name}: {plain * 1000:.1f} ms, {profiled * 1000:.1f} ms sampled at "
+              f"{args.rate} Hz ({profiled / plain - 1:+.1%}, {profiler.samples} samples, "
+              f"{profiler.overhead / sum(runs):.1%} of the run in the sampler, "
+              f"{profiler.overhead / profiler.samples * 1e6:.0f} us each)")
+
+
+def bench_budget(args):
+    programs = {
+        "fib(20)": Program.compile("""
+function fib(n) {
+    if (n < 2) return n;
+    return fib(n - 1) + fib(n - 2);
+}
+print fib(20);
+""", ErrorHandler()),
+        "while loop": Program.compile("""
+var i = 0;
+while (i < 200000) i = i + 1;
+""", ErrorHandler()),
+    }
+
+    def run(program, budget):
+        output = io.StringIO()
+        interpreter = Interpreter(ErrorHandler(output), output)
+        interpreter.set_budget(budget)
+        return timed(program.execute, interpreter)[1]
+
+    limited = Budget(max_steps=10 ** 12, max_time=3600, max_depth=10 ** 6)
+    for name, program in programs.items():
+        plain = min(run(program, None) for _ in range(args.repeat))
+        budgeted = min(run(program, limited) for _ in range(args.repeat))
+        print(f"{name}: {plain * 1000:.1f} ms without a budget, {budgeted * 1000:.1f} ms "
+              f"with steps, time and depth limits ({budgeted / plain - 1:+.1%})")
+
+
+def bench_snapshot(args):
+    source = "\n".join(
+        f"var value{i} = {i} * 3;\n"
+        f"function twice{i}(n) {{ if (n < {i}) return n * 2; return twice{i}(n - 1) + value{i}; }}"
+        for i in range(args.definitions)) + "\n"
+
+    def replay():
+        output = io.StringIO()
+        interpreter = Interpreter(ErrorHandler(output), output)
+        Program.compile(source, interpreter.error_handler).execute(interpreter)
+        return interpreter
+
+    interpreter, replayed = timed(replay)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "session.snapshot")
+        _, saved = timed(save_snapshot, interpreter, path)
+        size = os.path.getsize(path)
+        _, restored = timed(load_snapshot, Interpreter(ErrorHandler()), path)
+    print(f"{args.definitions:,} variables and functions, {len(source) / 1024:.0f} KiB of source")
+    print(f"replay source:    {replayed * 1000:10.1f} ms")
+    print(f"save snapshot:    {saved * 1000:10.1f} ms ({size / 1024:.0f} KiB)")
+    print(f"restore snapshot: {restored * 1000:10.1f} ms")
+
+
+def bench_image(args):
+    # a large script of which a run only calls a few functions, the usual
+    # shape of a shared library of helpers
+    source = "\n".join(
+        f"function helper{i}(n) {{ var total = 0; while (n > 0) {{ total = total + n * {i}; n = n - 1; }} return total; }}"
+        for i in range(args.functions)) + "\nprint helper0(10) + helper1(10);\n"
+
+    def run(load, *args):
+        # timed apart from the memory count, which slows allocation down
+        _, elapsed = timed(load, *args)
+        tracemalloc.start()
+        try:
+            output = io.StringIO()
+            program = load(*args)
+            interpreter = Interpreter(ErrorHandler(output), output)
+            program.execute(interpreter)
+            return elapsed, tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+
+    compiled, compiled_memory = run(Program.compile, source, ErrorHandler())
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "program.hxi")
+        _, written = timed(write_image, Program.compile(source, ErrorHandler()), path)
+        size = os.path.getsize(path)
+        mapped, mapped_memory = run(read_image, path)
+    print(f"{args.functions:,} functions, {len(source) / 1024:.0f} KiB of source")
+    print(f"write image:    {written * 1000:10.1f} ms ({size / 1024:.0f} KiB)")
+    print(f"compile source: {compiled * 1000:10.1f} ms, {compiled_memory / 1024:8.0f} KiB retained")
+    print(f"map image:      {mapped * 1000:10.1f} ms, {mapped_memory / 1024:8.0f} KiB retained")
+
+
+def bench_modules(args):
+    # module i imports the two modules before it, the main script imports
+    # the last one, so every module is reached
+    def module_source(i: int, version: int = 0) -> str:
+        source = ["package lib;"]
+        source += [f"import lib.M{j};" for j in (i - 1, i - 2) if j >= 0]
+        for k in range(args.functions):
+            source.append(f"function f{i}_{k}(n) {{ var total = {version}; while (n > 0) {{ "
+                          f"total = total + n * {k}; n = n - 1; }} return total; }}")
+        return "\n".join(source) + "\n"
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.mkdir(os.path.join(directory, "lib"))
+        for i in range(args.modules):
+            with open(os.path.join(directory, "lib", f"M{i}.hx"), 'w') as file:
+                file.write(module_source(i))
+        main = Program.compile(f"import lib.M{args.modules - 1};\n", ErrorHandler())
+
+        def build():
+            graph = ModuleGraph(directory, ErrorHandler(), jobs=args.jobs)
+            return graph.link(main, "main.hx"), graph.compiled
+
+        (_, cold_count), cold = timed(build)
+        (_, warm_count), warm = timed(build)
+        with open(os.path.join(directory, "lib", f"M{args.modules // 2}.hx"), 'w') as file:
+            file.write(module_source(args.modules // 2, 1))
+        (_, edit_count), edit = timed(build)
+    print(f"{args.modules} modules of {args.functions} functions")
+    print(f"cold build:      {cold * 1000:10.1f} ms, {cold_count} compiled")
+    print(f"no change:       {warm * 1000:10.1f} ms, {warm_count} compiled")
+    print(f"one file edited: {edit * 1000:10.1f} ms, {edit_count} compiled")
+
+
+def bench_front(args):
+    source = generate_source(args.lines)
+    print(f"{args.lines:,} lines, {len(source) / 1024 / 1024:.1f} MiB")
+    for jobs in sorted({1, *args.jobs}):
+        program, elapsed = timed(Program.compile, source, ErrorHandler(), jobs)
+        print(f"{jobs:2} jobs: {elapsed * 1000:10.1f} ms, {len(program.statements):,} statements")
+
+
+class UninternedScanner(Scanner):
+    # the scanner as it was, with a fresh string for every token
+    def symbol(self, text: str) -> str:
+        return text
+
+
+def bench_symbols(args):
+    source = generate_source(args.lines)
+    # every name in the loop is a global
+    loop = ("var total = 0; var i = 0;\n"
+            f"while (i < {args.n}) {{ total = total + i; i = i + 1; }}\n")
+    print(f"{args.lines:,} lines, {len(source) / 1024:.0f} KiB; {args.n:,} loop iterations")
+    for name, scanner in (("sliced", UninternedScanner), ("interned", Scanner)):
+        tracemalloc.start()
+        tokens, scanned = timed(scanner(ErrorHandler(), source).scan_tokens)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del tokens
+        statements = Parser(scanner(ErrorHandler(), loop).scan_tokens(), ErrorHandler()).parse()
+        Resolver(ErrorHandler()).resolve(statements)
+        best = float("inf")
+        for _ in range(args.repeat):
+            output = io.StringIO()
+            _, elapsed = timed(Interpreter(ErrorHandler(output), output).interpret,
+                               statements, RunMode.FILE)
+            best = min(best, elapsed)
+        print(f"{name:>8}: scan {scanned * 1000:8.1f} ms, tokens {memory / 1024:8.0f} KiB, "
+              f"run {best * 1000:8.1f} ms")
+
+
+def bench_optimize(args):
+    loops = {
+        "invariant bound": ("var limit = 500; var offset = 7; var i = 0; var total = 0;\n"
+                            f"while (i < (limit * 2 + offset) * {args.n // 1000}) {{\n"
+                            "    total = total + (limit * 2 + offset) * 3; i = i + 1;\n}\n"),
+        "repeated subexpression": ("var a = 3; var b = 4; var i = 0; var total = 0;\n"
+                                   f"while (i < {args.n}) {{\n"
+                                   "    total = (a * i + b) * (a * i + b) - total; i = i + 1;\n}\n"),
+    }
+    for name, source in loops.items():
+        optimizer = Optimizer()
+        programs = [Program.compile(source, ErrorHandler()),
+                    Program.compile(source, ErrorHandler(), optimizer=optimizer)]
+        # alternated, so both see the same machine load
+        times = [float("inf")] * 2
+        for _ in range(args.repeat):
+            for i, program in enumerate(programs):
+                _, elapsed = timed(Program.run, program)
+                times[i] = min(times[i], elapsed)
+        print(f"{name:>22}: {times[0] * 1000:8.1f} ms plain, {times[1] * 1000:8.1f} ms optimized")
+        print(f"{'':>24}{optimizer.report()}")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    benchmarks = arg_parser.add_subparsers(dest="benchmark", required=True)
+    reparse = benchmarks.add_parser(
+        "reparse", help="incremental re-parse after a one character edit")
+    reparse.add_argument("--lines", type=int, default=50000)
+    reparse.add_argument("--repeat", type=int, default=50)
+    reparse.set_defaults(run=bench_reparse)
+    fib = benchmarks.add_parser("fib", help="recursive function calls")
+    fib.add_argument("-n", type=int, default=25)
+    fib.set_defaults(run=bench_fib)
+    array = benchmarks.add_parser("array", help="packed arrays against a scripted loop")
+    array.add_argument("-n", type=int, default=10000000)
+    array.set_defaults(run=bench_array)
+    map_parser = benchmarks.add_parser("map", help="bulk and scripted map inserts and lookups")
+    map_parser.add_argument("-n", type=int, default=1000000)
+    map_parser.set_defaults(run=bench_map)
+    lines = benchmarks.add_parser("lines", help="line iteration over a large file")
+    lines.add_argument("--mb", type=int, default=1024)
+    lines.set_defaults(run=bench_lines)
+    timers = benchmarks.add_parser("timers", help="many pending timers on one event loop")
+    timers.add_argument("-n", type=int, default=10000)
+    timers.set_defaults(run=bench_timers)
+    threads = benchmarks.add_parser("threads", help="producer/consumer over a Deque")
+    threads.add_argument("-n", type=int, default=100000)
+    threads.set_defaults(run=bench_threads)
+    hooks = benchmarks.add_parser("hooks", help="cost of the trace hook interface")
+    hooks.add_argument("--lines", type=int, default=5000)
+    hooks.add_argument("--repeat", type=int, default=3)
+    hooks.set_defaults(run=bench_hooks)
+    profile = benchmarks.add_parser("profile", help="cost of the sampling profiler")
+    profile.add_argument("--lines", type=int, default=50000)
+    profile.add_argument("--rate", type=int, default=1000)
+    profile.add_argument("--repeat", type=int, default=5)
+    profile.set_defaults(run=bench_profile)
+    budget = benchmarks.add_parser("budget", help="cost of execution budgets")
+    budget.add_argument("--repeat", type=int, default=5)
+    budget.set_defaults(run=bench_budget)
+    snapshot = benchmarks.add_parser("snapshot", help="restoring a session against replaying it")
+    snapshot.add_argument("--definitions", type=int, default=5000)
+    snapshot.set_defaults(run=bench_snapshot)
+    image = benchmarks.add_parser("image", help="mapping a program image against compiling")
+    image.add_argument("--functions", type=int, default=5000)
+    image.set_defaults(run=bench_image)
+    modules = benchmarks.add_parser("modules", help="cold, cached and incremental module builds")
+    modules.add_argument("--modules", type=int, default=300)
+    modules.add_argument("--functions", type=int, default=20)
+    modules.add_argument("-j", "--jobs", type=int, default=None)
+    modules.set_defaults(run=bench_modules)
+    front = benchmarks.add_parser("front", help="scanning and parsing a large file across processes")
+    front.add_argument("--lines", type=int, default=200000)
+    front.add_argument("-j", "--jobs", type=int, nargs="+", default=[2, 4, os.cpu_count()])
+    front.set_defaults(run=bench_front)
+    symbols = benchmarks.add_parser("symbols", help="interned names against sliced strings")
+    symbols.add_argument("--lines", type=int, default=50000)
+    symbols.add_argument("-n", type=int, default=200000)
+    symbols.add_argument("--repeat", type=int, default=5)
+    symbols.set_defaults(run=bench_symbols)
+    optimize = benchmarks.add_parser("optimize", help="loops before and after hoisting and sharing")
+    optimize.add_argument("-n", type=int, default=100000)
+    optimize.add_argument("--repeat", type=int, default=3)
+    optimize.set_defaults(run=bench_optimize)
+    args = arg_parser.parse_args()
+    args.run(args)
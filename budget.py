@@ -0,0 +1,9 @@
+from collections import namedtuple
+
+# limits on one interpret call: loop iterations plus function calls, seconds
+# of wall time and nested function calls; None means no limit
+Budget = namedtuple("Budget", "max_steps, max_time, max_depth",
+                    defaults=(None, None, None))
+
+# steps between checks of the step count and the clock
+CHECK_INTERVAL = 1000
@@ -0,0 +1,45 @@
+import os
+import sys
+import json
+import socket
+import argparse
+# a client for the evaluation server started with "haxepy.py --serve"; it
+# imports nothing from the interpreter so it starts as fast as python does
+
+
+def evaluate(sock_file, request: dict) -> dict:
+    sock_file.write(json.dumps(request).encode() + b"\n")
+    sock_file.flush()
+    line = sock_file.readline()
+    if not line:
+        raise ConnectionError("the server closed the connection")
+    return json.loads(line)
+
+
+def main(socket_path: str, scripts: list[str]) -> int:
+    status = 0
+    if scripts:
+        requests = [{"path": os.path.abspath(script)} for script in scripts]
+    else:
+        requests = [{"source": sys.stdin.read()}]
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        try:
+            connection.connect(socket_path)
+            sock_file = connection.makefile("rwb")
+            for request in requests:
+                response = evaluate(sock_file, request)
+                sys.stdout.write(response["output"])
+                status = max(status, response["status"])
+        except OSError as error:
+            print(f"{socket_path}: {error}", file=sys.stderr)
+            return 1
+    return status
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("socket", help="The server's socket path")
+    arg_parser.add_argument("script", nargs="*",
+                            help="The scripts to run, or none to read a script from stdin")
+    args = arg_parser.parse_args()
+    sys.exit(main(args.socket, args.script))
@@ -6,12 +6,10 @@ from var_state import VarState
 
 
 class Environment:
-    def __init__(self, enclosing=None):
+    # vars holds one slot per variable the resolver found in the scope
+    def __init__(self, enclosing=None, vars: list = None):
         self.enclosing = enclosing
-        self.vars = []
-
-    def define(self, value: Any):
-        self.vars.append(value)
+        self.vars = vars if vars is not None else []
 
     def assign_at(self, distance: int, slot: int, value: Any):
         self.ancestor(distance).vars[slot] = value
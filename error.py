@@ -6,6 +6,7 @@ class RuntimeError(Exception):
     def __init__(self, token: Token, message: str):
         super().__init__(message)
         self.token = token
+        self.message = message
 
 
 class ParseError(Exception):
@@ -23,11 +24,7 @@ class DivisionByZeroError(LoxRunTimeError):
         super().__init__(token, "Division by zero.")
 
 
-class BreakException(Exception):
-    def __init__(self):
-        pass
 
-
-class ReturnException(Exception):
-    def __init__(self, value):
-        self.value = value
+class BudgetExceededError(LoxRunTimeError):
+    def __init__(self, token: Token, message: str):
+        super().__init__(token, message)
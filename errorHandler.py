@@ -6,7 +6,12 @@ from error import RuntimeError
 
 
 class ErrorHandler:
-    def __init__(self):
+    def __init__(self, output=None):
+        self.output = output if output is not None else sys.stdout
+        self.had_error = False
+        self.had_runtime_error = False
+
+    def reset(self):
         self.had_error = False
         self.had_runtime_error = False
 
@@ -14,7 +19,7 @@ class ErrorHandler:
         self.report(line, "", message)
 
     def report(self, line: int, where: str, message: str):
-        print(f"[line {line}] Error{where}: {message}")
+        print(f"[line {line}] Error{where}: {message}", file=self.output)
         self.had_error = True
 
     def error_on_token(self, token: Token, message: str):
@@ -24,5 +29,6 @@ class ErrorHandler:
             self.report(token.line, f" at '{token.lexeme}'", message)
 
     def runtime_error(self, error: RuntimeError):
-        print(f"[line {error.token.line}] Runtime error: {error.message}")
+        print(f"[line {error.token.line}] Runtime error: {error.message}",
+              file=self.output)
         self.had_runtime_error = True
@@ -0,0 +1,310 @@
+import time
+import socket
+import asyncio
+from typing import Any
+from tokens import Token
+from error import RuntimeError, LoxRunTimeError
+from native import NativeObject
+
+READ_SIZE = 1 << 16
+
+
+class EventLoop:
+    '''
+    An asyncio loop owned by one interpreter. Natives hold the loop for
+    every wait they start, a timer or a socket read, and release it when
+    the wait is over. After the script's statements have run, the
+    interpreter drains the loop until nothing is held. Callbacks are
+    HaxePy functions, called on the interpreter's own thread. Each callback
+    counts as a step of the interpreter's budget, and the drain waits no
+    longer than its time limit.
+    '''
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.loop = asyncio.new_event_loop()
+        self.pending = 0
+        self.idle = None
+        self.error = None
+        # where the last wait was started or callback run, which an error of
+        # the budget is reported at
+        self.token = None
+        # open sockets and servers, closed with the loop
+        self.resources = set()
+
+    def hold(self, token: Token):
+        self.pending += 1
+        self.token = token
+
+    def release(self):
+        self.pending -= 1
+        if self.pending == 0:
+            self.wake()
+
+    def wake(self):
+        if self.idle is not None and not self.idle.done():
+            self.idle.set_result(None)
+
+    def fail(self, error: RuntimeError):
+        if self.error is None:
+            self.error = error
+        self.wake()
+
+    def invoke(self, token: Token, function: Any, arguments: list[Any]):
+        if self.error is not None:
+            return
+        self.token = token
+        try:
+            self.interpreter.call_function(token, function, arguments)
+        except RuntimeError as error:
+            self.fail(error)
+
+    def spawn(self, token: Token, coroutine) -> asyncio.Task:
+        self.hold(token)
+        task = self.loop.create_task(coroutine)
+        task.add_done_callback(lambda _: self.release())
+        return task
+
+    async def in_thread(self, token: Token, function, callback: Any):
+        try:
+            value = await self.loop.run_in_executor(None, function)
+        except RuntimeError as error:
+            self.fail(error)
+            return
+        self.invoke(token, callback, [value])
+
+    def drain(self):
+        while self.pending and self.error is None:
+            left = self.interpreter.time_left(self.token)
+            self.idle = self.loop.create_future()
+            timeout = None if left is None else self.loop.call_later(left, self.wake)
+            self.loop.run_until_complete(self.idle)
+            if timeout is not None:
+                timeout.cancel()
+        self.idle = None
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def close(self):
+        for resource in list(self.resources):
+            resource.shutdown()
+        tasks = asyncio.all_tasks(self.loop)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            self.loop.run_until_complete(asyncio.wait(tasks))
+        self.loop.run_until_complete(self.loop.shutdown_default_executor())
+        self.loop.close()
+
+
+def check_callback(interpreter, token: Token, function: Any, count: int):
+    interpreter.check_callable(token, function, [None] * count)
+
+
+def to_seconds(interpreter, token: Token, milliseconds: Any) -> float:
+    if type(milliseconds) not in (int, float) or milliseconds < 0:
+        raise LoxRunTimeError(token, "Time must be a positive number of milliseconds.")
+    return milliseconds / 1000
+
+
+class HaxeTimer(NativeObject):
+    methods = {
+        "stop": ("stop", 0),
+    }
+
+    def __init__(self, events: EventLoop, token: Token, function: Any, interval: float,
+                 repeat: bool):
+        self.events = events
+        self.token = token
+        self.function = function
+        self.interval = interval
+        self.repeat = repeat
+        # repeating timers are scheduled from the first deadline, so a slow
+        # callback does not push every later run back
+        self.deadline = events.loop.time() + interval
+        self.handle = events.loop.call_at(self.deadline, self.fire)
+        events.hold(token)
+
+    def fire(self):
+        if self.repeat:
+            self.deadline += self.interval
+            self.handle = self.events.loop.call_at(self.deadline, self.fire)
+            self.events.invoke(self.token, self.function, [])
+            return
+        self.handle = None
+        self.events.invoke(self.token, self.function, [])
+        self.events.release()
+
+    def stop(self, interpreter, token: Token):
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+            self.events.release()
+
+
+class TimerModule(NativeObject):
+    # haxe.Timer
+    methods = {
+        "delay": ("delay", 2),
+        "repeat": ("repeat", 2),
+        "stamp": ("stamp", 0),
+    }
+
+    def delay(self, interpreter, token: Token, function: Any, milliseconds: Any) -> HaxeTimer:
+        check_callback(interpreter, token, function, 0)
+        interval = to_seconds(interpreter, token, milliseconds)
+        return HaxeTimer(interpreter.event_loop(), token, function, interval, False)
+
+    def repeat(self, interpreter, token: Token, function: Any, milliseconds: Any) -> HaxeTimer:
+        check_callback(interpreter, token, function, 0)
+        interval = to_seconds(interpreter, token, milliseconds)
+        if interval == 0:
+            raise LoxRunTimeError(token, "A repeating timer needs a positive interval.")
+        return HaxeTimer(interpreter.event_loop(), token, function, interval, True)
+
+    def stamp(self, interpreter, token: Token) -> float:
+        return time.perf_counter()
+
+
+class HaxeSocket(NativeObject):
+    # one end of a TCP connection; reads hand their data to a callback, nil
+    # once the other end has closed, in the order they were started
+    methods = {
+        "read": ("read", 1),
+        "readLine": ("read_line", 1),
+        "write": ("write", 1),
+        "close": ("close", 0),
+    }
+
+    def __init__(self, events: EventLoop, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.events = events
+        self.reader = reader
+        self.writer = writer
+        # the last read started, which the next one waits for
+        self.reading = None
+        events.resources.add(self)
+
+    async def receive(self, token: Token, read, callback: Any, previous: asyncio.Task):
+        if previous is not None:
+            await asyncio.wait([previous])
+        try:
+            data = await read()
+        except (OSError, ValueError) as error:
+            self.events.fail(LoxRunTimeError(token, f"Can't read socket: {error}."))
+            return
+        self.events.invoke(token, callback, [None if data is None else data.decode("utf-8", "replace")])
+
+    def read(self, interpreter, token: Token, callback: Any):
+        check_callback(interpreter, token, callback, 1)
+        self.reading = self.events.spawn(
+            token, self.receive(token, self.chunk, callback, self.reading))
+
+    def read_line(self, interpreter, token: Token, callback: Any):
+        check_callback(interpreter, token, callback, 1)
+        self.reading = self.events.spawn(
+            token, self.receive(token, self.line, callback, self.reading))
+
+    async def chunk(self) -> bytes:
+        return await self.reader.read(READ_SIZE) or None
+
+    async def line(self) -> bytes:
+        line = await self.reader.readline()
+        if not line:
+            return None
+        return line.rstrip(b"\r\n") if line.endswith(b"\n") else line
+
+    def write(self, interpreter, token: Token, text: Any):
+        if type(text) is not str:
+            raise LoxRunTimeError(token, "Can only write strings.")
+        if self.writer.is_closing():
+            raise LoxRunTimeError(token, "Socket is closed.")
+        self.writer.write(text.encode())
+
+    def close(self, interpreter, token: Token):
+        self.shutdown()
+
+    def shutdown(self):
+        self.events.resources.discard(self)
+        self.writer.close()
+
+
+class SocketServer(NativeObject):
+    methods = {
+        "close": ("close", 0),
+    }
+
+    def __init__(self, events: EventLoop, token: Token, listener: socket.socket, callback: Any):
+        self.events = events
+        self.token = token
+        self.callback = callback
+        self.listener = listener
+        self.port = listener.getsockname()[1]
+        self.server = None
+        self.starting = events.loop.create_task(
+            asyncio.start_server(self.accept, sock=listener))
+        self.starting.add_done_callback(self.started)
+        events.resources.add(self)
+        events.hold(token)
+
+    def started(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is None:
+            self.server = task.result()
+
+    async def accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.events.invoke(self.token, self.callback, [HaxeSocket(self.events, reader, writer)])
+
+    def get_property(self, name: Token):
+        if name.lexeme == "port":
+            return self.port
+        return super().get_property(name)
+
+    def close(self, interpreter, token: Token):
+        self.shutdown()
+
+    def shutdown(self):
+        if self not in self.events.resources:
+            return
+        self.events.resources.discard(self)
+        self.starting.cancel()
+        if self.server is not None:
+            self.server.close()
+        else:
+            # closed before the server started, which would have owned it
+            self.listener.close()
+        self.events.release()
+
+
+class SocketModule(NativeObject):
+    # sys.net.Socket
+    methods = {
+        "connect": ("connect", 3),
+        "listen": ("listen", 3),
+    }
+
+    def connect(self, interpreter, token: Token, host: Any, port: Any, callback: Any):
+        check_callback(interpreter, token, callback, 1)
+        port = interpreter.to_index(token, port)
+        events = interpreter.event_loop()
+
+        async def connecting():
+            try:
+                reader, writer = await asyncio.open_connection(host, port)
+            except (OSError, ValueError, TypeError) as error:
+                events.fail(LoxRunTimeError(token, f"Can't connect to {host}:{port}: {error}."))
+                return
+            events.invoke(token, callback, [HaxeSocket(events, reader, writer)])
+
+        events.spawn(token, connecting())
+
+    def listen(self, interpreter, token: Token, host: Any, port: Any, callback: Any) -> SocketServer:
+        # the listening socket is bound straight away, so a script that
+        # asked for port 0 can read the port it got before any client comes
+        check_callback(interpreter, token, callback, 1)
+        port = interpreter.to_index(token, port)
+        try:
+            listener = socket.create_server((host, port))
+        except (OSError, TypeError) as error:
+            raise LoxRunTimeError(token, f"Can't listen on {host}:{port}: {error}.")
+        listener.setblocking(False)
+        return SocketServer(interpreter.event_loop(), token, listener, callback)
@@ -11,6 +11,8 @@ class Assign(Expr):
     def __init__(self, name: str, value: Expr):
         self.name = name
         self.value = value
+        self.depth = None
+        self.slot = None
 
     def accept(self, visitor):
         return visitor.visit_assign_expr(self)
@@ -74,6 +76,8 @@ class UnaryExpr(Expr):
 class VariableExpr(Expr):
     def __init__(self, name: Token):
         self.name = name
+        self.depth = None
+        self.slot = None
 
     def accept(self, visitor):
         return visitor.visit_variable_expr(self)
@@ -84,3 +88,76 @@ class Call(Expr):
         self.callee = callee
         self.paren = paren
         self.args = args
+
+    def accept(self, visitor):
+        return visitor.visit_call_expr(self)
+
+
+class ArrayExpr(Expr):
+    def __init__(self, bracket: Token, elements: list[Expr]):
+        self.bracket = bracket
+        self.elements = elements
+
+    def accept(self, visitor):
+        return visitor.visit_array_expr(self)
+
+
+class IndexExpr(Expr):
+    def __init__(self, object: Expr, bracket: Token, index: Expr):
+        self.object = object
+        self.bracket = bracket
+        self.index = index
+
+    def accept(self, visitor):
+        return visitor.visit_index_expr(self)
+
+
+class SetIndexExpr(Expr):
+    def __init__(self, object: Expr, bracket: Token, index: Expr, value: Expr):
+        self.object = object
+        self.bracket = bracket
+        self.index = index
+        self.value = value
+
+    def accept(self, visitor):
+        return visitor.visit_set_index_expr(self)
+
+
+class GetExpr(Expr):
+    def __init__(self, object: Expr, name: Token):
+        self.object = object
+        self.name = name
+
+    def accept(self, visitor):
+        return visitor.visit_get_expr(self)
+
+
+class HoistedExpr(Expr):
+    # a loop-invariant expression, computed at most once per run of its loop
+    def __init__(self, expression: Expr, index: int):
+        self.expression = expression
+        self.index = index
+
+    def accept(self, visitor):
+        return visitor.visit_hoisted_expr(self)
+
+
+class CommonExpr(Expr):
+    # the root of a statement's expression whose repeated parts are shared
+    def __init__(self, expression: Expr, count: int):
+        self.expression = expression
+        self.count = count
+
+    def accept(self, visitor):
+        return visitor.visit_common_expr(self)
+
+
+class SharedExpr(Expr):
+    # one of several equal subexpressions under a CommonExpr, all of which
+    # share the value of whichever is evaluated first
+    def __init__(self, expression: Expr, index: int):
+        self.expression = expression
+        self.index = index
+
+    def accept(self, visitor):
+        return visitor.visit_shared_expr(self)
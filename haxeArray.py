@@ -0,0 +1,165 @@
+from array import array
+from functools import cmp_to_key
+from typing import Any
+from callable import Callable
+from tokens import Token
+from error import LoxRunTimeError
+from native import NativeObject
+
+INT_MIN, INT_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def pack(values) -> Any:
+    # whole numbers go in an array('q'), other numbers in an array('d') and
+    # anything else in a plain list
+    if type(values) is array:
+        return values
+    if type(values) is not list:
+        values = list(values)
+    kinds = set(map(type, values))
+    if kinds <= {int}:
+        try:
+            return array('q', values)
+        except OverflowError:
+            return values
+    if kinds <= {int, float}:
+        return array('d', values)
+    return values
+
+
+class HaxeArray(NativeObject):
+    methods = {
+        "push": ("push", 1),
+        "pop": ("pop", 0),
+        "map": ("map", 1),
+        "filter": ("filter", 1),
+        "fold": ("fold", 2),
+        "sum": ("sum", 0),
+        "sort": ("sort", 1),
+        "concat": ("concat", 1),
+        "slice": ("slice", 2),
+        "join": ("join", 1),
+    }
+
+    def __init__(self, values=()):
+        self.items = pack(values)
+
+    def get_property(self, name: Token):
+        if name.lexeme == "length":
+            return len(self.items)
+        return super().get_property(name)
+
+    def fit(self, value: Any):
+        # widens the storage, if need be, so it can hold value
+        items = self.items
+        if type(items) is list:
+            return
+        kind = type(value)
+        if kind is float:
+            if items.typecode == 'q':
+                self.items = array('d', items)
+        elif kind is not int or not INT_MIN <= value <= INT_MAX:
+            self.items = list(items)
+
+    def get_item(self, index: int) -> Any:
+        if 0 <= index < len(self.items):
+            return self.items[index]
+        return None
+
+    def set_item(self, index: int, value: Any):
+        self.fit(value)
+        items = self.items
+        if index < len(items):
+            items[index] = value
+            return
+        if index > len(items):
+            self.fit(None)
+            self.items.extend([None] * (index - len(items)))
+        self.items.append(value)
+
+    def callback(self, interpreter, token: Token, function: Any, count: int):
+        interpreter.check_callable(token, function, [None] * count)
+        call_function = interpreter.call_function
+        return lambda arguments: call_function(token, function, arguments)
+
+    def push(self, interpreter, token: Token, value: Any) -> int:
+        self.fit(value)
+        self.items.append(value)
+        return len(self.items)
+
+    def pop(self, interpreter, token: Token) -> Any:
+        if not self.items:
+            return None
+        return self.items.pop()
+
+    def map(self, interpreter, token: Token, function: Any) -> "HaxeArray":
+        call = self.callback(interpreter, token, function, 1)
+        return HaxeArray([call([item]) for item in self.items])
+
+    def filter(self, interpreter, token: Token, function: Any) -> "HaxeArray":
+        call = self.callback(interpreter, token, function, 1)
+        is_truthy = interpreter.is_truthy
+        kept = [item for item in self.items if is_truthy(call([item]))]
+        if type(self.items) is array:
+            return HaxeArray(array(self.items.typecode, kept))
+        return HaxeArray(kept)
+
+    def fold(self, interpreter, token: Token, function: Any, initial: Any) -> Any:
+        # the callback takes (item, result), as in Haxe's Lambda.fold
+        call = self.callback(interpreter, token, function, 2)
+        result = initial
+        for item in self.items:
+            result = call([item, result])
+        return result
+
+    def sum(self, interpreter, token: Token) -> Any:
+        items = self.items
+        if type(items) is list and not all(type(item) in (int, float) for item in items):
+            raise LoxRunTimeError(token, "Can only sum an array of numbers.")
+        total = sum(items)
+        if type(total) is float and total.is_integer():
+            return int(total)
+        return total
+
+    def sort(self, interpreter, token: Token, function: Any):
+        call = self.callback(interpreter, token, function, 2)
+
+        def compare(left, right):
+            order = call([left, right])
+            if type(order) not in (int, float):
+                raise LoxRunTimeError(token, "Sort function must return a number.")
+            return order
+
+        ordered = sorted(self.items, key=cmp_to_key(compare))
+        if type(self.items) is array:
+            self.items = array(self.items.typecode, ordered)
+        else:
+            self.items = ordered
+
+    def concat(self, interpreter, token: Token, other: Any) -> "HaxeArray":
+        if type(other) is not HaxeArray:
+            raise LoxRunTimeError(token, "Can only concat an array.")
+        items, others = self.items, other.items
+        if type(items) is array and type(others) is array and items.typecode == others.typecode:
+            return HaxeArray(items + others)
+        return HaxeArray(list(items) + list(others))
+
+    def slice(self, interpreter, token: Token, start: Any, end: Any) -> "HaxeArray":
+        start = interpreter.to_index(token, start)
+        end = interpreter.to_index(token, end)
+        return HaxeArray(self.items[start:end])
+
+    def join(self, interpreter, token: Token, separator: Any) -> str:
+        return interpreter.stringify(separator).join(map(interpreter.stringify, self.items))
+
+
+class ArrayClass(Callable):
+    # Array() makes a new empty array, like Haxe's new Array()
+    def call(self, interpreter, arguments: list[Any]):
+        return HaxeArray()
+
+    def arity(self):
+        return 0
+
+    def __str__(self):
+        return "<class Array>"
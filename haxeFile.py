@@ -0,0 +1,211 @@
+import mmap
+from typing import Any
+from tokens import Token
+from error import LoxRunTimeError
+from native import NativeObject
+from haxeArray import HaxeArray
+
+CHUNK_SIZE = 1 << 20
+
+
+def check_path(token: Token, path: Any) -> str:
+    if type(path) is not str:
+        raise LoxRunTimeError(token, "File path must be a string.")
+    return path
+
+
+def open_file(token: Token, path: Any, mode: str):
+    try:
+        return open(check_path(token, path), mode, buffering=CHUNK_SIZE)
+    except OSError as error:
+        raise LoxRunTimeError(token, f"Can't open '{path}': {error.strerror}.")
+
+
+class FileInput(NativeObject):
+    # reads the file a chunk at a time and hands out the lines of the chunk,
+    # which costs a split per megabyte instead of a read per line
+    methods = {
+        "readLine": ("read_line", 0),
+        "readLines": ("read_lines", 1),
+        "readAll": ("read_all", 0),
+        "hasNext": ("has_next", 0),
+        "next": ("read_line", 0),
+        "eof": ("eof", 0),
+        "close": ("close", 0),
+    }
+
+    def __init__(self, file):
+        self.file = file
+        self.lines = []
+        self.position = 0
+        self.rest = ""
+        self.done = False
+
+    def fill(self, token: Token) -> bool:
+        while self.position >= len(self.lines):
+            if self.done:
+                return False
+            try:
+                chunk = self.file.read(CHUNK_SIZE)
+            except (OSError, ValueError) as error:
+                raise LoxRunTimeError(token, f"Can't read file: {error}.")
+            if not chunk:
+                self.done = True
+                self.lines, self.position = ([self.rest] if self.rest else []), 0
+                self.rest = ""
+                continue
+            self.lines = (self.rest + chunk).split("\n")
+            self.rest = self.lines.pop()
+            self.position = 0
+        return True
+
+    def read_line(self, interpreter, token: Token) -> Any:
+        # nil at the end of the file, where Haxe would throw haxe.io.Eof
+        if self.position >= len(self.lines) and not self.fill(token):
+            return None
+        self.position += 1
+        return self.lines[self.position - 1]
+
+    def read_lines(self, interpreter, token: Token, count: Any) -> HaxeArray:
+        count = interpreter.to_index(token, count)
+        lines = []
+        while len(lines) < count and self.fill(token):
+            end = self.position + count - len(lines)
+            lines.extend(self.lines[self.position:end])
+            self.position = min(end, len(self.lines))
+        return HaxeArray(lines)
+
+    def read_all(self, interpreter, token: Token) -> str:
+        lines = self.lines[self.position:]
+        self.lines, self.position = [], 0
+        rest = self.rest
+        self.rest = ""
+        try:
+            rest += self.file.read()
+        except (OSError, ValueError) as error:
+            raise LoxRunTimeError(token, f"Can't read file: {error}.")
+        self.done = True
+        return "".join(line + "\n" for line in lines) + rest
+
+    def has_next(self, interpreter, token: Token) -> bool:
+        return self.position < len(self.lines) or self.fill(token)
+
+    def eof(self, interpreter, token: Token) -> bool:
+        return not self.has_next(interpreter, token)
+
+    def close(self, interpreter, token: Token):
+        self.file.close()
+
+
+class FileOutput(NativeObject):
+    methods = {
+        "writeString": ("write_string", 1),
+        "flush": ("flush", 0),
+        "close": ("close", 0),
+    }
+
+    def __init__(self, file):
+        self.file = file
+
+    def write_string(self, interpreter, token: Token, text: Any):
+        if type(text) is not str:
+            raise LoxRunTimeError(token, "Can only write strings.")
+        try:
+            self.file.write(text)
+        except (OSError, ValueError) as error:
+            raise LoxRunTimeError(token, f"Can't write file: {error}.")
+
+    def flush(self, interpreter, token: Token):
+        try:
+            self.file.flush()
+        except (OSError, ValueError) as error:
+            raise LoxRunTimeError(token, f"Can't write file: {error}.")
+
+    def close(self, interpreter, token: Token):
+        try:
+            self.file.close()
+        except OSError as error:
+            raise LoxRunTimeError(token, f"Can't write file: {error}.")
+
+
+class MappedBytes(NativeObject):
+    # the read-only bytes of a file, mapped into memory so a script can jump
+    # around a large file without reading all of it
+    methods = {
+        "get": ("get_byte", 1),
+        "getString": ("get_string", 2),
+        "close": ("close", 0),
+    }
+
+    def __init__(self, data):
+        self.data = data
+
+    def get_property(self, name: Token):
+        if name.lexeme == "length":
+            return len(self.data)
+        return super().get_property(name)
+
+    def get_byte(self, interpreter, token: Token, position: Any) -> int:
+        position = interpreter.to_index(token, position)
+        if not 0 <= position < len(self.data):
+            raise LoxRunTimeError(token, "Position is outside the bytes.")
+        return self.data[position]
+
+    def get_string(self, interpreter, token: Token, position: Any, length: Any) -> str:
+        position = interpreter.to_index(token, position)
+        length = interpreter.to_index(token, length)
+        if position < 0 or length < 0 or position + length > len(self.data):
+            raise LoxRunTimeError(token, "Range is outside the bytes.")
+        return self.data[position:position + length].decode("utf-8", "replace")
+
+    def close(self, interpreter, token: Token):
+        if type(self.data) is mmap.mmap:
+            self.data.close()
+        self.data = b""
+
+
+class HaxeFile(NativeObject):
+    # sys.io.File
+    methods = {
+        "getContent": ("get_content", 1),
+        "saveContent": ("save_content", 2),
+        "getContentAsync": ("get_content_async", 2),
+        "getBytes": ("get_bytes", 1),
+        "read": ("read", 1),
+        "write": ("write", 1),
+        "append": ("append", 1),
+    }
+
+    def get_content(self, interpreter, token: Token, path: Any) -> str:
+        with open_file(token, path, 'r') as file:
+            return FileInput(file).read_all(interpreter, token)
+
+    def get_content_async(self, interpreter, token: Token, path: Any, callback: Any):
+        # reads on a worker thread and hands the content to the callback
+        interpreter.check_callable(token, callback, [None])
+        events = interpreter.event_loop()
+        events.spawn(token, events.in_thread(
+            token, lambda: self.get_content(interpreter, token, path), callback))
+
+    def save_content(self, interpreter, token: Token, path: Any, content: Any):
+        with open_file(token, path, 'w') as file:
+            FileOutput(file).write_string(interpreter, token, content)
+
+    def get_bytes(self, interpreter, token: Token, path: Any) -> MappedBytes:
+        with open_file(token, path, 'rb') as file:
+            try:
+                return MappedBytes(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+            except ValueError:
+                # an empty file can't be mapped
+                return MappedBytes(b"")
+            except OSError as error:
+                raise LoxRunTimeError(token, f"Can't map '{path}': {error.strerror}.")
+
+    def read(self, interpreter, token: Token, path: Any) -> FileInput:
+        return FileInput(open_file(token, path, 'r'))
+
+    def write(self, interpreter, token: Token, path: Any) -> FileOutput:
+        return FileOutput(open_file(token, path, 'w'))
+
+    def append(self, interpreter, token: Token, path: Any) -> FileOutput:
+        return FileOutput(open_file(token, path, 'a'))
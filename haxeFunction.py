@@ -0,0 +1,85 @@
+from typing import Any
+from functools import cached_property
+from collections import OrderedDict
+from callable import Callable
+from environment import Environment
+from stmt import Stmt, Function
+
+
+class HaxeFunction(Callable):
+    def __init__(self, declaration: Function, closure: Environment):
+        self.declaration = declaration
+        self.closure = closure
+        # the arguments fill the first slots of the frame, the function's
+        # own locals the rest
+        self.locals = [None] * (declaration.slot_count - len(declaration.params))
+
+    @cached_property
+    def body(self) -> list[Stmt]:
+        # read on the first call, as a function from a program image only
+        # decodes its body when it is first needed
+        return self.declaration.body
+
+    def call(self, interpreter, arguments: list[Any]):
+        arguments.extend(self.locals)
+        if interpreter.execute_block(self.body, Environment(self.closure, arguments)) is not None:
+            return interpreter.return_value
+        return None
+
+    def arity(self):
+        return len(self.declaration.params)
+
+    def __str__(self):
+        return f"<function {self.declaration.name.lexeme}>"
+
+
+# argument types whose values can't change, so a call with only these can
+# be answered from the cache
+VALUE_TYPES = {int, float, str, bool, type(None)}
+
+
+def memo_key(arguments: list[Any]) -> tuple:
+    # numbers are keyed by value, as 3 and 3.0 are the same Haxe number, and
+    # bools by a tag of their own, so true and 1 do not share an entry
+    key = []
+    for argument in arguments:
+        kind = type(argument)
+        if kind not in VALUE_TYPES:
+            return None
+        key.append((bool, argument) if kind is bool else argument)
+    return tuple(key)
+
+
+class MemoizedFunction(HaxeFunction):
+    # results are cached by argument values; calls passing an array, a map
+    # or any other value that can change are not. The least recently used
+    # entry is evicted first
+    def __init__(self, declaration: Function, closure: Environment, max_size: int):
+        super().__init__(declaration, closure)
+        self.max_size = max_size
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def call(self, interpreter, arguments: list[Any]):
+        key = memo_key(arguments)
+        if key is None:
+            return super().call(interpreter, arguments)
+        try:
+            value = self.cache[key]
+            self.cache.move_to_end(key)
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = super().call(interpreter, arguments)
+        self.cache[key] = value
+        if len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+        return value
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses,
+                "size": len(self.cache), "max_size": self.max_size}
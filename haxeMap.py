@@ -0,0 +1,121 @@
+from typing import Any
+from callable import Callable
+from tokens import Token
+from error import LoxRunTimeError
+from native import NativeObject
+from haxeArray import HaxeArray
+
+
+def map_key(key: Any) -> Any:
+    # bools are stored under a tag of their own, as in Python true == 1 and
+    # false == 0 and they would otherwise share an entry with those numbers
+    return (bool, key) if type(key) is bool else key
+
+
+def script_key(key: Any) -> Any:
+    return key[1] if type(key) is tuple else key
+
+
+class HaxeMap(NativeObject):
+    # a Map with keys of any type; StringMap and IntMap only check keys as
+    # they are stored, lookups go straight to the dict
+    name = "Map"
+    methods = {
+        "set": ("set", 2),
+        "get": ("get_value", 1),
+        "exists": ("exists", 1),
+        "remove": ("remove", 1),
+        "keys": ("keys", 0),
+        "iterator": ("iterator", 0),
+        "copy": ("copy", 0),
+        "clear": ("clear", 0),
+        "setAll": ("set_all", 2),
+    }
+
+    def __init__(self, entries: dict = None):
+        self.entries = {} if entries is None else entries
+
+    def check_key(self, token: Token, key: Any) -> Any:
+        return map_key(key)
+
+    def check_keys(self, token: Token, keys: HaxeArray) -> Any:
+        return [self.check_key(token, key) for key in keys.items]
+
+    def set(self, interpreter, token: Token, key: Any, value: Any):
+        self.entries[self.check_key(token, key)] = value
+
+    def get_value(self, interpreter, token: Token, key: Any) -> Any:
+        return self.entries.get(map_key(key))
+
+    def exists(self, interpreter, token: Token, key: Any) -> bool:
+        return map_key(key) in self.entries
+
+    def remove(self, interpreter, token: Token, key: Any) -> bool:
+        return self.entries.pop(map_key(key), self) is not self
+
+    def keys(self, interpreter, token: Token) -> HaxeArray:
+        return HaxeArray([script_key(key) for key in self.entries])
+
+    def iterator(self, interpreter, token: Token) -> HaxeArray:
+        return HaxeArray(list(self.entries.values()))
+
+    def copy(self, interpreter, token: Token) -> "HaxeMap":
+        return type(self)(self.entries.copy())
+
+    def clear(self, interpreter, token: Token):
+        self.entries.clear()
+
+    def set_all(self, interpreter, token: Token, keys: Any, values: Any):
+        if type(keys) is not HaxeArray or type(values) is not HaxeArray:
+            raise LoxRunTimeError(token, "Expected arrays of keys and values.")
+        if len(keys.items) != len(values.items):
+            raise LoxRunTimeError(token, "Expected as many values as keys.")
+        self.entries.update(zip(self.check_keys(token, keys), values.items))
+
+
+class StringMap(HaxeMap):
+    name = "StringMap"
+
+    def check_key(self, token: Token, key: Any) -> str:
+        if type(key) is not str:
+            raise LoxRunTimeError(token, "StringMap keys must be strings.")
+        return key
+
+    def check_keys(self, token: Token, keys: HaxeArray) -> Any:
+        if type(keys.items) is not list or not all(type(key) is str for key in keys.items):
+            raise LoxRunTimeError(token, "StringMap keys must be strings.")
+        return keys.items
+
+
+class IntMap(HaxeMap):
+    # keys are stored as ints; since 3.0 == 3 and both hash alike, lookups
+    # with the interpreter's floats need no conversion
+    name = "IntMap"
+
+    def check_key(self, token: Token, key: Any) -> int:
+        if type(key) is int:
+            return key
+        if type(key) is float and key.is_integer():
+            return int(key)
+        raise LoxRunTimeError(token, "IntMap keys must be whole numbers.")
+
+    def check_keys(self, token: Token, keys: HaxeArray) -> Any:
+        items = keys.items
+        if type(items) is not list and items.typecode == 'q':
+            return items
+        return [self.check_key(token, key) for key in items]
+
+
+class MapClass(Callable):
+    # Map(), StringMap() and IntMap() make a new empty map of that kind
+    def __init__(self, kind: type):
+        self.kind = kind
+
+    def call(self, interpreter, arguments: list[Any]):
+        return self.kind()
+
+    def arity(self):
+        return 0
+
+    def __str__(self):
+        return f"<class {self.kind.name}>"
@@ -0,0 +1,228 @@
+import builtins
+import threading
+from collections import deque
+from typing import Any
+from callable import Callable
+from tokens import Token
+from error import RuntimeError, LoxRunTimeError
+from errorHandler import ErrorHandler
+from native import NativeObject
+
+
+def to_timeout(token: Token, seconds: Any) -> float:
+    if type(seconds) not in (int, float) or seconds < 0:
+        raise LoxRunTimeError(token, "Timeout must be a positive number of seconds.")
+    return seconds
+
+
+def bounded_wait(interpreter, token: Token, wait, timeout: float = None) -> bool:
+    # wait(timeout) blocks until it returns True, or False once the timeout,
+    # None for none, is up; it is cut short by the run's time limit, which
+    # raises once it is up
+    while True:
+        left = interpreter.time_left(token)
+        if left is None or (timeout is not None and timeout <= left):
+            return wait(timeout)
+        if wait(left):
+            return True
+        if timeout is not None:
+            timeout -= left
+
+
+class ThreadGroup:
+    '''
+    The threads one run starts, and the output they share. Their prints and
+    errors reach the run's output and error handler until the run closes
+    the group, and are dropped after, so a thread that outlives its run
+    can't write into the next run of a pooled interpreter.
+    '''
+
+    def __init__(self, output, error_handler: ErrorHandler):
+        self.lock = threading.Lock()
+        self.target = output
+        self.target_handler = error_handler
+        self.error_handler = GroupErrorHandler(self)
+
+    def start(self, run) -> threading.Thread:
+        # daemon threads, so a script's threads never keep the process alive
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def close(self):
+        with self.lock:
+            self.target = None
+            self.target_handler = None
+
+    def write(self, text: str):
+        with self.lock:
+            if self.target is not None:
+                self.target.write(text)
+
+    def flush(self):
+        pass
+
+    def failed(self):
+        with self.lock:
+            if self.target_handler is not None:
+                self.target_handler.had_runtime_error = True
+
+
+class GroupErrorHandler(ErrorHandler):
+    # reports a thread's runtime errors to its group's output, and marks
+    # the run as failed while the group is open
+    def __init__(self, group: ThreadGroup):
+        super().__init__(group)
+        self.group = group
+
+    def runtime_error(self, error: RuntimeError):
+        super().runtime_error(error)
+        self.group.failed()
+
+
+class HaxeThread(NativeObject):
+    # runs a function on a thread of its own, with an interpreter that shares
+    # the globals but keeps its own environment and return value
+    methods = {
+        "join": ("join", 0),
+        "isAlive": ("is_alive", 0),
+    }
+
+    def __init__(self, interpreter, function: Any):
+        self.interpreter = interpreter.fork()
+        self.function = function
+        self.thread = self.interpreter.threads.start(self.run)
+
+    def run(self):
+        interpreter = self.interpreter
+        try:
+            self.function.call(interpreter, [])
+            if interpreter.events is not None:
+                interpreter.events.drain()
+        except RuntimeError as error:
+            interpreter.error_handler.runtime_error(error)
+        finally:
+            interpreter.close_events()
+
+    def join(self, interpreter, token: Token):
+        bounded_wait(interpreter, token, self.joined)
+
+    def joined(self, timeout: float) -> bool:
+        self.thread.join(timeout)
+        return not self.thread.is_alive()
+
+    def is_alive(self, interpreter, token: Token) -> bool:
+        return self.thread.is_alive()
+
+
+class ThreadModule(NativeObject):
+    # sys.thread.Thread
+    methods = {
+        "create": ("create", 1),
+    }
+
+    def create(self, interpreter, token: Token, function: Any) -> HaxeThread:
+        interpreter.check_callable(token, function, [])
+        return HaxeThread(interpreter, function)
+
+
+class HaxeMutex(NativeObject):
+    # reentrant, like Haxe's Mutex
+    name = "Mutex"
+    methods = {
+        "acquire": ("acquire", 0),
+        "tryAcquire": ("try_acquire", 0),
+        "release": ("release", 0),
+    }
+
+    def __init__(self):
+        self.lock = threading.RLock()
+
+    def acquire(self, interpreter, token: Token):
+        bounded_wait(interpreter, token, self.acquired)
+
+    def acquired(self, timeout: float) -> bool:
+        return self.lock.acquire(timeout=-1 if timeout is None else timeout)
+
+    def try_acquire(self, interpreter, token: Token) -> bool:
+        return self.lock.acquire(blocking=False)
+
+    def release(self, interpreter, token: Token):
+        try:
+            self.lock.release()
+        except builtins.RuntimeError:
+            raise LoxRunTimeError(token, "Can't release a mutex this thread does not hold.")
+
+
+class HaxeLock(NativeObject):
+    # a counting lock: every release lets one wait through
+    name = "Lock"
+    methods = {
+        "wait": ("wait", 0),
+        "tryWait": ("try_wait", 1),
+        "release": ("release", 0),
+    }
+
+    def __init__(self):
+        self.semaphore = threading.Semaphore(0)
+
+    def wait(self, interpreter, token: Token):
+        bounded_wait(interpreter, token, self.acquired)
+
+    def try_wait(self, interpreter, token: Token, seconds: Any) -> bool:
+        return bounded_wait(interpreter, token, self.acquired, to_timeout(token, seconds))
+
+    def acquired(self, timeout: float) -> bool:
+        return self.semaphore.acquire(timeout=timeout)
+
+    def release(self, interpreter, token: Token):
+        self.semaphore.release()
+
+
+class HaxeDeque(NativeObject):
+    # add puts at the end and push at the front; pop takes from the front,
+    # waiting for an item when asked to block
+    name = "Deque"
+    methods = {
+        "add": ("add", 1),
+        "push": ("push", 1),
+        "pop": ("pop", 1),
+    }
+
+    def __init__(self):
+        self.items = deque()
+        self.ready = threading.Condition(threading.Lock())
+
+    def add(self, interpreter, token: Token, value: Any):
+        with self.ready:
+            self.items.append(value)
+            self.ready.notify()
+
+    def push(self, interpreter, token: Token, value: Any):
+        with self.ready:
+            self.items.appendleft(value)
+            self.ready.notify()
+
+    def pop(self, interpreter, token: Token, block: Any) -> Any:
+        with self.ready:
+            if interpreter.is_truthy(block):
+                while not self.items:
+                    bounded_wait(interpreter, token, self.ready.wait)
+            elif not self.items:
+                return None
+            return self.items.popleft()
+
+
+class SyncClass(Callable):
+    # Mutex(), Lock() and Deque() make a new primitive of that kind
+    def __init__(self, kind: type):
+        self.kind = kind
+
+    def call(self, interpreter, arguments: list[Any]):
+        return self.kind()
+
+    def arity(self):
+        return 0
+
+    def __str__(self):
+        return f"<class {self.kind.name}>"
@@ -1,11 +1,25 @@
 import sys
 import os
+import time
 import argparse
+import batch
+import client
+from server import EvaluationServer
 from errorHandler import ErrorHandler
 from scanner import Scanner
 from runMode import RunMode as mode
 from parser import Parser
-from interpreter import Interpreter
+from interpreter import Interpreter, deepen_stack
+from incremental import Document
+from program import Program
+from resolver import Resolver
+from profiler import Profiler
+from memStats import MemoryStats
+from budget import Budget
+from snapshot import SnapshotError, save_snapshot, load_snapshot
+from programImage import ImageError, is_image, read_image, write_image
+from moduleGraph import link_imports
+from optimizer import Optimizer
 # a haxe interpreter written in python
 
 
@@ -13,39 +27,177 @@ class haxe:
     def __init__(self):
         self.errorHandler = ErrorHandler()
         self.interpreter = Interpreter(self.errorHandler)
+        # imports are found here, or next to the script run
+        self.class_path = None
+        self.parse_jobs = 1
+        self.optimizer = None
 
     def run_file(self, path):
+        if is_image(path):
+            self.execute(read_image(path), mode.FILE, path)
+        else:
+            with open(path, 'r') as file:
+                self.run("".join(file.readlines()), mode.FILE, path)
+        self.interpreter.close_events()
+        if self.errorHandler.had_error:
+            return 1
+
+    def build_image(self, path, image_path):
         with open(path, 'r') as file:
-            self.run("".join(file.readlines()), mode.FILE)
-            if self.errorHandler.had_error:
-                return 1
+            program = Program.compile(file.read(), self.errorHandler, optimizer=self.optimizer)
+        if program is None:
+            return 1
+        write_image(program, image_path)
 
     def run_prompt(self):
         try:
             while True:
-                self.run(input("haxe> "), mode.REPL)
-                self.errorHandler.had_error = False
-                self.errorHandler.had_runtime_error = False
+                line = input("haxe> ")
+                if line.startswith((":save ", ":load ")):
+                    self.run_command(line)
+                else:
+                    self.run(line, mode.REPL)
+                self.errorHandler.reset()
         except KeyboardInterrupt:
             print("\n")
 
-    def run(self, source, mode):
-        scanner = Scanner(self.errorHandler, source)
-        tokens = scanner.scan_tokens()
-        parser = Parser(tokens, self.errorHandler)
-        statements = parser.parse()
+    def run_command(self, line):
+        # :save PATH and :load PATH snapshot the session's globals
+        command, path = line.split(maxsplit=1)
+        try:
+            if command == ":save":
+                self.save_snapshot(path.strip())
+            else:
+                self.load_snapshot(path.strip())
+        except (SnapshotError, OSError) as error:
+            print(error)
+
+    def save_snapshot(self, path):
+        save_snapshot(self.interpreter, path)
+
+    def load_snapshot(self, path):
+        load_snapshot(self.interpreter, path)
+
+    def run(self, source, mode, path="<prompt>"):
+        self.execute(Program.compile(source, self.errorHandler, self.parse_jobs,
+                                     self.optimizer), mode, path)
+
+    def execute(self, program, mode, path):
+        # the prompt finds imports in the working directory
+        program = link_imports(program, path, self.errorHandler, self.class_path)
+        if program is None:
+            return
+        self.interpreter.interpret(program.statements, mode)
+
+    def run_file_with_mem_stats(self, path, format):
+        with open(path, 'r') as file:
+            source = file.read()
+        stats = MemoryStats()
+        stats.run(source, self.interpreter, path, self.class_path)
+        self.interpreter.close_events()
+        print(stats.report(format), file=sys.stderr)
+        if self.errorHandler.had_error:
+            return 1
+
+    def memo_stats(self) -> dict[str, dict]:
+        return self.interpreter.memo_stats()
+
+    def compile(self, source, error_handler: ErrorHandler = None) -> Program:
+        # None if the source has errors, which are reported to error_handler,
+        # or to this interpreter's own handler by default
+        if error_handler is None:
+            error_handler = self.errorHandler
+        return Program.compile(source, error_handler, self.parse_jobs, self.optimizer)
+
+    def open_document(self, source) -> Document:
+        return Document(source)
+
+    def run_document(self, document: Document, mode):
+        for line, where, message in document.diagnostics:
+            self.errorHandler.report(line, where, message)
+        if self.errorHandler.had_error:
+            return
+        statements = document.statements
+        Resolver(self.errorHandler).resolve(statements)
         if self.errorHandler.had_error:
             return
         self.interpreter.interpret(statements, mode)
 
 
 if __name__ == "__main__":
+    deepen_stack()
     haxe = haxe()
     arg_parser = argparse.ArgumentParser()
-    arg_parser.add_argument("script", nargs="?",
-                            default=None, help="The script to  run")
+    arg_parser.add_argument("script", nargs="*",
+                            help="The script to run, or several scripts, directories or globs to run as a batch")
+    arg_parser.add_argument("-j", "--jobs", type=int, default=None,
+                            help="Run the scripts as a batch across this many worker processes")
+    arg_parser.add_argument("--serve", metavar="SOCKET", default=None,
+                            help="Serve script runs over this Unix domain socket")
+    arg_parser.add_argument("--serve-system", action="store_true",
+                            help="Let served scripts use the sys package: files, sockets and threads")
+    arg_parser.add_argument("--connect", metavar="SOCKET", default=None,
+                            help="Run the scripts on the server listening on this socket")
+    arg_parser.add_argument("--max-steps", type=int, default=None,
+                            help="Stop a script after this many loop iterations and calls")
+    arg_parser.add_argument("--max-time", type=float, default=None,
+                            help="Stop a script after this many seconds")
+    arg_parser.add_argument("--max-depth", type=int, default=None,
+                            help="Stop a script that nests function calls deeper than this")
+    arg_parser.add_argument("--profile", metavar="FILE", default=None,
+                            help="Sample the script and write folded stacks for a flame graph to this file")
+    arg_parser.add_argument("--profile-rate", type=int, default=1000,
+                            help="Samples per second when profiling")
+    arg_parser.add_argument("--mem-stats", action="store_true",
+                            help="Report memory use per phase and object counts on stderr")
+    arg_parser.add_argument("--mem-stats-format", choices=["text", "json"], default="text",
+                            help="Format of the --mem-stats report")
+    arg_parser.add_argument("--parse-jobs", type=int, default=1,
+                            help="Scan and parse a large script in chunks across this many processes, 0 for one per core")
+    arg_parser.add_argument("--optimize", action="store_true",
+                            help="Hoist loop-invariant expressions and share repeated subexpressions")
+    arg_parser.add_argument("--opt-report", action="store_true",
+                            help="Optimize, and report what was hoisted and shared on stderr")
+    arg_parser.add_argument("--class-path", metavar="DIR", default=None,
+                            help="Find imported modules here instead of next to the script")
+    arg_parser.add_argument("--build-image", metavar="FILE", default=None,
+                            help="Compile the script to a program image that workers can map and run")
     args = arg_parser.parse_args()
-    if args.script is not None:
-        haxe.run_file(args.script)  # run the script
+    scripts = batch.expand_scripts(args.script)
+    budget = Budget(args.max_steps, args.max_time, args.max_depth)
+    haxe.interpreter.set_budget(budget)
+    haxe.class_path = args.class_path
+    haxe.parse_jobs = args.parse_jobs or None
+    if args.optimize or args.opt_report:
+        haxe.optimizer = Optimizer()
+    if args.serve is not None:
+        EvaluationServer(args.serve, args.jobs, budget=budget, system=args.serve_system,
+                         class_path=args.class_path).serve_forever()
+    elif args.connect is not None:
+        sys.exit(client.main(args.connect, scripts))
+    elif args.jobs is not None or len(scripts) > 1 or scripts != args.script:
+        start = time.perf_counter()
+        results = batch.run_batch(scripts, args.jobs, budget)
+        batch.print_summary(results, time.perf_counter() - start)
+        sys.exit(1 if any(result.status for result in results) else 0)
+    elif args.script and args.build_image is not None:
+        try:
+            sys.exit(haxe.build_image(args.script[0], args.build_image))
+        except ImageError as error:
+            sys.exit(error)
+    elif args.script and args.mem_stats:
+        haxe.run_file_with_mem_stats(args.script[0], args.mem_stats_format)
+    elif args.script and args.profile is not None:
+        profiler = Profiler(1 / args.profile_rate)
+        profiler.start()
+        try:
+            haxe.run_file(args.script[0])
+        finally:
+            profiler.stop()
+            profiler.write(args.profile)
+    elif args.script:
+        haxe.run_file(args.script[0])  # run the script
+        if args.opt_report:
+            print(haxe.optimizer.report(), file=sys.stderr)
     else:
         haxe.run_prompt()  # run the prompt
@@ -0,0 +1,6 @@
+
+from enum import Enum
+HookEvent = Enum("HookEvent", "STATEMENT \
+                    EXPRESSION \
+                    VARIABLE_WRITE \
+                    RUNTIME_ERROR")
@@ -0,0 +1,225 @@
+from bisect import bisect_left, bisect_right
+from tokens import Token
+from tokenType import TokenType
+from errorHandler import ErrorHandler
+from scanner import Scanner
+from parser import Parser
+from stmt import Stmt
+
+
+class DiagnosticHandler(ErrorHandler):
+    # collects errors instead of printing them, so a region can be re-parsed
+    # speculatively and its errors kept alongside the declarations
+    def __init__(self):
+        super().__init__()
+        self.diagnostics = []
+
+    def report(self, line: int, where: str, message: str):
+        self.diagnostics.append((line, where, message))
+        self.had_error = True
+
+
+class OffsetScanner(Scanner):
+    def __init__(self, error_handler: ErrorHandler, source: str, line: int = 1):
+        super().__init__(error_handler, source, line)
+        self.offsets = []
+        self.depths = []
+        self.depth = 0
+        self.error_offsets = []
+        self.unterminated = False
+        # where the last conditional's ':' ends
+        self.closed = -1
+
+    def scan_tokens(self) -> list[Token]:
+        tokens = super().scan_tokens()
+        # a conditional closed after the last token took its ':' from the
+        # gap before the next declaration, where the last parse may have
+        # left it as an error of that declaration
+        if self.offsets and self.closed > self.offsets[-1]:
+            self.unterminated = True
+        return tokens
+
+    def scan_token(self):
+        start = self.start
+        super().scan_token()
+        if self.is_at_end() and self.source.startswith("//", start):
+            self.unterminated = True
+        while len(self.error_offsets) < len(self.error_handler.diagnostics):
+            self.error_offsets.append(start)
+
+    def add_token(self, token_type: TokenType, literal=None, lexeme: str = None):
+        self.offsets.append(self.start)
+        self.depths.append(self.depth)
+        super().add_token(token_type, literal, lexeme)
+
+    def string(self):
+        self.watch_end(super().string)
+
+    def skip_comment(self):
+        self.watch_end(super().skip_comment)
+
+    def add_conditional(self):
+        # the tokens of a conditional are scanned up to its ':', which may lie
+        # in a later declaration, so regions must not start or end inside one
+        self.depth += 1
+        self.watch_end(super().add_conditional)
+        self.depth -= 1
+        self.closed = self.current
+
+    def watch_end(self, scan):
+        # a string, comment or conditional that runs into the end of the
+        # region may well be closed by text that follows the region
+        errors = len(self.error_handler.diagnostics)
+        scan()
+        if len(self.error_handler.diagnostics) > errors:
+            self.unterminated = True
+
+
+class Segment:
+    def __init__(self, tokens: list[Token], statement: Stmt, diagnostics: list,
+                 nested: bool = False):
+        self.tokens = tokens
+        self.statement = statement
+        self.diagnostics = diagnostics
+        self.nested = nested
+
+    def shift_lines(self, delta: int):
+        for token in self.tokens:
+            token.line += delta
+        self.diagnostics = [(line + delta, where, message)
+                            for line, where, message in self.diagnostics]
+
+
+class Document:
+    '''
+    A source text kept parsed one top-level declaration at a time. An edit
+    re-scans and re-parses only the declarations it touches, widening the
+    region until the parse of its last declaration is self-contained, and
+    keeps the Token and AST objects of every other declaration.
+    '''
+
+    def __init__(self, source: str):
+        self.source = source
+        self.starts = []
+        self.ends = []
+        self.segments = []
+        self.reparsed = 0
+        starts, ends, segments, _ = self.parse_region(0, len(source), None)
+        self.starts, self.ends, self.segments = starts, ends, segments
+
+    @property
+    def statements(self) -> list[Stmt]:
+        return [segment.statement for segment in self.segments
+                if segment.statement is not None]
+
+    @property
+    def tokens(self) -> list[Token]:
+        tokens = [token for segment in self.segments for token in segment.tokens]
+        tokens.append(Token(TokenType.EOF, "", None,
+                            self.source.count("\n") + 1))
+        return tokens
+
+    @property
+    def diagnostics(self) -> list:
+        return [diagnostic for segment in self.segments
+                for diagnostic in segment.diagnostics]
+
+    @property
+    def had_error(self) -> bool:
+        return any(segment.diagnostics for segment in self.segments)
+
+    def edit(self, start: int, end: int, text: str) -> list[Stmt]:
+        old_source = self.source
+        self.source = old_source[:start] + text + old_source[end:]
+        delta = len(text) - (end - start)
+        count = len(self.segments)
+        # the declaration before the edit is re-parsed too, since its parse
+        # may have looked ahead at the first token the edit changes
+        first = max(0, bisect_left(self.ends, start) - 1)
+        while first > 0 and self.segments[first].nested:
+            first -= 1
+        # an edit before the first declaration re-parses that declaration,
+        # which owns the errors of the text before it
+        last = max(bisect_right(self.starts, end) - 1, first)
+        grow = 1
+        while True:
+            region_start = self.ends[first - 1] if first > 0 else 0
+            at_end = last + 1 >= count
+            if at_end:
+                old_end = len(old_source)
+                follower = None
+            else:
+                old_end = self.starts[last + 1]
+                follower = self.segments[last + 1]
+            starts, ends, segments, clean = self.parse_region(
+                region_start, old_end + delta, follower)
+            if clean or at_end:
+                break
+            last = min(count - 1, last + grow)
+            grow *= 2
+
+        line_delta = (self.source.count("\n", region_start, old_end + delta)
+                      - old_source.count("\n", region_start, old_end))
+        if delta:
+            self.starts[last + 1:] = [offset + delta
+                                      for offset in self.starts[last + 1:]]
+            self.ends[last + 1:] = [offset + delta
+                                    for offset in self.ends[last + 1:]]
+        if line_delta:
+            for segment in self.segments[last + 1:]:
+                segment.shift_lines(line_delta)
+        self.starts[first:last + 1] = starts
+        self.ends[first:last + 1] = ends
+        self.segments[first:last + 1] = segments
+        self.reparsed = len(segments)
+        return [segment.statement for segment in segments
+                if segment.statement is not None]
+
+    def parse_region(self, region_start: int, region_end: int, follower: Segment):
+        handler = DiagnosticHandler()
+        line = self.source.count("\n", 0, region_start) + 1
+        scanner = OffsetScanner(
+            handler, self.source[region_start:region_end], line)
+        tokens = scanner.scan_tokens()
+        offsets = scanner.offsets
+        scan_errors = handler.diagnostics
+        handler.diagnostics = []
+
+        parser = Parser(tokens, handler)
+        starts, ends, segments = [], [], []
+        while not parser.is_at_end():
+            first = parser.current
+            reported = len(handler.diagnostics)
+            statement = parser.declaration()
+            if parser.current == first:
+                parser.advance()
+            last = tokens[parser.current - 1]
+            starts.append(region_start + offsets[first])
+            ends.append(region_start + offsets[parser.current - 1]
+                        + len(last.lexeme))
+            # nested if the declaration, or the gap before it, was scanned
+            # inside a conditional
+            nested = max(scanner.depths[max(first - 1, 0):first + 1]) > 0
+            segments.append(Segment(tokens[first:parser.current], statement,
+                                    handler.diagnostics[reported:], nested))
+
+        # an error between two declarations belongs to the one that follows,
+        # as that is the declaration whose re-parse re-scans the gap
+        if scan_errors and not segments:
+            starts.append(region_start)
+            ends.append(region_end)
+            segments.append(Segment([], None, []))
+        for diagnostic, offset in zip(scan_errors, scanner.error_offsets):
+            owner = min(bisect_right(ends, region_start + offset),
+                        len(segments) - 1)
+            segments[owner].diagnostics.append(diagnostic)
+
+        clean = not scanner.unterminated
+        if segments and segments[-1].diagnostics:
+            clean = False
+        if follower is not None:
+            if follower.nested:
+                clean = False
+            elif follower.tokens and follower.tokens[0].type == TokenType.ELSE:
+                clean = False
+        return starts, ends, segments, clean
@@ -1,20 +1,88 @@
-from msilib.schema import Condition
 import sys
+import copy
+import time
+import threading
 import operator
+try:
+    import resource
+except ImportError:
+    resource = None
 from typing import Any
 from visitor import Visitor
 from environment import Environment
 from tokenType import TokenType
 from tokens import Token
-from error import ParseError, LoxRunTimeError, DivisionByZeroError, BreakException, ReturnException
+from error import RuntimeError, ParseError, LoxRunTimeError, DivisionByZeroError, BudgetExceededError
+from budget import Budget, CHECK_INTERVAL
 from runMode import RunMode
+from hookEvent import HookEvent
 from errorHandler import ErrorHandler
-from stmt import Stmt, Expression, Var, Block, If, While, Break, Print
-from expr import Expr, Assign, BinaryExpr, ConditionalExpr, GroupingExpr, Call, LiteralExpr, LogicalExpr, UnaryExpr, VariableExpr
+from callable import Callable
+from haxeFunction import HaxeFunction, MemoizedFunction
+from native import NativeObject, NativeModule
+from haxeArray import HaxeArray, ArrayClass
+from haxeMap import HaxeMap, StringMap, IntMap, MapClass, map_key, script_key
+from haxeFile import HaxeFile
+from eventLoop import EventLoop, TimerModule, SocketModule
+from haxeThread import ThreadGroup, ThreadModule, HaxeMutex, HaxeLock, HaxeDeque, SyncClass
+from stmt import Stmt, Expression, Var, Block, If, While, Break, Print, Function, Return, Package, Import
+from expr import Expr, Assign, BinaryExpr, ConditionalExpr, GroupingExpr, Call, LiteralExpr, LogicalExpr, UnaryExpr, VariableExpr, ArrayExpr, IndexExpr, SetIndexExpr, GetExpr, HoistedExpr, CommonExpr, SharedExpr
+
+# a HaxePy call takes about a dozen Python frames, so the default limit of
+# 1000 stops recursion 89 calls deep. Recursion through C code, such as a
+# sort comparator or printing a nested array, also takes C stack, up to
+# about 700 bytes a frame on Python 3.10, so the limit is only raised as
+# far as the stack allows
+RECURSION_LIMIT = 100_000
+FRAME_STACK = 1024
+STACK_SIZE = RECURSION_LIMIT * FRAME_STACK
+
+
+def deepen_stack():
+    '''
+    Gives the main thread, and threads started from now on, a stack of
+    STACK_SIZE and raises the recursion limit to what that stack holds.
+    Both are process-wide, so this is left to the program that owns the
+    process, and is called once from its main thread before scripts run.
+    '''
+    stack = STACK_SIZE
+    if resource is not None:
+        soft, hard = resource.getrlimit(resource.RLIMIT_STACK)
+        if soft != resource.RLIM_INFINITY and soft < STACK_SIZE:
+            soft = STACK_SIZE if hard == resource.RLIM_INFINITY else min(hard, STACK_SIZE)
+            resource.setrlimit(resource.RLIMIT_STACK, (soft, hard))
+        if soft != resource.RLIM_INFINITY:
+            stack = soft
+    threading.stack_size(STACK_SIZE)
+    limit = min(RECURSION_LIMIT, stack // FRAME_STACK)
+    if sys.getrecursionlimit() < limit:
+        sys.setrecursionlimit(limit)
+
+
+class Sentinel:
+    # a marker value that pickles by reference, so it is still the same
+    # object after a snapshot is restored
+    def __init__(self, name: str):
+        self.name = name
+
+    def __reduce__(self):
+        return self.name
 
 
 class Interpreter(Visitor):
-    unititialized = object()
+    # slots rather than an instance dict, so that switching __class__ to and
+    # from TracingInterpreter leaves attribute access just as fast
+    __slots__ = ("error_handler", "output", "globals", "environment", "return_value",
+                 "memoized", "events", "hooks", "current", "natives",
+                 "budget", "countdown", "period", "steps", "depth", "max_depth", "deadline",
+                 "hoisted", "shared", "threads", "checked")
+    unititialized = Sentinel("Interpreter.unititialized")
+    # statements return None to carry on, or one of these to unwind the
+    # enclosing loop or function
+    breaking = object()
+    returning = object()
+    # a hoisted or shared expression not yet computed
+    uncomputed = object()
     op_dic = {
         TokenType.LESS: operator.lt,
         TokenType.LESS_EQUAL: operator.le,
@@ -23,81 +91,344 @@ class Interpreter(Visitor):
         TokenType.MINUS: operator.sub,
         TokenType.SLASH: operator.truediv,
         TokenType.STAR: operator.mul,
-        TokenType.EQUAL_EQUAL: operator.eq,
-        TokenType.BANG_EQUAL: operator.ne,
     }
 
-    def __init__(self, error_handler: ErrorHandler):
+    def __init__(self, error_handler: ErrorHandler, output=None, system: bool = True):
+        # system gives scripts the sys package: files, sockets and threads
         self.error_handler = error_handler
+        self.output = output if output is not None else sys.stdout
         self.globals = {}
         self.environment = None
         # self.globals['clock'] = Clock()
         # self.globals['read'] = Read()
-        # self.globals['array'] = Array()
-        self.locals = {}
-        self.slots = {}
+        self.define_natives(system)
+        self.return_value = None
+        self.memoized = {}
+        self.events = None
+        self.hooks = []
+        self.current = None
+        self.hoisted = None
+        self.shared = None
+        self.threads = None
+        # the last callee whose arity was checked at each call site; kept
+        # here rather than on the node, so a program shared between runs
+        # holds on to no run's functions
+        self.checked = {}
+        self.set_budget(None)
+
+    def define_natives(self, system: bool):
+        self.natives = {}
+        self.natives['Array'] = ArrayClass()
+        self.natives['Map'] = MapClass(HaxeMap)
+        self.natives['StringMap'] = MapClass(StringMap)
+        self.natives['IntMap'] = MapClass(IntMap)
+        if system:
+            self.natives['sys'] = NativeModule("sys", {
+                "io": NativeModule("sys.io", {"File": HaxeFile()}),
+                "net": NativeModule("sys.net", {"Socket": SocketModule()}),
+                "thread": NativeModule("sys.thread", {
+                    "Thread": ThreadModule(),
+                    "Mutex": SyncClass(HaxeMutex),
+                    "Lock": SyncClass(HaxeLock),
+                    "Deque": SyncClass(HaxeDeque),
+                }),
+            })
+        self.natives['haxe'] = NativeModule("haxe", {"Timer": TimerModule()})
+        self.globals.update(self.natives)
+
+    def add_hook(self, hook):
+        # hook(event, token, value) is called for every HookEvent. While any
+        # hook is registered the interpreter runs as a TracingInterpreter, so
+        # the plain execute and evaluate never check for hooks
+        self.hooks.append(hook)
+        self.__class__ = TracingInterpreter
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+        if not self.hooks:
+            self.__class__ = Interpreter
+
+    def fork(self) -> "Interpreter":
+        # an interpreter for another thread: the globals and memo caches are
+        # shared, the environment and event loop are its own, and it writes
+        # through the run's thread group
+        if self.threads is None:
+            self.threads = ThreadGroup(self.output, self.error_handler)
+        child = copy.copy(self)
+        child.output = self.threads
+        child.error_handler = self.threads.error_handler
+        child.environment = None
+        child.return_value = None
+        child.events = None
+        child.hoisted = None
+        child.shared = None
+        return child
+
+    def event_loop(self) -> EventLoop:
+        if self.events is None:
+            self.events = EventLoop(self)
+        return self.events
+
+    def close_events(self):
+        if self.events is not None:
+            self.events.close()
+            self.events = None
+
+    def reset(self):
+        # natives keep no state between runs, so they are built once and only
+        # the globals are restored; hooks belong to the run that added them
+        self.close_events()
+        self.close_threads()
+        self.globals = dict(self.natives)
+        self.environment = None
+        self.return_value = None
+        self.memoized = {}
+        self.checked = {}
+        self.hooks = []
+        self.current = None
+        self.__class__ = Interpreter
+        self.error_handler.reset()
+
+    def set_budget(self, budget: Budget):
+        self.budget = budget if budget is not None else Budget()
+        self.max_depth = self.budget.max_depth or sys.maxsize
+        self.start_budget()
+
+    def start_budget(self):
+        self.steps = 0
+        self.depth = 0
+        self.period = self.countdown = self.next_check()
+        if self.budget.max_time is not None:
+            self.deadline = time.perf_counter() + self.budget.max_time
+
+    def next_check(self) -> int:
+        if self.budget.max_steps is not None:
+            return max(1, min(CHECK_INTERVAL, self.budget.max_steps + 1 - self.steps))
+        if self.budget.max_time is not None:
+            return CHECK_INTERVAL
+        return sys.maxsize
+
+    def check_budget(self, token: Token):
+        # called when the countdown, decremented at every loop iteration and
+        # call, runs out, so the limits cost one decrement per step
+        self.steps += self.period - self.countdown
+        budget = self.budget
+        if budget.max_steps is not None and self.steps > budget.max_steps:
+            raise BudgetExceededError(
+                token, f"Execution budget of {budget.max_steps} steps exceeded.")
+        if budget.max_time is not None and time.perf_counter() > self.deadline:
+            raise self.out_of_time(token)
+        self.period = self.countdown = self.next_check()
+
+    def time_left(self, token: Token) -> float:
+        # how long a blocking wait may take, None without a time limit;
+        # raises once the limit is up
+        if self.budget.max_time is None:
+            return None
+        left = self.deadline - time.perf_counter()
+        if left <= 0:
+            raise self.out_of_time(token)
+        return left
+
+    def out_of_time(self, token: Token) -> BudgetExceededError:
+        return BudgetExceededError(
+            token, f"Execution time limit of {self.budget.max_time} seconds exceeded.")
 
     def interpret(self, statements: list[Stmt], mode: RunMode):
+        self.start_budget()
         try:
             for statement in statements:
-                self.executeByMode(statement, mode)
-        except ParseError as e:
-            self.error_handler.error(e.token, e.message)
+                try:
+                    self.executeByMode(statement, mode)
+                except RecursionError:
+                    # recursion through natives, such as printing a deeply
+                    # nested array, which no call expression caught
+                    line = statement.start.line if statement.start is not None else 0
+                    raise LoxRunTimeError(Token(TokenType.EOF, "", None, line),
+                                          "Stack overflow.") from None
+            if self.events is not None:
+                self.events.drain()
+        except RuntimeError as error:
+            self.close_events()
+            self.error_handler.runtime_error(error)
+        finally:
+            self.close_threads()
+
+    def close_threads(self):
+        # as in Haxe, a run ends when its own statements do, and the threads
+        # it started are cut off from its output rather than waited for
+        if self.threads is not None:
+            self.threads.close()
+            self.threads = None
 
     def visit_print_stmt(self, stmt: Print):
         value = self.evaluate(stmt.expression)
-        print(value)
+        self.output.write(self.stringify(value) + "\n")
 
     def executeByMode(self, statement: Stmt, mode: RunMode):
         if mode == RunMode.REPL and type(statement) == Expression and type(statement.expression) is not Assign:
-            value = self.evaluate(statement.expr)
-            print(self.stringify(value))
+            value = self.evaluate(statement.expression)
+            self.output.write(self.stringify(value) + "\n")
         else:
             self.execute(statement)
 
     def execute(self, statement: Stmt):
-        statement.accept(self)
-
-    def resolve(self, expr: Expr, depth: int, slot: int):
-        self.locals[expr] = depth
-        self.slots[expr] = slot
+        return statement.accept(self)
 
     def visit_var_stmt(self, stmt: Var):
         value = Interpreter.unititialized
         if stmt.initializer is not None:
             value = self.evaluate(stmt.initializer)
-        self.define(stmt.name.lexeme, value)
+        self.define(stmt.name.lexeme, stmt.slot, value)
+
+    def visit_function_stmt(self, stmt: Function):
+        if stmt.memo_size is None:
+            function = HaxeFunction(stmt, self.environment)
+        else:
+            function = MemoizedFunction(stmt, self.environment, stmt.memo_size)
+            self.memoized[stmt] = function
+        self.define(stmt.name.lexeme, stmt.slot, function)
+
+    def memo_stats(self) -> dict[str, dict]:
+        # the most recently declared instance of each memoized function
+        return {stmt.name.lexeme: function.stats()
+                for stmt, function in self.memoized.items()}
 
     def visit_expression_stmt(self, stmt: Expression):
         expr = self.evaluate(stmt.expression)
 
     def visit_block_stmt(self, stmt: Block):
-        self.execute_block(stmt.statements, Environment(self.environment))
+        return self.execute_block(stmt.statements,
+                                  Environment(self.environment, [None] * stmt.slot_count))
 
     def visit_if_stmt(self, stmt: If):
         if self.is_truthy(self.evaluate(stmt.condition)):
-            self.execute(stmt.then_branch)
+            return self.execute(stmt.then_branch)
         elif stmt.else_branch is not None:
-            self.execute(stmt.else_branch)
+            return self.execute(stmt.else_branch)
 
     def visit_while_stmt(self, stmt: While):
+        if not stmt.hoisted:
+            return self.loop(stmt)
+        # each run of the loop computes its invariant expressions afresh
+        hoisted = self.hoisted
+        self.hoisted = [Interpreter.uncomputed] * stmt.hoisted
         try:
-            while self.is_truthy(self.evaluate(stmt.condition)):
-                self.execute(stmt.body)
-        except ParseError as e:
-            self.error_handler.error(e.token, e.message)
+            return self.loop(stmt)
+        finally:
+            self.hoisted = hoisted
+
+    def loop(self, stmt: While):
+        while self.is_truthy(self.evaluate(stmt.condition)):
+            signal = self.execute(stmt.body)
+            if signal is not None:
+                if signal is Interpreter.breaking:
+                    break
+                return signal
+            self.countdown -= 1
+            if self.countdown <= 0:
+                self.check_budget(stmt.start)
 
     def visit_break_stmt(self, stmt: Break):
-        raise Break()
+        return Interpreter.breaking
+
+    def visit_package_stmt(self, stmt: Package):
+        pass
+
+    def visit_import_stmt(self, stmt: Import):
+        # imported modules are linked into the program and run before it
+        pass
+
+    def visit_return_stmt(self, stmt: Return):
+        value = None
+        if stmt.value is not None:
+            value = self.evaluate(stmt.value)
+        self.return_value = value
+        return Interpreter.returning
 
     def visit_variable_expr(self, expr: VariableExpr):
         return self.look_up_variable(expr.name, expr)
 
+    def visit_call_expr(self, expr: Call):
+        callee = self.evaluate(expr.callee)
+        arguments = [self.evaluate(argument) for argument in expr.args]
+        if self.checked.get(expr) is not callee:
+            self.check_callable(expr.paren, callee, arguments)
+            self.checked[expr] = callee
+        self.countdown -= 1
+        if self.countdown <= 0:
+            self.check_budget(expr.paren)
+        if self.depth >= self.max_depth:
+            raise BudgetExceededError(
+                expr.paren, f"Call depth limit of {self.max_depth} exceeded.")
+        # a runtime error ends the whole run, and start_budget resets the
+        # depth for the next one, so the depth needs no finally clause
+        self.depth += 1
+        try:
+            value = callee.call(self, arguments)
+        except RecursionError:
+            raise LoxRunTimeError(expr.paren, "Stack overflow.") from None
+        self.depth -= 1
+        return value
+
+    def call_function(self, token: Token, function: Callable, arguments: list[Any]) -> Any:
+        # a call made by a native, such as an array's map or an event
+        # callback, charged to the budget like a call expression
+        self.countdown -= 1
+        if self.countdown <= 0:
+            self.check_budget(token)
+        if self.depth >= self.max_depth:
+            raise BudgetExceededError(token, f"Call depth limit of {self.max_depth} exceeded.")
+        self.depth += 1
+        try:
+            value = function.call(self, arguments)
+        except RecursionError:
+            raise LoxRunTimeError(token, "Stack overflow.") from None
+        self.depth -= 1
+        return value
+
+    def visit_array_expr(self, expr: ArrayExpr):
+        return HaxeArray([self.evaluate(element) for element in expr.elements])
+
+    def visit_index_expr(self, expr: IndexExpr):
+        array = self.evaluate(expr.object)
+        index = self.evaluate(expr.index)
+        if type(array) is HaxeArray:
+            if type(index) is not int:
+                index = self.to_index(expr.bracket, index)
+            items = array.items
+            if 0 <= index < len(items):
+                return items[index]
+            return None
+        if isinstance(array, HaxeMap):
+            return array.entries.get(map_key(index))
+        raise LoxRunTimeError(expr.bracket, "Only arrays and maps can be indexed.")
+
+    def visit_set_index_expr(self, expr: SetIndexExpr):
+        array = self.evaluate(expr.object)
+        index = self.evaluate(expr.index)
+        value = self.evaluate(expr.value)
+        if type(array) is HaxeArray:
+            index = self.to_index(expr.bracket, index)
+            if index < 0:
+                raise LoxRunTimeError(expr.bracket, "Array index must not be negative.")
+            array.set_item(index, value)
+            return value
+        if isinstance(array, HaxeMap):
+            array.set(self, expr.bracket, index, value)
+            return value
+        raise LoxRunTimeError(expr.bracket, "Only arrays and maps can be indexed.")
+
+    def visit_get_expr(self, expr: GetExpr):
+        object = self.evaluate(expr.object)
+        if isinstance(object, NativeObject):
+            return object.get(expr.name)
+        raise LoxRunTimeError(expr.name, "Only objects have properties.")
+
     def visit_assign_expr(self, expr: Assign):
         value = self.evaluate(expr.value)
-        if expr in self.locals:
-            self.environment.assign_at(
-                self.locals[expr], self.slots[expr], value)
+        if expr.depth is not None:
+            self.environment.assign_at(expr.depth, expr.slot, value)
         else:
             if expr.name.lexeme in self.globals:
                 self.globals[expr.name.lexeme] = value
@@ -109,12 +440,33 @@ class Interpreter(Visitor):
     def visit_literal_expr(self, expr: Expr):
         return expr.value
 
+    def visit_hoisted_expr(self, expr: HoistedExpr):
+        value = self.hoisted[expr.index]
+        if value is Interpreter.uncomputed:
+            value = self.hoisted[expr.index] = self.evaluate(expr.expression)
+        return value
+
+    def visit_common_expr(self, expr: CommonExpr):
+        shared = self.shared
+        self.shared = [Interpreter.uncomputed] * expr.count
+        try:
+            return self.evaluate(expr.expression)
+        finally:
+            self.shared = shared
+
+    def visit_shared_expr(self, expr: SharedExpr):
+        value = self.shared[expr.index]
+        if value is Interpreter.uncomputed:
+            value = self.shared[expr.index] = self.evaluate(expr.expression)
+        return value
+
     def visit_grouping_expr(self, expr: GroupingExpr):
         return self.evaluate(expr.expression)
 
     def visit_unary_expr(self, expr: UnaryExpr):
         right = self.evaluate(expr.right)
         if expr.operator.type == TokenType.MINUS:
+            self.check_number_operand(expr.operator, right)
             value = -float(right)
             value = int(value) if value.is_integer() else value
             return value
@@ -154,6 +506,10 @@ class Interpreter(Visitor):
                 return value
             raise LoxRunTimeError(
                 expr.operator, "Operands must either strings or numbers.")
+        elif expr.operator.type == TokenType.EQUAL_EQUAL:
+            return self.is_equal(left, right)
+        elif expr.operator.type == TokenType.BANG_EQUAL:
+            return not self.is_equal(left, right)
         elif expr.operator.type in Interpreter.op_dic:
             op_func = Interpreter.op_dic[expr.operator.type]
             self.check_comparison_operands(expr.operator, left, right)
@@ -184,7 +540,9 @@ class Interpreter(Visitor):
         try:
             self.environment = environment
             for statement in statements:
-                self.execute(statement)
+                signal = self.execute(statement)
+                if signal is not None:
+                    return signal
         finally:
             self.environment = previous
 
@@ -199,14 +557,16 @@ class Interpreter(Visitor):
         return True
 
     def look_up_variable(self, name: Token, expr: Expr):
-        if expr in self.locals:
-            value = self.environment.get_at(
-                self.locals[expr], self.slots[expr])
-        elif name.lexeme in self.globals:
-            value = self.globals[name.lexeme]
+        if expr.depth == 0:
+            value = self.environment.vars[expr.slot]
+        elif expr.depth is not None:
+            value = self.environment.get_at(expr.depth, expr.slot)
         else:
-            raise LoxRunTimeError(name, f"Undefined variable {name.lexeme}.")
-        if value == Interpreter.unititialized:
+            try:
+                value = self.globals[name.lexeme]
+            except KeyError:
+                raise LoxRunTimeError(name, f"Undefined variable {name.lexeme}.") from None
+        if value is Interpreter.unititialized:
             raise LoxRunTimeError(
                 name, f"Variable {name.lexeme} is not initialized.")
         return value
@@ -216,9 +576,21 @@ class Interpreter(Visitor):
             if type(arg) is not float and type(arg) is not int:
                 raise LoxRunTimeError(operator, "Operand must be a number.")
 
+    def to_index(self, token: Token, index: Any) -> int:
+        if type(index) is int:
+            return index
+        if type(index) is float and index.is_integer():
+            return int(index)
+        raise LoxRunTimeError(token, "Index must be a whole number.")
+
     def stringify(self, value: any) -> str:
         if value is None:
             return "nil"
+        if type(value) is HaxeArray:
+            return "[" + ",".join(map(self.stringify, value.items)) + "]"
+        if isinstance(value, HaxeMap):
+            return "{" + ", ".join(f"{self.stringify(script_key(key))} => {self.stringify(item)}"
+                                   for key, item in value.entries.items()) + "}"
         if type(value) is float:
             text = str(value)
             if text.endswith(".0") or value.is_integer():
@@ -232,12 +604,26 @@ class Interpreter(Visitor):
             return False
         return True
 
-    def define(self, name: str, value: Any):
-        if self.environment is not None:
-            self.environment.define(value)
+    def define(self, name: str, slot: int, value: Any):
+        if slot is not None:
+            self.environment.vars[slot] = value
         else:
             self.globals[name] = value
 
+    def check_callable(self, paren: Token, callee: Any, arguments: list[Any]):
+        if not isinstance(callee, Callable):
+            raise LoxRunTimeError(paren, "Can only call functions.")
+        if len(arguments) != callee.arity():
+            raise LoxRunTimeError(
+                paren, f"Expected {callee.arity()} arguments but got {len(arguments)}.")
+
+    def is_equal(self, left, right) -> bool:
+        # nil equals only nil and values of different kinds are never equal;
+        # python alone would have true == 1 and false == 0
+        if type(left) is bool or type(right) is bool:
+            return left is right
+        return left == right
+
     def check_comparison_operands(self, operator: Token, *args):
         all_string = True
         all_num = True
@@ -249,3 +635,52 @@ class Interpreter(Visitor):
         if all_string == False and all_num == False:
             raise LoxRunTimeError(
                 operator, "Operands must be strings or numbers.")
+
+
+class TracingInterpreter(Interpreter):
+    # the execution mode swapped in by add_hook; expressions without a token
+    # of their own report the first token of the statement they are in
+    __slots__ = ()
+
+    def emit(self, event: HookEvent, token: Token, value: Any):
+        for hook in self.hooks:
+            hook(event, token, value)
+
+    def execute(self, statement: Stmt):
+        previous = self.current
+        if statement.start is not None:
+            self.current = statement.start
+        try:
+            self.emit(HookEvent.STATEMENT, self.current, statement)
+            return statement.accept(self)
+        except RuntimeError as error:
+            if not getattr(error, "traced", False):
+                error.traced = True
+                self.emit(HookEvent.RUNTIME_ERROR, error.token, error)
+            raise
+        finally:
+            self.current = previous
+
+    def evaluate(self, expr: Expr):
+        value = expr.accept(self)
+        for name in ("operator", "name", "paren", "bracket"):
+            token = getattr(expr, name, None)
+            if type(token) is Token:
+                break
+        else:
+            token = self.current
+        self.emit(HookEvent.EXPRESSION, token, value)
+        return value
+
+    def visit_var_stmt(self, stmt: Var):
+        super().visit_var_stmt(stmt)
+        if stmt.slot is None:
+            value = self.globals[stmt.name.lexeme]
+        else:
+            value = self.environment.vars[stmt.slot]
+        self.emit(HookEvent.VARIABLE_WRITE, stmt.name, value)
+
+    def visit_assign_expr(self, expr: Assign):
+        value = super().visit_assign_expr(expr)
+        self.emit(HookEvent.VARIABLE_WRITE, expr.name, value)
+        return value
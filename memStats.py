@@ -0,0 +1,103 @@
+import json
+import tracemalloc
+from typing import Any
+from environment import Environment
+from interpreter import Interpreter
+from scanner import Scanner
+from parser import Parser
+from resolver import Resolver
+from runMode import RunMode
+from program import Program
+from moduleGraph import link_imports
+from stmt import Stmt, Metadata
+from expr import Expr
+
+
+def count_nodes(statements: list[Stmt]) -> int:
+    count = 0
+    pending = list(statements)
+    while pending:
+        node = pending.pop()
+        if isinstance(node, list):
+            pending.extend(node)
+        elif isinstance(node, (Stmt, Expr, Metadata)):
+            count += 1
+            pending.extend(vars(node).values())
+    return count
+
+
+class MemoryStats:
+    '''
+    Runs a script one phase at a time under tracemalloc, recording the peak
+    and the retained memory of each phase, how many tokens, AST nodes and
+    environments were created, and how deep the environment chain got.
+    '''
+
+    def __init__(self):
+        self.phases = {}
+        self.counts = {}
+
+    def measure(self, phase: str, function, *args) -> Any:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        result = function(*args)
+        current, peak = tracemalloc.get_traced_memory()
+        self.phases[phase] = {"peak": peak - before, "retained": current - before}
+        return result
+
+    def run(self, source: str, interpreter: Interpreter, path: str = "<prompt>",
+            class_path: str = None):
+        error_handler = interpreter.error_handler
+        tracemalloc.start()
+        try:
+            scanner = Scanner(error_handler, source)
+            tokens = self.measure("scan", scanner.scan_tokens)
+            self.counts["tokens"] = len(tokens)
+            self.counts["symbols"] = len(scanner.symbols)
+            statements = self.measure("parse", Parser(tokens, error_handler).parse)
+            self.counts["ast_nodes"] = count_nodes(statements)
+            if error_handler.had_error:
+                return
+            self.measure("resolve", Resolver(error_handler).resolve, statements)
+            if error_handler.had_error:
+                return
+            program = self.measure("link", link_imports, Program(statements), path,
+                                   error_handler, class_path)
+            if program is None:
+                return
+            self.count_environments(interpreter.interpret, program.statements, RunMode.FILE)
+        finally:
+            tracemalloc.stop()
+
+    def count_environments(self, interpret, *args):
+        # Environment.__init__ is wrapped only for the interpret phase, so
+        # other runs pay nothing for the count
+        created = 0
+        max_depth = 0
+        init = Environment.__init__
+
+        def counting_init(environment, enclosing=None, vars=None):
+            nonlocal created, max_depth
+            init(environment, enclosing, vars)
+            environment.depth = getattr(enclosing, "depth", 0) + 1
+            created += 1
+            max_depth = max(max_depth, environment.depth)
+
+        Environment.__init__ = counting_init
+        try:
+            self.measure("interpret", interpret, *args)
+        finally:
+            Environment.__init__ = init
+        self.counts["environments"] = created
+        self.counts["max_environment_depth"] = max_depth
+
+    def report(self, format: str = "text") -> str:
+        if format == "json":
+            return json.dumps({"phases": self.phases, "counts": self.counts}, indent=2)
+        lines = ["phase        peak KiB  retained KiB"]
+        for phase, memory in self.phases.items():
+            lines.append(f"{phase:<10}{memory['peak'] / 1024:11.1f}"
+                         f"{memory['retained'] / 1024:14.1f}")
+        for name, count in self.counts.items():
+            lines.append(f"{name.replace('_', ' ')}: {count:,}")
+        return "\n".join(lines)
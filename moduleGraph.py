@@ -0,0 +1,175 @@
+import io
+import os
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from errorHandler import ErrorHandler
+from program import Program
+from programImage import MAGIC, ImageError, ProgramImage, write_image
+from stmt import Stmt, Package, Import
+
+CACHE_DIR = ".haxepy_cache"
+
+
+def imports(statements: list[Stmt]) -> list[Import]:
+    return [statement for statement in statements if type(statement) is Import]
+
+
+def module_file(class_path: str, name: str) -> str:
+    return os.path.join(class_path, *name.split(".")) + ".hx"
+
+
+def cache_file(cache_dir: str, source: bytes) -> str:
+    # keyed by the source and the image format, so a module is compiled
+    # again only when its own text changes
+    return os.path.join(cache_dir, hashlib.sha256(MAGIC + source).hexdigest() + ".hxi")
+
+
+def compile_module(source: bytes, image_path: str) -> str:
+    # runs in a worker process and returns the compile errors, if any
+    output = io.StringIO()
+    program = Program.compile(source.decode("utf-8"), ErrorHandler(output))
+    if program is not None:
+        temporary = f"{image_path}.{os.getpid()}"
+        write_image(program, temporary)
+        os.replace(temporary, image_path)
+    return output.getvalue()
+
+
+class ModuleGraph:
+    '''
+    The modules a program imports, found by following import declarations
+    from a class path where module a.b.C is the file a/b/C.hx. Each module
+    is compiled on its own to a program image in the cache directory, so a
+    change to one module recompiles only that module. Names are looked up
+    at run time, so a module's compiled form never depends on what it
+    imports. The modules missing from the cache are compiled concurrently
+    in a process pool, one wave of newly found imports at a time.
+    '''
+
+    def __init__(self, class_path: str, error_handler: ErrorHandler,
+                 cache_dir: str = None, jobs: int = None):
+        self.class_path = class_path
+        self.cache_dir = cache_dir or os.path.join(class_path, CACHE_DIR)
+        self.error_handler = error_handler
+        self.jobs = jobs
+        self.executor = None
+        # module name to its program, or None if it failed to load
+        self.modules = {}
+        # module name to the image it was loaded from
+        self.images = {}
+        self.compiled = 0
+
+    @classmethod
+    def for_script(cls, path: str, error_handler: ErrorHandler, class_path: str = None,
+                   jobs: int = None) -> "ModuleGraph":
+        # without a class path, modules are found next to the script
+        class_path = class_path or os.path.dirname(os.path.abspath(path))
+        return cls(class_path, error_handler, jobs=jobs)
+
+    def link(self, program: Program, name: str) -> Program:
+        '''
+        Returns the program preceded by the modules it imports, each
+        module after its own imports and each run once. Import cycles are
+        allowed; a module is not run again while its imports run.
+        '''
+        try:
+            self.load({statement.path: (name, statement)
+                       for statement in imports(program.statements)})
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+        if self.error_handler.had_error:
+            return None
+        statements = []
+        self.add_imports(program.statements, statements, set())
+        statements.extend(program.statements)
+        return Program(statements)
+
+    def add_imports(self, statements: list[Stmt], linked: list[Stmt], seen: set[str]):
+        for statement in imports(statements):
+            if statement.path not in seen:
+                seen.add(statement.path)
+                module = self.modules[statement.path].statements
+                self.add_imports(module, linked, seen)
+                linked.extend(module)
+
+    def load(self, pending: dict[str, tuple[str, Import]]):
+        while pending:
+            images = {}
+            stale = []
+            for name, (importer, statement) in pending.items():
+                self.modules[name] = None
+                try:
+                    with open(module_file(self.class_path, name), 'rb') as file:
+                        source = file.read()
+                except OSError:
+                    self.error_handler.report(statement.keyword.line, f" in {importer}",
+                                              f"Module '{name}' not found.")
+                    continue
+                images[name] = self.images[name] = cache_file(self.cache_dir, source)
+                if not os.path.exists(images[name]):
+                    stale.append((name, source, images[name]))
+            for name, errors in zip([name for name, _, _ in stale], self.compile(stale)):
+                if errors:
+                    print(f"In module {name}:\n{errors}", end="", file=self.error_handler.output)
+                    self.error_handler.had_error = True
+                    del images[name]
+            found = {}
+            for name, image in images.items():
+                try:
+                    program = ProgramImage(image).program()
+                except (OSError, ImageError) as error:
+                    self.error_handler.report(0, f" in {name}", str(error))
+                    continue
+                if self.check_package(name, program):
+                    self.modules[name] = program
+                for statement in imports(program.statements):
+                    if statement.path not in self.modules and statement.path not in found:
+                        found[statement.path] = (name, statement)
+            pending = found
+
+    def compile(self, stale: list[tuple[str, bytes, str]]) -> list[str]:
+        if not stale:
+            return []
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.compiled += len(stale)
+        _, sources, images = zip(*stale)
+        if len(stale) == 1 or self.jobs == 1:
+            return list(map(compile_module, sources, images))
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(self.jobs)
+        return list(self.executor.map(compile_module, sources, images))
+
+    def unchanged(self, images: dict[str, str]) -> bool:
+        # whether every module still has the source its image was built from
+        for name, image in images.items():
+            try:
+                with open(module_file(self.class_path, name), 'rb') as file:
+                    source = file.read()
+            except OSError:
+                return False
+            if cache_file(self.cache_dir, source) != image:
+                return False
+        return True
+
+    def check_package(self, name: str, program: Program) -> bool:
+        expected = name.rpartition(".")[0]
+        declared = [statement for statement in program.statements
+                    if type(statement) is Package]
+        path = declared[0].path if declared else ""
+        if path != expected:
+            line = declared[0].keyword.line if declared else 1
+            self.error_handler.report(line, f" in {name}",
+                                      f"Module '{name}' must be in package '{expected}'.")
+            return False
+        return True
+
+
+def link_imports(program: Program, path: str, error_handler: ErrorHandler,
+                 class_path: str = None, jobs: int = None) -> Program:
+    # programs without imports are returned as they are
+    if program is None or not imports(program.statements):
+        return program
+    graph = ModuleGraph.for_script(path, error_handler, class_path, jobs)
+    return graph.link(program, os.path.basename(path))
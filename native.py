@@ -1,5 +1,6 @@
 import time
 from typing import List, Any
+from collections.abc import Callable as PyCallable
 from abc import ABC, abstractmethod
 from callable import Callable
 from tokens import Token
@@ -10,7 +11,55 @@ class Print(Callable):
     def call(self, interpreter, arguments: list[Any]):
         message = arguments[0]
         message = interpreter.stringify(message)
-        print(message)
+        interpreter.output.write(message + "\n")
 
     def arity(self):
         return 1
+
+
+class NativeMethod(Callable):
+    # a method of a native object, bound to the object and to the name token
+    # it was looked up with so it can report runtime errors at that token
+    def __init__(self, function: PyCallable, count: int, token: Token):
+        self.function = function
+        self.count = count
+        self.token = token
+
+    def call(self, interpreter, arguments: list[Any]):
+        return self.function(interpreter, self.token, *arguments)
+
+    def arity(self):
+        return self.count
+
+    def __str__(self):
+        return f"<native method {self.token.lexeme}>"
+
+
+class NativeObject:
+    # maps a Haxe method name to the name and arity of the python method
+    # implementing it
+    methods = {}
+
+    def get(self, name: Token):
+        method = self.methods.get(name.lexeme)
+        if method is None:
+            return self.get_property(name)
+        return NativeMethod(getattr(self, method[0]), method[1], name)
+
+    def get_property(self, name: Token):
+        raise LoxRunTimeError(name, f"Undefined property '{name.lexeme}'.")
+
+
+class NativeModule(NativeObject):
+    # a package or class of natives, such as sys.io or sys.io.File
+    def __init__(self, name: str, members: dict[str, Any]):
+        self.name = name
+        self.members = members
+
+    def get_property(self, name: Token):
+        if name.lexeme in self.members:
+            return self.members[name.lexeme]
+        return super().get_property(name)
+
+    def __str__(self):
+        return f"<module {self.name}>"
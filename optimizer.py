@@ -0,0 +1,280 @@
+from collections import Counter
+from typing import Any
+from tokenType import TokenType
+from stmt import Stmt, Expression, Var, Block, If, While, Print, Function, Return
+from expr import Expr, Assign, BinaryExpr, ConditionalExpr, GroupingExpr, Call, LiteralExpr, \
+    LogicalExpr, UnaryExpr, VariableExpr, SetIndexExpr, HoistedExpr, CommonExpr, SharedExpr
+
+# operators whose result comes from the values of their operands alone;
+# + and == may also read the contents of an array or map
+ARITHMETIC = {TokenType.MINUS, TokenType.STAR, TokenType.SLASH}
+CONTENT_OPERATORS = {TokenType.PLUS, TokenType.EQUAL_EQUAL, TokenType.BANG_EQUAL}
+
+
+def walk(node: Any):
+    # every statement and expression under the node, the node included
+    pending = [node]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, (list, tuple)):
+            pending.extend(node)
+        elif isinstance(node, (Stmt, Expr)):
+            yield node
+            pending.extend(value for value in vars(node).values()
+                           if isinstance(value, (Stmt, Expr, list)))
+
+
+def children(node: Any) -> list[tuple[Any, Any, Expr]]:
+    # (container, key, expression) for each expression directly under the
+    # node, where container[key] or setattr(container, key) replaces it
+    found = []
+    for name, value in vars(node).items():
+        if isinstance(value, Expr):
+            found.append((node, name, value))
+        elif isinstance(value, list):
+            found.extend((value, i, item) for i, item in enumerate(value)
+                         if isinstance(item, Expr))
+    return found
+
+
+def replace(container: Any, key: Any, expr: Expr):
+    if isinstance(container, list):
+        container[key] = expr
+    else:
+        setattr(container, key, expr)
+
+
+def describe(expr: Expr) -> str:
+    if isinstance(expr, (HoistedExpr, SharedExpr, CommonExpr)):
+        return describe(expr.expression)
+    if isinstance(expr, (BinaryExpr, LogicalExpr)):
+        return f"{describe(expr.left)} {expr.operator.lexeme} {describe(expr.right)}"
+    if isinstance(expr, UnaryExpr):
+        return f"{expr.operator.lexeme}{describe(expr.right)}"
+    if isinstance(expr, GroupingExpr):
+        return f"({describe(expr.expression)})"
+    if isinstance(expr, ConditionalExpr):
+        return (f"{describe(expr.condition)} ? {describe(expr.then_branch)}"
+                f" : {describe(expr.else_branch)}")
+    if isinstance(expr, VariableExpr):
+        return expr.name.lexeme
+    if isinstance(expr, LiteralExpr):
+        if isinstance(expr.value, float) and expr.value.is_integer():
+            return str(int(expr.value))
+        if isinstance(expr.value, str):
+            return f'"{expr.value}"'
+        if isinstance(expr.value, bool):
+            return "true" if expr.value else "false"
+        return "nil" if expr.value is None else str(expr.value)
+    return type(expr).__name__
+
+
+class Loop:
+    # what a loop, its nested loops and functions included, may change
+    def __init__(self, stmt: While):
+        self.assigned = set()
+        self.declared = set()
+        self.calls = False
+        for node in walk([stmt.condition, stmt.body]):
+            if isinstance(node, Assign):
+                self.assigned.add(node.name.lexeme)
+            elif isinstance(node, Var):
+                self.declared.add(node.name.lexeme)
+            elif isinstance(node, Function):
+                self.declared.add(node.name.lexeme)
+                self.declared.update(param.lexeme for param in node.params)
+            elif isinstance(node, (Call, SetIndexExpr)):
+                self.calls = True
+
+
+class Optimizer:
+    '''
+    Rewrites a resolved program. An expression in a while loop whose
+    operands the loop can't change becomes a HoistedExpr, computed once per
+    run of the loop; equal subexpressions of one statement become
+    SharedExprs, computed once per evaluation of the statement. Either is
+    computed where the original program first evaluated it, so errors such
+    as a division by zero are raised at the same point and in the same
+    order as before, and not at all if it was never evaluated.
+
+    Globals, and locals a function assigns, may be changed at any time by
+    the script's threads, so no loop hoists an expression that reads one.
+    A loop that makes calls or sets an element may change the contents of
+    any array or map, so it only hoists + and == when an operand is a
+    number.
+    '''
+
+    def __init__(self):
+        # (line, descriptions) of every loop and statement rewritten
+        self.loops = []
+        self.statements = []
+        self.closure_assigned = set()
+
+    def optimize(self, statements: list[Stmt]):
+        # a local assigned inside any function may be changed by a call, or
+        # by a thread running that function
+        self.closure_assigned = {node.name.lexeme for function in walk(statements)
+                                 if isinstance(function, Function)
+                                 for node in walk(function.body) if isinstance(node, Assign)}
+        loops = [node for node in walk(statements) if isinstance(node, While)]
+        for loop in loops:
+            self.hoist(loop)
+        for node in list(walk(statements)):
+            if isinstance(node, (Expression, Print)):
+                node.expression = self.share(node.expression, node)
+            elif isinstance(node, Var) and node.initializer is not None:
+                node.initializer = self.share(node.initializer, node)
+            elif isinstance(node, Return) and node.value is not None:
+                node.value = self.share(node.value, node)
+            elif isinstance(node, (If, While)):
+                node.condition = self.share(node.condition, node)
+
+    def hoist(self, stmt: While):
+        loop = Loop(stmt)
+        found = {}
+        descriptions = []
+        # nested loops hoist for themselves and functions run elsewhere
+        pending = [(stmt, 0)]
+        while pending:
+            node, depth = pending.pop()
+            for container, key, expr in children(node):
+                if self.invariant(expr, loop) and self.worth_hoisting(expr):
+                    index = found.setdefault(self.key(expr, depth), len(found))
+                    if index == len(descriptions):
+                        descriptions.append(describe(expr))
+                    replace(container, key, HoistedExpr(expr, index))
+                else:
+                    pending.append((expr, depth))
+            if not isinstance(node, Expr):
+                for name, value in vars(node).items():
+                    for child in (value if isinstance(value, list) else [value]):
+                        if isinstance(child, Stmt) and not isinstance(child, (While, Function)):
+                            pending.append((child, depth + isinstance(child, Block)))
+        if found:
+            stmt.hoisted = len(found)
+            self.loops.append((self.line(stmt), descriptions))
+
+    def invariant(self, expr: Expr, loop: Loop) -> bool:
+        if isinstance(expr, LiteralExpr):
+            return True
+        if isinstance(expr, VariableExpr):
+            name = expr.name.lexeme
+            return not (expr.depth is None or name in self.closure_assigned
+                        or name in loop.assigned or name in loop.declared)
+        if isinstance(expr, GroupingExpr):
+            return self.invariant(expr.expression, loop)
+        if isinstance(expr, UnaryExpr):
+            return self.invariant(expr.right, loop)
+        if isinstance(expr, BinaryExpr):
+            if loop.calls and expr.operator.type in CONTENT_OPERATORS \
+                    and not (self.numeric(expr.left) or self.numeric(expr.right)):
+                return False
+            return self.invariant(expr.left, loop) and self.invariant(expr.right, loop)
+        if isinstance(expr, LogicalExpr):
+            return self.invariant(expr.left, loop) and self.invariant(expr.right, loop)
+        if isinstance(expr, ConditionalExpr):
+            return all(self.invariant(part, loop) for part in
+                       (expr.condition, expr.then_branch, expr.else_branch))
+        return False
+
+    def numeric(self, expr: Expr) -> bool:
+        # an expression that is a number or raises, never an array or map
+        if isinstance(expr, GroupingExpr):
+            return self.numeric(expr.expression)
+        if isinstance(expr, LiteralExpr):
+            return type(expr.value) in (int, float)
+        if isinstance(expr, UnaryExpr):
+            return expr.operator.type == TokenType.MINUS
+        if isinstance(expr, BinaryExpr):
+            if expr.operator.type in ARITHMETIC:
+                return True
+            return expr.operator.type == TokenType.PLUS \
+                and self.numeric(expr.left) and self.numeric(expr.right)
+        return False
+
+    def worth_hoisting(self, expr: Expr) -> bool:
+        # a name or a literal is as cheap to evaluate as a hoisted value
+        while isinstance(expr, GroupingExpr):
+            expr = expr.expression
+        return isinstance(expr, (BinaryExpr, UnaryExpr, LogicalExpr, ConditionalExpr))
+
+    def key(self, expr: Expr, depth: int) -> tuple:
+        # equal keys mean equal values: locals are keyed by the frame they
+        # live in, counted from the loop, rather than by distance from use
+        if isinstance(expr, GroupingExpr):
+            return self.key(expr.expression, depth)
+        if isinstance(expr, LiteralExpr):
+            return ("literal", type(expr.value), expr.value)
+        if isinstance(expr, VariableExpr):
+            frame = None if expr.depth is None else expr.depth - depth
+            return ("variable", expr.name.lexeme, frame, expr.slot)
+        if isinstance(expr, (HoistedExpr, SharedExpr)):
+            return ("node", id(expr))
+        if isinstance(expr, ConditionalExpr):
+            return ("conditional", self.key(expr.condition, depth),
+                    self.key(expr.then_branch, depth), self.key(expr.else_branch, depth))
+        if isinstance(expr, UnaryExpr):
+            return ("unary", expr.operator.type, self.key(expr.right, depth))
+        return ("binary", expr.operator.type, self.key(expr.left, depth),
+                self.key(expr.right, depth))
+
+    def share(self, expr: Expr, stmt: Stmt) -> Expr:
+        # only a statement that can't change a value halfway through its
+        # evaluation shares one value between equal subexpressions; a
+        # variable is only assigned once its value has been computed
+        if isinstance(expr, Assign):
+            expr.value = self.share(expr.value, stmt)
+            return expr
+        nodes = [expr]
+        for node in nodes:
+            if not isinstance(node, HoistedExpr):
+                nodes.extend(child for _, _, child in children(node))
+        if any(not isinstance(node, (LiteralExpr, VariableExpr, GroupingExpr, UnaryExpr,
+                                     BinaryExpr, LogicalExpr, ConditionalExpr, HoistedExpr))
+               for node in nodes):
+            return expr
+        # what is inside a repeat is computed with it, so isn't counted again
+        counts = Counter()
+        pending = [expr]
+        while pending:
+            node = pending.pop()
+            if not isinstance(node, GroupingExpr) and self.worth_hoisting(node):
+                node_key = self.key(node, 0)
+                counts[node_key] += 1
+                if counts[node_key] > 1:
+                    continue
+            if not isinstance(node, HoistedExpr):
+                pending.extend(child for _, _, child in children(node))
+        repeated = {key for key, count in counts.items() if count > 1}
+        if not repeated:
+            return expr
+        indexes = {}
+        descriptions = []
+        root = GroupingExpr(expr)
+        pending = [root]
+        while pending:
+            node = pending.pop()
+            for container, key, child in children(node):
+                if not isinstance(child, HoistedExpr):
+                    pending.append(child)
+                    child_key = self.key(child, 0)
+                    if child_key in repeated and not isinstance(child, GroupingExpr):
+                        index = indexes.setdefault(child_key, len(indexes))
+                        if index == len(descriptions):
+                            descriptions.append(describe(child))
+                        replace(container, key, SharedExpr(child, index))
+        self.statements.append((self.line(stmt), descriptions))
+        return CommonExpr(root.expression, len(indexes))
+
+    def line(self, stmt: Stmt) -> Any:
+        return stmt.start.line if stmt.start is not None else "?"
+
+    def report(self) -> str:
+        lines = []
+        for line, hoisted in self.loops:
+            lines.append(f"loop at line {line}: hoisted {len(hoisted)}: {'; '.join(hoisted)}")
+        for line, shared in self.statements:
+            lines.append(f"statement at line {line}: shared {len(shared)}: {'; '.join(shared)}")
+        if not lines:
+            lines.append("nothing to optimize")
+        return "\n".join(lines)
@@ -0,0 +1,108 @@
+import io
+import os
+import re
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from errorHandler import ErrorHandler
+from scanner import Scanner
+from parser import Parser
+from snapshot import gc_paused, bounded_recursion
+from stmt import Stmt
+
+# chunks smaller than this cost more to hand to a worker than to parse
+MIN_CHUNK = 256 * 1024
+
+# the only text that decides whether a point is between two top-level
+# declarations: strings, comments, brackets, conditionals and semicolons
+STRUCTURE = re.compile(r'"[^"]*"?|//[^\n]*|/\*|[{}()\[\]?:;]')
+COMMENT = re.compile(r'/\*|\*/')
+FOLLOWER = re.compile(r'(?:\s|//[^\n]*)*(?:else\b|/\*)')
+
+
+def split_points(source: str, count: int) -> list[int]:
+    '''
+    Offsets that cut the source into about count chunks of whole top-level
+    declarations. A cut goes after a ';' or '}' outside any string, comment,
+    bracket or conditional, and never before an 'else'.
+    '''
+    target = len(source) // count
+    points = []
+    depth = 0
+    conditional = False
+    position = 0
+    while len(points) < count - 1:
+        match = STRUCTURE.search(source, position)
+        if match is None:
+            break
+        text = match.group()
+        position = match.end()
+        if text == "/*":
+            nesting = 1
+            while nesting:
+                match = COMMENT.search(source, position)
+                if match is None:
+                    return points
+                nesting += 1 if match.group() == "/*" else -1
+                position = match.end()
+        elif text[0] == '"':
+            if len(text) == 1 or text[-1] != '"':
+                return points
+        elif text in "{([":
+            depth += 1
+        elif text in "})]":
+            depth -= 1
+        elif text == "?":
+            conditional = True
+        elif text == ":":
+            conditional = False
+        if (text == ";" or text == "}") and depth == 0 and not conditional \
+                and position >= target * (len(points) + 1) \
+                and not FOLLOWER.match(source, position):
+            points.append(position)
+    return points
+
+
+def parse_chunk(source: str, line: int, first: bool) -> tuple[bytes, str]:
+    # runs in a worker process; the statements come back pickled, so the
+    # parent can unpickle them with the collector paused
+    output = io.StringIO()
+    error_handler = ErrorHandler(output)
+    with gc_paused():
+        tokens = Scanner(error_handler, source, line).scan_tokens()
+        parser = Parser(tokens, error_handler)
+        # package and imports may only open the first chunk
+        parser.in_header = first
+        statements = parser.parse()
+        with bounded_recursion():
+            data = pickle.dumps(statements, pickle.HIGHEST_PROTOCOL)
+    return data, output.getvalue()
+
+
+def parse_parallel(source: str, error_handler: ErrorHandler, jobs: int = None) -> list[Stmt]:
+    '''
+    Scans and parses a large source in chunks across worker processes and
+    joins the statements in order. Each chunk is scanned from its own line
+    number, so tokens and errors carry the lines of the whole source.
+    '''
+    jobs = jobs or os.cpu_count()
+    bounds = [0, *split_points(source, min(jobs, len(source) // MIN_CHUNK)), len(source)]
+    chunks, lines = [], []
+    line = 1
+    for start, end in zip(bounds, bounds[1:]):
+        chunks.append(source[start:end])
+        lines.append(line)
+        line += source.count("\n", start, end)
+    if len(chunks) == 1:
+        results = [parse_chunk(source, 1, True)]
+    else:
+        with ProcessPoolExecutor(min(jobs, len(chunks))) as executor:
+            results = list(executor.map(parse_chunk, chunks, lines,
+                                        [i == 0 for i in range(len(chunks))]))
+    statements = []
+    with gc_paused():
+        for data, errors in results:
+            statements.extend(pickle.loads(data))
+            if errors:
+                print(errors, end="", file=error_handler.output)
+                error_handler.had_error = True
+    return statements
@@ -3,8 +3,8 @@ from tokenType import TokenType
 from tokens import Token
 from error import ParseError
 from errorHandler import ErrorHandler
-from stmt import Stmt, Expression, Var, Block, If, While, Break, Print
-from expr import Expr, Assign, BinaryExpr, ConditionalExpr, GroupingExpr, Call, LiteralExpr, LogicalExpr, UnaryExpr, VariableExpr
+from stmt import Stmt, Expression, Var, Block, If, While, Break, Print, Function, Return, Package, Import, Metadata
+from expr import Expr, Assign, BinaryExpr, ConditionalExpr, GroupingExpr, Call, LiteralExpr, LogicalExpr, UnaryExpr, VariableExpr, ArrayExpr, IndexExpr, SetIndexExpr, GetExpr
 
 
 class Parser:
@@ -14,6 +14,8 @@ class Parser:
         self.current = 0
         self.error_handler = error_handler
         self.loop_depth = 0
+        # package and import declarations may only open a module
+        self.in_header = True
 
     def parse(self) -> list[Stmt]:
         statements = []
@@ -23,9 +25,23 @@ class Parser:
 
     def declaration(self) -> Stmt:
         try:
-            if self.match(TokenType.VAR):
-                return self.var_declaration()
-            return self.statement()
+            start = self.peek()
+            if start.type not in (TokenType.PACKAGE, TokenType.IMPORT):
+                self.in_header = False
+            if self.match(TokenType.PACKAGE):
+                statement = self.package_declaration()
+            elif self.match(TokenType.IMPORT):
+                statement = self.import_declaration()
+            elif self.match(TokenType.VAR):
+                statement = self.var_declaration()
+            elif self.match(TokenType.FUNCTION):
+                statement = self.function_declaration()
+            elif self.check(TokenType.META):
+                statement = self.annotated_declaration()
+            else:
+                return self.statement()
+            statement.start = start
+            return statement
         except ParseError as error:
             self.synchronize()
             return None
@@ -39,28 +55,111 @@ class Parser:
                      "Expected ';' after variable declaration.")
         return Var(name, initializer)
 
-    def statement(self) -> Stmt:
+    # package -> "package" ( IDENTIFIER ( "." IDENTIFIER )* )? ";"
+    def package_declaration(self) -> Package:
+        keyword = self.previous()
+        if keyword is not self.tokens[0] or not self.in_header:
+            self.error(keyword, "The package must be declared first.")
+        path = ""
+        if not self.check(TokenType.SEMICOLON):
+            path = self.module_path()
+        self.consume(TokenType.SEMICOLON, "Expected ';' after package.")
+        return Package(keyword, path)
+
+    # import -> "import" IDENTIFIER ( "." IDENTIFIER )* ";"
+    def import_declaration(self) -> Import:
+        keyword = self.previous()
+        if not self.in_header:
+            self.error(keyword, "Imports must come before any other declaration.")
+        path = self.module_path()
+        self.consume(TokenType.SEMICOLON, "Expected ';' after import.")
+        return Import(keyword, path)
+
+    def module_path(self) -> str:
+        names = [self.consume(TokenType.IDENTIFIER, "Expected module name.").lexeme]
+        while self.match(TokenType.DOT):
+            names.append(self.consume(TokenType.IDENTIFIER, "Expected module name.").lexeme)
+        return ".".join(names)
+
+    # metadata -> "@" ":"? IDENTIFIER ( "(" arguments? ")" )?
+    def annotated_declaration(self) -> Function:
+        metadata = []
+        while self.match(TokenType.META):
+            name = self.previous()
+            args = []
+            if self.match(TokenType.LEFT_PAREN):
+                if not self.check(TokenType.RIGHT_PAREN):
+                    while True:
+                        args.append(self.conditional())
+                        if not self.match(TokenType.COMMA):
+                            break
+                self.consume(TokenType.RIGHT_PAREN,
+                             "Expected ')' after metadata arguments.")
+            metadata.append(Metadata(name, args))
+        self.consume(TokenType.FUNCTION,
+                     "Expected function declaration after metadata.")
+        function = self.function_declaration()
+        function.metadata = metadata
+        return function
+
+    def function_declaration(self) -> Function:
+        name = self.consume(TokenType.IDENTIFIER, "Expected function name.")
+        self.consume(TokenType.LEFT_PAREN, "Expected '(' after function name.")
+        params = []
+        if not self.check(TokenType.RIGHT_PAREN):
+            while True:
+                if len(params) >= 255:
+                    self.error(
+                        self.peek(), "Cant have more than 255 parameters.")
+                params.append(self.consume(
+                    TokenType.IDENTIFIER, "Expected parameter name."))
+                if not self.match(TokenType.COMMA):
+                    break
+        self.consume(TokenType.RIGHT_PAREN, "Expected ')' after parameters.")
+        self.consume(TokenType.LEFT_BRACE, "Expected '{' before function body.")
+        loop_depth = self.loop_depth
+        try:
+            self.loop_depth = 0
+            body = self.block()
+        finally:
+            self.loop_depth = loop_depth
+        return Function(name, params, body)
 
+    def statement(self) -> Stmt:
+        start = self.peek()
         if self.match(TokenType.LEFT_BRACE):
-            return Block(self.block())
-        if self.match(TokenType.IF):
-            return self.if_statement()
-        if self.match(TokenType.WHILE):
-            return self.while_statement()
-        if self.match(TokenType.BREAK):
-            return self.break_statement()
-        if self.match(TokenType.FOR):
-            return self.for_statement()
-        if self.match(TokenType.PRINT):
-            return self.print_statement()
+            statement = Block(self.block())
+        elif self.match(TokenType.IF):
+            statement = self.if_statement()
+        elif self.match(TokenType.WHILE):
+            statement = self.while_statement()
+        elif self.match(TokenType.BREAK):
+            statement = self.break_statement()
+        elif self.match(TokenType.FOR):
+            statement = self.for_statement()
+        elif self.match(TokenType.PRINT):
+            statement = self.print_statement()
+        elif self.match(TokenType.RETURN):
+            statement = self.return_statement()
         else:
-            return self.expression_statement()
+            statement = self.expression_statement()
+        if statement is not None:
+            statement.start = start
+        return statement
 
     def print_statement(self) -> Stmt:
         expr = self.expression()
         self.consume(TokenType.SEMICOLON, "Expected ';' after value.")
         return Print(expr)
 
+    def return_statement(self) -> Return:
+        keyword = self.previous()
+        value = None
+        if not self.check(TokenType.SEMICOLON):
+            value = self.expression()
+        self.consume(TokenType.SEMICOLON, "Expected ';' after return value.")
+        return Return(keyword, value)
+
     def block(self) -> list[Stmt]:
         statements = []
         while not self.is_at_end() and (not self.check(TokenType.RIGHT_BRACE)):
@@ -95,6 +194,7 @@ class Parser:
             self.loop_depth -= 1
 
     def for_statement(self) -> Stmt:
+        keyword = self.previous()
         self.consume(TokenType.LEFT_PAREN, "Expected '(' after 'for'.")
         initializer = None
         if self.match(TokenType.VAR):
@@ -117,9 +217,10 @@ class Parser:
             if condition is None:
                 condition = LiteralExpr(True)
             body = While(condition, body)
+            body.start = keyword
             if initializer is not None:
                 body = Block([initializer, body])
-                return body
+            return body
         finally:
             self.loop_depth -= 1
 
@@ -147,6 +248,8 @@ class Parser:
             if type(expr) is VariableExpr:
                 name = expr.name
                 return Assign(name, value)
+            if type(expr) is IndexExpr:
+                return SetIndexExpr(expr.object, expr.bracket, expr.index, value)
             self.error(equals, "Invalid assignment target.")
         return expr
 
@@ -207,6 +310,15 @@ class Parser:
         while True:
             if self.match(TokenType.LEFT_PAREN):
                 expr = self.finish_call(expr)
+            elif self.match(TokenType.LEFT_BRACKET):
+                bracket = self.previous()
+                index = self.expression()
+                self.consume(TokenType.RIGHT_BRACKET, "Expected ']' after index.")
+                expr = IndexExpr(expr, bracket, index)
+            elif self.match(TokenType.DOT):
+                name = self.consume(TokenType.IDENTIFIER,
+                                    "Expected property name after '.'.")
+                expr = GetExpr(expr, name)
             else:
                 break
         return expr
@@ -227,6 +339,18 @@ class Parser:
             return GroupingExpr(expr)
         if self.match(TokenType.IDENTIFIER):
             return VariableExpr(self.previous())
+        # array -> "[" ( conditional ( "," conditional )* )? "]"
+        if self.match(TokenType.LEFT_BRACKET):
+            bracket = self.previous()
+            elements = []
+            if not self.check(TokenType.RIGHT_BRACKET):
+                while True:
+                    elements.append(self.conditional())
+                    if not self.match(TokenType.COMMA):
+                        break
+            self.consume(TokenType.RIGHT_BRACKET,
+                         "Expected ']' after array elements.")
+            return ArrayExpr(bracket, elements)
         # The following if clauses are productions for missing left operands - "error productions"
         if self.match(TokenType.COMMA):
             self.error(self.previous(), "Missing left-hand operand.")
@@ -253,7 +377,7 @@ class Parser:
             self.error(self.previous(), "Missing left-hand operand.")
             self.factor()
             return None
-        self.error_handler.error_on_token(self.peek(), "Expect expression.")
+        raise self.error(self.peek(), "Expect expression.")
 
     # arguments -> expression ("," expression)*
     def finish_call(self, callee: Call) -> Expr:
@@ -306,7 +430,7 @@ class Parser:
     def consume(self, type: TokenType, message: str) -> Token:
         if self.check(type):
             return self.advance()
-        self.error(self.peek(), message)
+        raise self.error(self.peek(), message)
 
     def error(self, token: Token, message: str):
         self.error_handler.error_on_token(token, message)
@@ -314,8 +438,9 @@ class Parser:
 
     def synchronize(self):
         self.advance()
-        keywords = {TokenType.CLASS, TokenType.FUN, TokenType.VAR, TokenType.FOR,
-                    TokenType.IF, TokenType.WHILE,  TokenType.PRINT, TokenType.RETURN}
+        keywords = {TokenType.VAR, TokenType.FUNCTION, TokenType.FOR, TokenType.IF,
+                    TokenType.WHILE, TokenType.PRINT, TokenType.RETURN,
+                    TokenType.PACKAGE, TokenType.IMPORT}
         while not self.is_at_end():
             if self.previous().type == TokenType.SEMICOLON:
                 return
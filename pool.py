@@ -0,0 +1,44 @@
+import io
+from queue import SimpleQueue
+from contextlib import contextmanager
+from typing import Any
+from errorHandler import ErrorHandler
+from interpreter import Interpreter
+from budget import Budget
+from program import Program, RunResult
+
+
+class InterpreterPool:
+    '''
+    A fixed number of interpreters, each with its own error handler and
+    output buffer, handed out to one execution at a time. Pooled scripts
+    are untrusted, so they get no sys package unless system is set. Deep
+    recursion needs the host to have called deepen_stack.
+    '''
+
+    def __init__(self, size: int, budget: Budget = None, system: bool = False):
+        self.size = size
+        # only the interpreters created here are ever put back, so the queue
+        # needs no bound of its own and get() blocks once all are in use
+        self.idle = SimpleQueue()
+        for _ in range(size):
+            output = io.StringIO()
+            interpreter = Interpreter(ErrorHandler(output), output, system)
+            interpreter.set_budget(budget)
+            self.idle.put(interpreter)
+
+    @contextmanager
+    def checkout(self, timeout: float = None):
+        interpreter = self.idle.get(timeout=timeout)
+        try:
+            interpreter.output.seek(0)
+            interpreter.output.truncate()
+            interpreter.reset()
+            yield interpreter
+        finally:
+            self.idle.put(interpreter)
+
+    def run(self, program: Program, bindings: dict[str, Any] = None,
+            timeout: float = None) -> RunResult:
+        with self.checkout(timeout) as interpreter:
+            return program.execute(interpreter, bindings)
@@ -0,0 +1,110 @@
+import time
+import signal
+from collections import Counter
+from interpreter import Interpreter, TracingInterpreter
+from haxeFunction import HaxeFunction
+
+
+class Profiler:
+    '''
+    A sampling profiler for scripts run on the main thread. A wall clock
+    timer signal interrupts the interpreter at a fixed rate, and each sample
+    walks the Python stack of the interrupted code. The sample keeps the
+    frames of statements being executed and of HaxePy functions being
+    called. write saves the counts as folded stacks, the input format of
+    flamegraph.pl and similar tools.
+    '''
+
+    labelled_codes = frozenset({Interpreter.execute.__code__, TracingInterpreter.execute.__code__,
+                                HaxeFunction.call.__code__})
+    call_code = HaxeFunction.call.__code__
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        # seconds spent taking samples
+        self.overhead = 0.0
+        # the labelled frames of the last sample, outermost first, with
+        # their labels and their positions in the list
+        self.frames = [None]
+        self.labels = ["main"]
+        self.positions = {}
+        # labels by statement and by function declaration
+        self.names = {}
+        self.sampling = False
+        self.previous_handler = None
+
+    def start(self):
+        self.previous_handler = signal.signal(signal.SIGALRM, self.sample)
+        signal.setitimer(signal.ITIMER_REAL, self.interval, self.interval)
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, self.previous_handler or signal.SIG_DFL)
+        self.frames = [None]
+        self.labels = ["main"]
+        self.positions = {}
+
+    def sample(self, signum, frame):
+        # a signal can arrive while the last one is still being handled,
+        # and that sample is dropped rather than seeing the lists half done
+        if self.sampling:
+            return
+        self.sampling = True
+        start = time.perf_counter()
+        try:
+            self.record(frame)
+        finally:
+            self.overhead += time.perf_counter() - start
+            self.sampling = False
+
+    def record(self, frame):
+        # a frame that was on the stack at the previous sample has the same
+        # frames below it as then, so the walk stops at the first of them
+        # and only frames entered since then are labelled, which costs a
+        # read of f_locals
+        labelled_codes = self.labelled_codes
+        positions = self.positions
+        fresh = []
+        depth = 1
+        while frame is not None:
+            if frame.f_code in labelled_codes:
+                position = positions.get(frame)
+                if position is not None:
+                    depth = position + 1
+                    break
+                fresh.append(frame)
+            frame = frame.f_back
+        frames = self.frames
+        labels = self.labels
+        for stale in frames[depth:]:
+            del positions[stale]
+        del frames[depth:]
+        del labels[depth:]
+        for frame in reversed(fresh):
+            positions[frame] = len(frames)
+            frames.append(frame)
+            labels.append(self.label(frame))
+        self.stacks[tuple(labels)] += 1
+        self.samples += 1
+
+    def label(self, frame) -> str:
+        if frame.f_code is self.call_code:
+            node = frame.f_locals["self"].declaration
+        else:
+            node = frame.f_locals["statement"]
+        name = self.names.get(node)
+        if name is None:
+            if frame.f_code is self.call_code:
+                name = f"function {node.name.lexeme}"
+            else:
+                line = node.start.line if node.start is not None else "?"
+                name = f"{type(node).__name__}:{line}"
+            self.names[node] = name
+        return name
+
+    def write(self, path: str):
+        with open(path, 'w') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{';'.join(stack)} {count}\n")
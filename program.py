@@ -0,0 +1,58 @@
+import io
+from collections import namedtuple
+from typing import Any
+from errorHandler import ErrorHandler
+from interpreter import Interpreter
+from scanner import Scanner
+from parser import Parser
+from resolver import Resolver
+from parallelParse import MIN_CHUNK, parse_parallel
+from optimizer import Optimizer
+from runMode import RunMode
+from stmt import Stmt
+
+RunResult = namedtuple("RunResult", "output, globals, had_runtime_error")
+
+
+class Program(namedtuple("Program", "statements")):
+    '''
+    A scanned and parsed script. Running it never changes the program, so
+    one instance can be run any number of times, from any number of threads,
+    each run getting its own interpreter and globals.
+    '''
+
+    def __new__(cls, statements: list[Stmt]):
+        return super().__new__(cls, tuple(statements))
+
+    @classmethod
+    def compile(cls, source: str, error_handler: ErrorHandler, jobs: int = 1,
+                optimizer: Optimizer = None) -> "Program":
+        # jobs other than 1 scan and parse a large source across processes
+        if jobs != 1 and len(source) >= 2 * MIN_CHUNK:
+            statements = parse_parallel(source, error_handler, jobs)
+        else:
+            tokens = Scanner(error_handler, source).scan_tokens()
+            statements = Parser(tokens, error_handler).parse()
+        if error_handler.had_error:
+            return None
+        Resolver(error_handler).resolve(statements)
+        if error_handler.had_error:
+            return None
+        if optimizer is not None:
+            optimizer.optimize(statements)
+        return cls(statements)
+
+    def run(self, bindings: dict[str, Any] = None) -> RunResult:
+        output = io.StringIO()
+        interpreter = Interpreter(ErrorHandler(output), output)
+        try:
+            return self.execute(interpreter, bindings)
+        finally:
+            interpreter.close_events()
+
+    def execute(self, interpreter: Interpreter, bindings: dict[str, Any] = None) -> RunResult:
+        if bindings:
+            interpreter.globals.update(bindings)
+        interpreter.interpret(self.statements, RunMode.FILE)
+        return RunResult(interpreter.output.getvalue(), interpreter.globals,
+                         interpreter.error_handler.had_runtime_error)
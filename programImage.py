@@ -0,0 +1,211 @@
+import sys
+import mmap
+import struct
+from functools import cached_property
+from typing import Any
+from tokens import Token
+from tokenType import TokenType
+from program import Program
+import stmt
+import expr
+
+# a program image is a compiled, resolved program written as flat records
+# that refer to each other by byte offset. Records are decoded straight
+# from a read-only mapping of the file, so workers running the same image
+# share its pages and skip scanning, parsing and resolving.
+#
+#   header  MAGIC, offset of the class name list, offset of the statements
+#   node    NODE, class index u16, field count u16, (name, value) offsets
+#   list    LIST, count u32, item offsets
+#   token   TOKEN, type u16, lexeme, literal, line u32
+#   str     STR, length u32, utf-8 bytes
+#   float   FLOAT, f64; int INT, i64; TRUE; FALSE
+#
+# None is the offset NIL and takes no record.
+MAGIC = b"HXPYIMG1"
+NIL = 0xFFFFFFFF
+NODE, LIST, TOKEN, STR, FLOAT, INT, TRUE, FALSE = range(8)
+
+HEADER = struct.Struct("<8sII")
+NODE_HEAD = struct.Struct("<BHH")
+COUNT = struct.Struct("<BI")
+TOKEN_RECORD = struct.Struct("<BHIII")
+FLOAT_RECORD = struct.Struct("<Bd")
+INT_RECORD = struct.Struct("<Bq")
+
+NODE_CLASSES = {cls.__name__: cls for module in (stmt, expr) for cls in vars(module).values()
+                if isinstance(cls, type) and issubclass(cls, (stmt.Stmt, stmt.Metadata, expr.Expr))}
+
+
+class ImageError(Exception):
+    pass
+
+
+class ImageFunction(stmt.Function):
+    # a function declaration read from an image, whose body is decoded on
+    # first use, so functions a run never calls are never decoded
+    @cached_property
+    def body(self) -> list[stmt.Stmt]:
+        return self.image.decode(self.body_offset)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["body"] = self.body
+        del state["image"], state["body_offset"]
+        return state
+
+
+class ImageWriter:
+    def __init__(self):
+        self.buffer = bytearray(HEADER.size)
+        self.classes = {}
+        # strings and numbers are written once however often they occur,
+        # nodes and tokens once per object
+        self.constants = {}
+        self.objects = {}
+
+    def write(self, program: Program) -> bytes:
+        statements = self.encode(list(program.statements))
+        classes = self.encode(list(self.classes))
+        HEADER.pack_into(self.buffer, 0, MAGIC, classes, statements)
+        return bytes(self.buffer)
+
+    def encode(self, value: Any) -> int:
+        if value is None:
+            return NIL
+        if isinstance(value, (str, float, int)):
+            key = (type(value), value)
+            offset = self.constants.get(key)
+            if offset is None:
+                offset = self.constants[key] = self.encode_constant(value)
+            return offset
+        offset = self.objects.get(id(value))
+        if offset is None:
+            offset = self.objects[id(value)] = self.encode_object(value)
+        return offset
+
+    def encode_constant(self, value: Any) -> int:
+        offset = len(self.buffer)
+        if value is True or value is False:
+            self.buffer.append(TRUE if value else FALSE)
+        elif isinstance(value, str):
+            data = value.encode("utf-8")
+            self.buffer += COUNT.pack(STR, len(data)) + data
+        elif isinstance(value, float):
+            self.buffer += FLOAT_RECORD.pack(FLOAT, value)
+        else:
+            self.buffer += INT_RECORD.pack(INT, value)
+        return offset
+
+    def encode_object(self, value: Any) -> int:
+        if isinstance(value, list):
+            items = [self.encode(item) for item in value]
+            offset = len(self.buffer)
+            self.buffer += COUNT.pack(LIST, len(items)) + struct.pack(f"<{len(items)}I", *items)
+            return offset
+        if isinstance(value, Token):
+            fields = (self.encode(value.lexeme), self.encode(value.literal), value.line)
+            offset = len(self.buffer)
+            self.buffer += TOKEN_RECORD.pack(TOKEN, value.type.value, *fields)
+            return offset
+        if type(value).__name__ not in NODE_CLASSES:
+            raise ImageError(f"Can't write a {type(value).__name__} to a program image.")
+        # the node's pickled state leaves out what is only cached at run time;
+        # before Python 3.11 only nodes that define __getstate__ have one
+        getstate = getattr(value, "__getstate__", None)
+        state = getstate() if getstate is not None else vars(value)
+        fields = []
+        for name, field in (state or {}).items():
+            fields += (self.encode(name), self.encode(field))
+        offset = len(self.buffer)
+        index = self.classes.setdefault(type(value).__name__, len(self.classes))
+        self.buffer += NODE_HEAD.pack(NODE, index, len(fields) // 2)
+        self.buffer += struct.pack(f"<{len(fields)}I", *fields)
+        return offset
+
+
+class ProgramImage:
+    '''
+    A read-only mapping of a program image. decode builds the AST objects
+    of a record on demand; function bodies stay in the image until called.
+    '''
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as file:
+            try:
+                self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ImageError(f"{path} is not a program image.")
+        if len(self.buffer) < HEADER.size or self.buffer[:len(MAGIC)] != MAGIC:
+            raise ImageError(f"{path} is not a program image.")
+        _, classes, self.statements_offset = HEADER.unpack_from(self.buffer)
+        self.strings = {}
+        self.classes = []
+        for name in self.decode(classes):
+            if name not in NODE_CLASSES:
+                raise ImageError(f"Unknown node class '{name}' in {path}.")
+            self.classes.append(ImageFunction if name == "Function" else NODE_CLASSES[name])
+
+    def program(self) -> Program:
+        return Program(self.decode(self.statements_offset))
+
+    def decode(self, offset: int) -> Any:
+        if offset == NIL:
+            return None
+        buffer = self.buffer
+        tag = buffer[offset]
+        if tag == NODE:
+            _, index, count = NODE_HEAD.unpack_from(buffer, offset)
+            fields = struct.unpack_from(f"<{count * 2}I", buffer, offset + NODE_HEAD.size)
+            cls = self.classes[index]
+            node = cls.__new__(cls)
+            state = node.__dict__
+            for i in range(0, len(fields), 2):
+                name = self.decode(fields[i])
+                if cls is ImageFunction and name == "body":
+                    node.image = self
+                    node.body_offset = fields[i + 1]
+                else:
+                    state[name] = self.decode(fields[i + 1])
+            return node
+        if tag == LIST:
+            _, count = COUNT.unpack_from(buffer, offset)
+            return [self.decode(item) for item in
+                    struct.unpack_from(f"<{count}I", buffer, offset + COUNT.size)]
+        if tag == TOKEN:
+            _, type, lexeme, literal, line = TOKEN_RECORD.unpack_from(buffer, offset)
+            return Token(TokenType(type), self.decode(lexeme), self.decode(literal), line)
+        if tag == STR:
+            # identifiers repeat throughout a program, so each is decoded once
+            string = self.strings.get(offset)
+            if string is None:
+                _, length = COUNT.unpack_from(buffer, offset)
+                start = offset + COUNT.size
+                string = str(buffer[start:start + length], "utf-8")
+                string = self.strings[offset] = sys.intern(string)
+            return string
+        if tag == FLOAT:
+            return FLOAT_RECORD.unpack_from(buffer, offset)[1]
+        if tag == INT:
+            return INT_RECORD.unpack_from(buffer, offset)[1]
+        if tag == TRUE or tag == FALSE:
+            return tag == TRUE
+        raise ImageError(f"Bad record at offset {offset}.")
+
+
+def write_image(program: Program, path: str):
+    data = ImageWriter().write(program)
+    with open(path, 'wb') as file:
+        file.write(data)
+
+
+def is_image(path: str) -> bool:
+    try:
+        with open(path, 'rb') as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def read_image(path: str) -> Program:
+    return ProgramImage(path).program()
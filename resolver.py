@@ -0,0 +1,269 @@
+from visitor import Visitor
+from tokens import Token
+from errorHandler import ErrorHandler
+from var_state import VarState
+from stmt import Stmt, Expression, Var, Block, If, While, Break, Print, Function, Return, Package, Import, Metadata
+from expr import Expr, Assign, BinaryExpr, ConditionalExpr, GroupingExpr, Call, LiteralExpr, LogicalExpr, UnaryExpr, VariableExpr, ArrayExpr, IndexExpr, SetIndexExpr, GetExpr, HoistedExpr, CommonExpr, SharedExpr
+
+
+class Local:
+    def __init__(self, slot: int):
+        self.slot = slot
+        self.state = VarState.DECLARED
+        # the declaration, when the local is a named function
+        self.function = None
+
+
+class Resolver(Visitor):
+    '''
+    Binds every local variable to a (depth, slot) pair stored on the node
+    that uses it, and records how many slots each block and function needs,
+    so the interpreter can allocate frames of the right size up front.
+    Names that are not found in any enclosing scope are globals.
+
+    It also checks @:memo functions: a function that prints, assigns a
+    variable declared outside it or calls an impure function is impure and
+    can't be memoized. Calls are followed once the whole program is
+    resolved, since a global function can be called before its
+    declaration.
+    '''
+    default_memo_size = 128
+
+    def __init__(self, error_handler: ErrorHandler):
+        self.error_handler = error_handler
+        self.scopes = []
+        # (function, index of its scope) for each function being resolved
+        self.functions = []
+        self.impure = set()
+        # the functions that call each function, by its declaration, or by
+        # name for a global
+        self.callers = {}
+        self.global_functions = {}
+        self.memoized = []
+
+    def resolve(self, statements: list[Stmt]):
+        for statement in statements:
+            statement.accept(self)
+        if not self.scopes:
+            self.check_memoized()
+
+    def check_memoized(self):
+        # an impure function makes every function that calls it impure
+        pending = list(self.impure)
+        for name, function in self.global_functions.items():
+            self.callers.setdefault(function, set()).update(self.callers.pop(name, ()))
+        while pending:
+            for caller in self.callers.get(pending.pop(), ()):
+                if caller not in self.impure:
+                    self.impure.add(caller)
+                    pending.append(caller)
+        for stmt in self.memoized:
+            if stmt in self.impure:
+                self.error_handler.error_on_token(
+                    stmt.name, f"Can't memoize impure function '{stmt.name.lexeme}'.")
+        self.memoized = []
+
+    def resolve_expr(self, expr: Expr):
+        expr.accept(self)
+
+    def begin_scope(self):
+        self.scopes.append({})
+
+    def end_scope(self) -> int:
+        return len(self.scopes.pop())
+
+    def declare(self, name: Token) -> int:
+        if not self.scopes:
+            return None
+        scope = self.scopes[-1]
+        if name.lexeme in scope:
+            self.error_handler.error_on_token(
+                name, "Already a variable with this name in this scope.")
+            return scope[name.lexeme].slot
+        scope[name.lexeme] = Local(len(scope))
+        return scope[name.lexeme].slot
+
+    def define(self, name: Token):
+        if self.scopes:
+            self.scopes[-1][name.lexeme].state = VarState.DEFINED
+
+    def resolve_local(self, expr: Expr, name: Token):
+        for depth, scope in enumerate(reversed(self.scopes)):
+            if name.lexeme in scope:
+                expr.depth = depth
+                expr.slot = scope[name.lexeme].slot
+                return
+
+    def mark_impure(self, scope_index: int = -1):
+        # every function whose scope lies inside the one at scope_index
+        for function, function_scope in self.functions:
+            if function_scope > scope_index:
+                self.impure.add(function)
+
+    def memo_size(self, stmt: Function) -> int:
+        size = None
+        for metadata in stmt.metadata:
+            if metadata.name.literal != "memo":
+                continue
+            size = Resolver.default_memo_size
+            if metadata.args:
+                arg = metadata.args[0]
+                size = getattr(arg, "value", None)
+                if (len(metadata.args) > 1 or type(size) not in (int, float)
+                        or size < 1 or not float(size).is_integer()):
+                    self.error_handler.error_on_token(
+                        metadata.name, "Expected a positive whole number as the memo size.")
+                    return None
+                size = int(size)
+        return size
+
+    def visit_block_stmt(self, stmt: Block):
+        self.begin_scope()
+        self.resolve(stmt.statements)
+        stmt.slot_count = self.end_scope()
+
+    def visit_var_stmt(self, stmt: Var):
+        stmt.slot = self.declare(stmt.name)
+        if stmt.initializer is not None:
+            self.resolve_expr(stmt.initializer)
+        self.define(stmt.name)
+
+    def visit_function_stmt(self, stmt: Function):
+        stmt.slot = self.declare(stmt.name)
+        self.define(stmt.name)
+        if self.scopes:
+            self.scopes[-1][stmt.name.lexeme].function = stmt
+        else:
+            self.global_functions[stmt.name.lexeme] = stmt
+        self.begin_scope()
+        self.functions.append((stmt, len(self.scopes) - 1))
+        for param in stmt.params:
+            self.declare(param)
+            self.define(param)
+        self.resolve(stmt.body)
+        self.functions.pop()
+        stmt.slot_count = self.end_scope()
+        stmt.memo_size = self.memo_size(stmt)
+        if stmt.memo_size is not None:
+            self.memoized.append(stmt)
+
+    def visit_expression_stmt(self, stmt: Expression):
+        self.resolve_expr(stmt.expression)
+
+    def visit_if_stmt(self, stmt: If):
+        self.resolve_expr(stmt.condition)
+        stmt.then_branch.accept(self)
+        if stmt.else_branch is not None:
+            stmt.else_branch.accept(self)
+
+    def visit_print_stmt(self, stmt: Print):
+        self.mark_impure()
+        self.resolve_expr(stmt.expression)
+
+    def visit_return_stmt(self, stmt: Return):
+        if not self.functions:
+            self.error_handler.error_on_token(
+                stmt.keyword, "Can't return from top-level code.")
+        if stmt.value is not None:
+            self.resolve_expr(stmt.value)
+
+    def visit_while_stmt(self, stmt: While):
+        self.resolve_expr(stmt.condition)
+        stmt.body.accept(self)
+
+    def visit_break_stmt(self, stmt: Break):
+        pass
+
+    def visit_package_stmt(self, stmt: Package):
+        pass
+
+    def visit_import_stmt(self, stmt: Import):
+        pass
+
+    def visit_variable_expr(self, expr: VariableExpr):
+        if self.scopes:
+            local = self.scopes[-1].get(expr.name.lexeme)
+            if local is not None and local.state == VarState.DECLARED:
+                self.error_handler.error_on_token(
+                    expr.name, "Can't read local variable in its own initializer.")
+        self.resolve_local(expr, expr.name)
+
+    def visit_assign_expr(self, expr: Assign):
+        self.resolve_expr(expr.value)
+        self.resolve_local(expr, expr.name)
+        if expr.depth is None:
+            self.mark_impure()
+        else:
+            self.mark_impure(len(self.scopes) - 1 - expr.depth)
+
+    def visit_binary_expr(self, expr: BinaryExpr):
+        self.resolve_expr(expr.left)
+        self.resolve_expr(expr.right)
+
+    def visit_call_expr(self, expr: Call):
+        self.resolve_expr(expr.callee)
+        for argument in expr.args:
+            self.resolve_expr(argument)
+        if type(expr.callee) is VariableExpr and self.functions:
+            self.add_call(expr.callee)
+
+    def add_call(self, callee: VariableExpr):
+        # like a print, the call counts for every function it is inside
+        if callee.depth is None:
+            key = callee.name.lexeme
+        else:
+            key = self.scopes[-1 - callee.depth][callee.name.lexeme].function
+            if key is None:
+                return
+        self.callers.setdefault(key, set()).update(function for function, _ in self.functions)
+
+    def visit_array_expr(self, expr: ArrayExpr):
+        for element in expr.elements:
+            self.resolve_expr(element)
+
+    def visit_index_expr(self, expr: IndexExpr):
+        self.resolve_expr(expr.object)
+        self.resolve_expr(expr.index)
+
+    def visit_set_index_expr(self, expr: SetIndexExpr):
+        self.resolve_expr(expr.value)
+        self.resolve_expr(expr.object)
+        self.resolve_expr(expr.index)
+        # storing into an array that came from outside the function changes
+        # state the caller can see
+        if type(expr.object) is not VariableExpr or expr.object.depth is None:
+            self.mark_impure()
+        else:
+            self.mark_impure(len(self.scopes) - 1 - expr.object.depth)
+
+    def visit_get_expr(self, expr: GetExpr):
+        self.resolve_expr(expr.object)
+
+    # the optimizer adds these after resolution, so they are only seen when
+    # an optimized program is resolved again
+    def visit_hoisted_expr(self, expr: HoistedExpr):
+        self.resolve_expr(expr.expression)
+
+    def visit_common_expr(self, expr: CommonExpr):
+        self.resolve_expr(expr.expression)
+
+    def visit_shared_expr(self, expr: SharedExpr):
+        self.resolve_expr(expr.expression)
+
+    def visit_conditional_expr(self, expr: ConditionalExpr):
+        self.resolve_expr(expr.condition)
+        self.resolve_expr(expr.then_branch)
+        self.resolve_expr(expr.else_branch)
+
+    def visit_grouping_expr(self, expr: GroupingExpr):
+        self.resolve_expr(expr.expression)
+
+    def visit_literal_expr(self, expr: LiteralExpr):
+        pass
+
+    def visit_logical_expr(self, expr: LogicalExpr):
+        self.resolve_expr(expr.left)
+        self.resolve_expr(expr.right)
+
+    def visit_unary_expr(self, expr: UnaryExpr):
+        self.resolve_expr(expr.right)
@@ -10,23 +10,29 @@ DoubleToken = namedtuple("DoubleToken", "single, double")
 
 
 class Scanner:
-    def __init__(self, error_handler: ErrorHandler, source: str):
+    def __init__(self, error_handler: ErrorHandler, source: str, line: int = 1):
         self.error_handler = error_handler
         self.source = source
         self.tokens = []
         self.start = 0
         self.current = 0
-        self.line = 1
+        self.line = line
+        # the symbol table: one string per distinct identifier and string
+        # literal of the compilation
+        self.symbols = {}
 
         self.keywords = {
             "and": TokenType.AND,
             "break": TokenType.BREAK,
             "else": TokenType.ELSE,
             "false": TokenType.FALSE,
-            "for:": TokenType.FOR,
+            "for": TokenType.FOR,
+            "function": TokenType.FUNCTION,
             "if": TokenType.IF,
+            "import": TokenType.IMPORT,
             "nil": TokenType.NULL,
             "or": TokenType.OR,
+            "package": TokenType.PACKAGE,
             "return": TokenType.RETURN,
             "print": TokenType.PRINT,
             "true": TokenType.TRUE,
@@ -46,6 +52,8 @@ class Scanner:
             ")": TokenType.RIGHT_PAREN,
             "{": TokenType.LEFT_BRACE,
             "}": TokenType.RIGHT_BRACE,
+            "[": TokenType.LEFT_BRACKET,
+            "]": TokenType.RIGHT_BRACKET,
             ",": TokenType.COMMA,
             ".": TokenType.DOT,
             "-": TokenType.MINUS,
@@ -84,6 +92,8 @@ class Scanner:
                 self.add_token(TokenType.SLASH)
         elif char == '?':
             self.add_conditional()
+        elif char == '@':
+            self.metadata()
         elif char in ['', '\r', '\t', ' ']:
             pass
         elif char == '\n':
@@ -102,10 +112,19 @@ class Scanner:
         self.current += 1
         return char
 
-    def add_token(self, token_type: TokenType, literal=None):
-        text = self.source[self.start:self.current]
+    def add_token(self, token_type: TokenType, literal=None, lexeme: str = None):
+        text = lexeme if lexeme is not None else self.source[self.start:self.current]
         self.tokens.append(Token(token_type, text, literal, self.line))
 
+    def symbol(self, text: str) -> str:
+        # symbols are also interned process wide, so a global's name in the
+        # AST is the very string that keys it in the interpreter's globals,
+        # whichever compilation defined it, and lookups compare by identity
+        symbol = self.symbols.get(text)
+        if symbol is None:
+            symbol = self.symbols[text] = sys.intern(text)
+        return symbol
+
     def match(self, char: chr) -> bool:
         if self.is_at_end():
             return False
@@ -128,8 +147,8 @@ class Scanner:
             self.error_handler.error(self.line, "Unterminated string.")
             return None
         self.advance()
-        value = self.source[self.start + 1:self.current - 1]
-        self.add_token(TokenType.STRING, value)
+        value = self.symbol(self.source[self.start + 1:self.current - 1])
+        self.add_token(TokenType.STRING, value, self.symbol(self.source[self.start:self.current]))
 
     def is_digit(self, char: chr) -> bool:
         return char >= '0' and char <= '9'
@@ -159,28 +178,37 @@ class Scanner:
         while self.is_alpha_numeric(self.peek()):
             self.advance()
 
-        text = self.source[self.start:self.current]
+        text = self.symbol(self.source[self.start:self.current])
         type = TokenType.IDENTIFIER
         if text in self.keywords:
             type = self.keywords[text]
-        self.add_token(type)
+        self.add_token(type, lexeme=text)
+
+    def metadata(self):
+        self.match(':')
+        name_start = self.current
+        while self.is_alpha_numeric(self.peek()):
+            self.advance()
+        if self.current == name_start:
+            self.error_handler.error(self.line, "Expected metadata name.")
+            return
+        self.add_token(TokenType.META, self.source[name_start:self.current])
 
     def skip_comment(self):
         comment_lines = [self.line]
-        nesting = 1
-        while nesting > 0:
+        self.advance()
+        while comment_lines:
             if self.is_at_end():
                 for line in comment_lines:
                     self.error_handler.error(line, "Unterminated comment.")
                 return
             if self.peek() == '\n':
                 self.line += 1
-            if self.peek() == '/' and self.peek_next() == '*':
+            elif self.peek() == '/' and self.peek_next() == '*':
                 comment_lines.append(self.line)
-                nesting += 1
-            if self.peek() == '*' and self.peek_next() == '/':
-                nesting -= 1
                 self.advance()
+            elif self.peek() == '*' and self.peek_next() == '/':
+                comment_lines.pop()
                 self.advance()
             self.advance()
 
@@ -0,0 +1,117 @@
+import io
+import os
+import json
+import signal
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from errorHandler import ErrorHandler
+from program import Program
+from moduleGraph import ModuleGraph, imports
+from pool import InterpreterPool
+from budget import Budget
+
+
+class EvaluationServer:
+    '''
+    Runs scripts sent over a Unix domain socket on a pool of resident
+    interpreters. Each request is one JSON line holding either a "path" or
+    a "source"; each response is one JSON line with the "output" and the
+    exit "status". Imports are found in the class path, or else next to
+    the script's path, or in the working directory for a source. Compiled
+    programs are cached by source text and class path, along with the
+    images of the modules they import. Served scripts get no sys package,
+    so no files, sockets or threads, unless system is set.
+    '''
+
+    def __init__(self, path: str, size: int = None, cache_size: int = 256,
+                 budget: Budget = None, system: bool = False, class_path: str = None):
+        self.path = path
+        self.class_path = class_path
+        self.size = size or os.cpu_count()
+        self.pool = InterpreterPool(self.size, budget, system)
+        self.executor = ThreadPoolExecutor(self.size)
+        self.cache_size = cache_size
+        self.programs = OrderedDict()
+
+    def serve_forever(self):
+        try:
+            asyncio.run(self.serve())
+        finally:
+            self.executor.shutdown(cancel_futures=True)
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    async def serve(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        loop = asyncio.get_running_loop()
+        stopped = loop.create_future()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stopped.cancel)
+        server = await asyncio.start_unix_server(self.handle, path=self.path)
+        async with server:
+            try:
+                await stopped
+            except asyncio.CancelledError:
+                pass
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        try:
+            while line := await reader.readline():
+                response = await loop.run_in_executor(self.executor,
+                                                      self.evaluate, line)
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def evaluate(self, line: bytes) -> dict:
+        try:
+            request = json.loads(line)
+            if "source" in request:
+                source = request["source"]
+                path = "<source>"
+            else:
+                path = request["path"]
+                with open(path, 'r') as file:
+                    source = file.read()
+        except (ValueError, KeyError, OSError) as error:
+            return {"output": f"{error}\n", "status": 1}
+        try:
+            program, output = self.compile(source, path)
+            if program is None:
+                return {"output": output, "status": 1}
+            result = self.pool.run(program)
+        except Exception as error:
+            # a failure of the interpreter itself fails this request, and
+            # the connection stays open for the next
+            return {"output": f"Internal error: {type(error).__name__}: {error}\n",
+                    "status": 1}
+        return {"output": result.output,
+                "status": 1 if result.had_runtime_error else 0}
+
+    def compile(self, source: str, path: str):
+        # dict and OrderedDict operations are atomic, so concurrent requests
+        # at worst compile the same source twice; a cached program is linked
+        # again once the source of a module it imports has changed
+        output = io.StringIO()
+        error_handler = ErrorHandler(output)
+        graph = ModuleGraph.for_script(path, error_handler, self.class_path)
+        key = (source, graph.class_path)
+        cached = self.programs.get(key)
+        if cached is not None and graph.unchanged(cached[1]):
+            try:
+                self.programs.move_to_end(key)
+            except KeyError:
+                pass
+            return cached[0], ""
+        program = Program.compile(source, error_handler)
+        if program is not None and imports(program.statements):
+            program = graph.link(program, os.path.basename(path))
+        if program is not None:
+            self.programs[key] = (program, graph.images)
+            while len(self.programs) > self.cache_size:
+                self.programs.popitem(last=False)
+        return program, output.getvalue()
@@ -0,0 +1,172 @@
+import gc
+import os
+import sys
+import tempfile
+import pickle
+from contextlib import contextmanager
+from typing import Any
+from interpreter import Interpreter
+from native import NativeModule
+
+# the only globals a snapshot may load: the AST, values and the few
+# standard types they are built from
+ALLOWED = {
+    "builtins": {"int", "float", "str", "bool", "type", "NoneType", "list", "dict",
+                 "tuple", "set", "frozenset"},
+    "collections": {"OrderedDict"},
+    "array": {"array", "_array_reconstructor"},
+    "tokens": {"Token"},
+    "tokenType": {"TokenType"},
+    "stmt": {"Expression", "Var", "Block", "If", "While", "Break", "Print",
+             "Function", "Return", "Metadata"},
+    "expr": {"Assign", "BinaryExpr", "ConditionalExpr", "GroupingExpr", "Call",
+             "LiteralExpr", "LogicalExpr", "UnaryExpr", "VariableExpr", "ArrayExpr",
+             "IndexExpr", "SetIndexExpr", "GetExpr", "HoistedExpr", "CommonExpr",
+             "SharedExpr"},
+    "programImage": {"ImageFunction"},
+    "environment": {"Environment"},
+    "haxeFunction": {"HaxeFunction", "MemoizedFunction"},
+    "haxeArray": {"HaxeArray"},
+    "haxeMap": {"HaxeMap", "StringMap", "IntMap"},
+    "interpreter": {"Interpreter.unititialized"},
+}
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def native_names(natives: dict[str, Any], prefix: str = "") -> dict[int, str]:
+    # the natives and the members of native modules, by their dotted names
+    names = {}
+    for name, value in natives.items():
+        names[id(value)] = prefix + name
+        if isinstance(value, NativeModule):
+            names.update(native_names(value.members, f"{prefix}{name}."))
+    return names
+
+
+def allowed(module: str, name: str) -> bool:
+    return name in ALLOWED.get(module, ())
+
+
+class SnapshotPickler(pickle.Pickler):
+    # natives are saved by name and bound to the restoring interpreter's own
+    # natives, so open files and sockets are never pickled through them. An
+    # object of a class the unpickler would refuse, such as a native method,
+    # fails the save rather than leaving a snapshot that can't be loaded
+    def __init__(self, file, natives: dict[str, Any]):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.natives = native_names(natives)
+        # classes already checked; bytes pickle without naming a class
+        self.kinds = {bytes}
+
+    def persistent_id(self, obj: Any):
+        name = self.natives.get(id(obj))
+        if name is None and type(obj) not in self.kinds:
+            self.check(obj)
+        return name
+
+    def check(self, obj: Any):
+        kind = type(obj)
+        if isinstance(obj, type):
+            if not allowed(obj.__module__, obj.__qualname__):
+                raise pickle.PicklingError(f"can't save '{obj.__module__}.{obj.__qualname__}'")
+            return
+        if allowed(kind.__module__, kind.__qualname__):
+            self.kinds.add(kind)
+            return
+        # a value saved as a reference to a global, such as a sentinel
+        reduced = obj.__reduce_ex__(pickle.HIGHEST_PROTOCOL)
+        module = getattr(obj, "__module__", kind.__module__)
+        if not (isinstance(reduced, str) and allowed(module, reduced)):
+            raise pickle.PicklingError(f"can't save a {kind.__name__}")
+
+
+class SnapshotUnpickler(pickle.Unpickler):
+    def __init__(self, file, natives: dict[str, Any]):
+        super().__init__(file)
+        self.natives = natives
+
+    def persistent_load(self, name: str):
+        value = None
+        members = self.natives
+        for part in name.split("."):
+            value = members.get(part) if members is not None else None
+            members = value.members if isinstance(value, NativeModule) else None
+        if value is None:
+            raise pickle.UnpicklingError(f"unknown native '{name}'")
+        return value
+
+    def find_class(self, module: str, name: str):
+        if not allowed(module, name):
+            raise pickle.UnpicklingError(f"'{module}.{name}' is not allowed in a snapshot")
+        return super().find_class(module, name)
+
+
+@contextmanager
+def gc_paused():
+    # a snapshot is hundreds of thousands of small objects, and the cyclic
+    # collector would otherwise walk them all again and again while they
+    # are created
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+@contextmanager
+def bounded_recursion(limit: int = 10_000):
+    # the pickler recurses on the C stack, which until Python 3.12 counts
+    # against the same limit as Python frames; under the interpreter's deep
+    # limit a deeply nested value would overflow the stack instead of
+    # raising RecursionError
+    previous = sys.getrecursionlimit()
+    sys.setrecursionlimit(min(previous, limit))
+    try:
+        yield
+    finally:
+        sys.setrecursionlimit(previous)
+
+
+def save_snapshot(interpreter: Interpreter, path: str):
+    '''
+    Saves the interpreter's globals, the functions they hold with their
+    closures and ASTs, and the memo caches. Values that only make sense
+    in this process, such as open files, threads or sockets, can't be
+    saved. The snapshot is written next to path and moved over it once
+    complete, so a failed save leaves any earlier snapshot as it was.
+    '''
+    state = {
+        "globals": {name: value for name, value in interpreter.globals.items()
+                    if interpreter.natives.get(name) is not value},
+        "memoized": interpreter.memoized,
+    }
+    directory, name = os.path.split(os.path.abspath(path))
+    descriptor, temporary = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=directory)
+    try:
+        with open(descriptor, 'wb') as file, gc_paused(), bounded_recursion():
+            SnapshotPickler(file, interpreter.natives).dump(state)
+        os.replace(temporary, path)
+    except (pickle.PicklingError, TypeError, AttributeError, RecursionError) as error:
+        os.unlink(temporary)
+        raise SnapshotError(f"Can't save snapshot: {error}")
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def load_snapshot(interpreter: Interpreter, path: str):
+    # the saved globals are added to the interpreter's, replacing any that
+    # share a name
+    try:
+        with open(path, 'rb') as file, gc_paused():
+            state = SnapshotUnpickler(file, interpreter.natives).load()
+    except (pickle.UnpicklingError, EOFError, ValueError, TypeError,
+            AttributeError, KeyError) as error:
+        raise SnapshotError(f"Can't load snapshot: {error}")
+    interpreter.globals.update(state["globals"])
+    interpreter.memoized.update(state["memoized"])
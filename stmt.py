@@ -4,7 +4,9 @@ from tokens import Token
 
 
 class Stmt:
-    pass
+    # the first token of the statement, set by the parser; statements it
+    # builds itself, such as the parts of a desugared for loop, have none
+    start = None
 
 
 class Expression(Stmt):
@@ -19,6 +21,7 @@ class Var(Stmt):
     def __init__(self, name: str, initializer: Expr):
         self.name = name
         self.initializer = initializer
+        self.slot = None
 
     def accept(self, visitor):
         return visitor.visit_var_stmt(self)
@@ -27,6 +30,7 @@ class Var(Stmt):
 class Block(Stmt):
     def __init__(self, statements: list):
         self.statements = statements
+        self.slot_count = 0
 
     def accept(self, visitor):
         return visitor.visit_block_stmt(self)
@@ -43,6 +47,9 @@ class If(Stmt):
 
 
 class While(Stmt):
+    # how many invariant expressions the optimizer hoisted from the loop
+    hoisted = 0
+
     def __init__(self, condition: Expr, body: Stmt):
         self.condition = condition
         self.body = body
@@ -65,3 +72,51 @@ class Print(Stmt):
 
     def accept(self, visitor):
         return visitor.visit_print_stmt(self)
+
+
+class Package(Stmt):
+    def __init__(self, keyword: Token, path: str):
+        self.keyword = keyword
+        self.path = path
+
+    def accept(self, visitor):
+        return visitor.visit_package_stmt(self)
+
+
+class Import(Stmt):
+    def __init__(self, keyword: Token, path: str):
+        self.keyword = keyword
+        self.path = path
+
+    def accept(self, visitor):
+        return visitor.visit_import_stmt(self)
+
+
+class Metadata:
+    def __init__(self, name: Token, args: list[Expr]):
+        self.name = name
+        self.args = args
+
+
+class Function(Stmt):
+    def __init__(self, name: Token, params: list[Token], body: list[Stmt],
+                 metadata: list[Metadata] = None):
+        self.name = name
+        self.params = params
+        self.body = body
+        self.metadata = metadata or []
+        self.slot = None
+        self.slot_count = 0
+        self.memo_size = None
+
+    def accept(self, visitor):
+        return visitor.visit_function_stmt(self)
+
+
+class Return(Stmt):
+    def __init__(self, keyword: Token, value: Expr):
+        self.keyword = keyword
+        self.value = value
+
+    def accept(self, visitor):
+        return visitor.visit_return_stmt(self)
@@ -0,0 +1,35 @@
+import io
+import os
+import sys
+import pytest
+
+# the interpreter's modules live at the top of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from errorHandler import ErrorHandler
+from interpreter import Interpreter, deepen_stack
+from program import Program, RunResult
+from budget import Budget
+from optimizer import Optimizer
+
+# the tests run scripts the way the command line does
+deepen_stack()
+
+
+@pytest.fixture
+def run():
+    # compiles a script, failing the test on a compile error, and runs it
+    # on an interpreter of its own
+    def run(source: str, bindings: dict = None, budget: Budget = None,
+            optimizer: Optimizer = None) -> RunResult:
+        errors = io.StringIO()
+        program = Program.compile(source, ErrorHandler(errors), optimizer=optimizer)
+        assert program is not None, errors.getvalue()
+        output = io.StringIO()
+        interpreter = Interpreter(ErrorHandler(output), output)
+        interpreter.set_budget(budget)
+        try:
+            return program.execute(interpreter, bindings)
+        finally:
+            interpreter.close_events()
+    return run
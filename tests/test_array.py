@@ -0,0 +1,66 @@
+def typecode(array):
+    # 'q' or 'd' for packed storage, None for a plain list
+    return getattr(array.items, "typecode", None)
+
+
+def test_pushes_widen_the_storage(run):
+    # number literals are floats, while lengths are whole numbers
+    result = run("""
+var a = [];
+a.push(a.length); a.push(a.length);
+var b = [];
+b.push(b.length); b.push(0.5);
+var c = [];
+c.push(c.length); c.push("one");
+var d = [1.5];
+d.push(d.length);
+var e = [0.5];
+e.push(nil);
+print a; print b; print c; print d; print e;
+""")
+    assert (result.output, result.had_runtime_error) == \
+        ("[0,1]\n[0,0.5]\n[0,one]\n[1.5,1]\n[0.5,nil]\n", False)
+    arrays = result.globals
+    assert [typecode(arrays[name]) for name in "abcde"] == ['q', 'd', None, 'd', None]
+
+
+def test_setting_past_the_end_pads_with_nil(run):
+    result = run("var a = [1];\na[3] = 4;\nprint a;\nprint a.length;")
+    assert (result.output, result.had_runtime_error) == ("[1,nil,nil,4]\n4\n", False)
+    assert typecode(result.globals["a"]) is None
+
+
+def test_bulk_natives_keep_packed_storage(run):
+    result = run("""
+var numbers = [5, 3, 8, 1];
+var lengths = [];
+lengths.push(lengths.length);
+var words = ["a"];
+function big(x) { return x > 2; }
+function order(x, y) { return x - y; }
+var kept = numbers.filter(big);
+var joined = numbers.concat(lengths);
+var mixed = numbers.concat(words);
+var part = numbers.slice(1, 3);
+numbers.sort(order);
+print kept; print joined; print mixed; print part; print numbers;
+print numbers.sum(); print lengths.sum();
+""")
+    assert (result.output, result.had_runtime_error) == (
+        "[5,3,8]\n[5,3,8,1,0]\n[5,3,8,1,a]\n[3,8]\n[1,3,5,8]\n17\n0\n", False)
+    arrays = result.globals
+    assert [typecode(arrays[name]) for name in ("kept", "joined", "mixed", "part", "numbers")] \
+        == ['d', 'd', None, 'd', 'd']
+
+
+def test_map_packs_its_results(run):
+    result = run("function name(x) { return \"n\" + x; }\nvar a = [1, 2].map(name);\n"
+                 "function half(x) { return x / 2; }\nvar b = [1, 2].map(half);\nprint a; print b;")
+    assert (result.output, result.had_runtime_error) == ("[n1,n2]\n[0.5,1]\n", False)
+    assert (typecode(result.globals["a"]), typecode(result.globals["b"])) == (None, 'd')
+
+
+def test_sum_needs_numbers(run):
+    result = run('var a = [1, "two"];\nprint a.sum();')
+    assert (result.output, result.had_runtime_error) == \
+        ("[line 2] Runtime error: Can only sum an array of numbers.\n", True)
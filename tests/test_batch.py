@@ -0,0 +1,27 @@
+import batch
+
+
+def test_internal_error_fails_only_its_script(tmp_path, monkeypatch):
+    script = tmp_path / "main.hx"
+    script.write_text("print 1;\n")
+
+    def broken(interpreter, bindings=None):
+        raise KeyError("slot")
+
+    monkeypatch.setattr(batch.Program, "execute", broken)
+    result = batch.run_script(str(script))
+    assert (result.status, result.output) == (1, "Internal error: KeyError: 'slot'\n")
+
+
+def test_each_script_fails_on_its_own(tmp_path):
+    (tmp_path / "good.hx").write_text("print 1 + 1;\n")
+    (tmp_path / "binary.hx").write_bytes(b"print \xff\xfe;\n")
+    (tmp_path / "negated.hx").write_text('print -"x";\n')
+    scripts = batch.expand_scripts([str(tmp_path)])
+    results = {result.path.rsplit("/", 1)[1]: result
+               for result in batch.run_batch(scripts, jobs=2)}
+    assert (results["good.hx"].status, results["good.hx"].output) == (0, "2\n")
+    assert results["binary.hx"].status == 1
+    assert "can't decode byte 0xff" in results["binary.hx"].output
+    assert (results["negated.hx"].status, results["negated.hx"].output) == \
+        (1, "[line 1] Runtime error: Operand must be a number.\n")
@@ -0,0 +1,55 @@
+import time
+from budget import Budget
+
+TICK = "function tick() {}\nhaxe.Timer.repeat(tick, 1);\n"
+
+
+def test_timer_callbacks_count_as_steps(run):
+    result = run(TICK, budget=Budget(max_steps=100, max_time=5))
+    assert result.had_runtime_error
+    assert "Execution budget of 100 steps exceeded." in result.output
+
+
+def test_timers_stop_at_time_limit(run):
+    start = time.perf_counter()
+    result = run("function tick() {}\nhaxe.Timer.delay(tick, 60000);\n",
+                 budget=Budget(max_time=0.2))
+    assert "Execution time limit of 0.2 seconds exceeded." in result.output
+    assert time.perf_counter() - start < 2
+
+
+def test_lock_wait_stops_at_time_limit(run):
+    start = time.perf_counter()
+    result = run("var lock = sys.thread.Lock();\nlock.wait();\n", budget=Budget(max_time=0.2))
+    assert "[line 2] Runtime error: Execution time limit" in result.output
+    assert time.perf_counter() - start < 2
+
+
+def test_try_wait_within_time_limit_times_out(run):
+    result = run("var lock = sys.thread.Lock();\nprint lock.tryWait(0.05);\n",
+                 budget=Budget(max_time=5))
+    assert (result.output, result.had_runtime_error) == ("False\n", False)
+
+
+def test_blocking_pop_in_thread_stops_at_time_limit(run):
+    start = time.perf_counter()
+    result = run("""
+var queue = sys.thread.Deque();
+function worker() { queue.pop(true); }
+sys.thread.Thread.create(worker).join();
+""", budget=Budget(max_time=0.2))
+    assert result.had_runtime_error
+    assert "Execution time limit of 0.2 seconds exceeded." in result.output
+    assert time.perf_counter() - start < 2
+
+
+def test_array_callbacks_count_as_steps(run):
+    result = run("var a = [];\nwhile (a.length < 1000) a.push(0);\n"
+                 "function id(x) { return x; }\na.map(id);\n", budget=Budget(max_steps=2500))
+    assert "[line 4] Runtime error: Execution budget of 2500 steps exceeded." in result.output
+
+
+def test_array_callbacks_count_toward_call_depth(run):
+    result = run("function nest(x) { if (x == 0) return 0; return [x - 1].map(nest)[0]; }\n"
+                 "print nest(40);\n", budget=Budget(max_depth=50))
+    assert "Call depth limit of 50 exceeded." in result.output
@@ -0,0 +1,90 @@
+def test_echo_server(run):
+    result = run("""
+var server;
+function serve(client) {
+    function echo(line) {
+        if (line == nil) { client.close(); server.close(); return; }
+        client.write("echo " + line + "\n");
+    }
+    client.readLine(echo);
+    client.readLine(echo);
+    client.readLine(echo);
+}
+server = sys.net.Socket.listen("127.0.0.1", 0, serve);
+function talk(connection) {
+    function heard(line) { print line; }
+    function last(line) {
+        print line;
+        connection.close();
+    }
+    connection.write("hello\nworld\n");
+    connection.readLine(heard);
+    connection.readLine(last);
+}
+sys.net.Socket.connect("127.0.0.1", server.port, talk);
+""")
+    assert (result.output, result.had_runtime_error) == ("echo hello\necho world\n", False)
+
+
+def test_refused_connection_is_a_runtime_error(run):
+    result = run("""
+function serve(client) {}
+var server = sys.net.Socket.listen("127.0.0.1", 0, serve);
+var port = server.port;
+server.close();
+function never(connection) { print "connected"; }
+sys.net.Socket.connect("127.0.0.1", port, never);
+""")
+    assert result.had_runtime_error
+    assert "Runtime error: Can't connect to 127.0.0.1:" in result.output
+
+
+def test_timers_fire_in_order_of_deadline(run):
+    result = run("""
+function late() { print "late"; }
+function early() { print "early"; }
+haxe.Timer.delay(late, 30);
+haxe.Timer.delay(early, 10);
+print "first";
+""")
+    assert (result.output, result.had_runtime_error) == ("first\nearly\nlate\n", False)
+
+
+def test_repeat_until_stopped(run):
+    result = run("""
+var ticks = 0;
+var timer;
+function tick() {
+    ticks = ticks + 1;
+    if (ticks == 3) timer.stop();
+}
+timer = haxe.Timer.repeat(tick, 5);
+function cancelled() { print "cancelled fired"; }
+var other = haxe.Timer.delay(cancelled, 5);
+other.stop();
+function report() { print ticks; }
+haxe.Timer.delay(report, 100);
+""")
+    assert (result.output, result.had_runtime_error) == ("3\n", False)
+
+
+def test_callback_error_ends_the_run(run):
+    result = run("""
+function fail() { print 1 / 0; }
+haxe.Timer.delay(fail, 1);
+function after() { print "after"; }
+haxe.Timer.delay(after, 50);
+""")
+    assert (result.output, result.had_runtime_error) == \
+        ("[line 2] Runtime error: Division by zero.\n", True)
+
+
+def test_get_content_async(run, tmp_path):
+    path = tmp_path / "content.txt"
+    path.write_text("from disk")
+    result = run("""
+function done(content) { print content; }
+sys.io.File.getContentAsync(path, done);
+print "reading";
+""", {"path": str(path)})
+    assert (result.output, result.had_runtime_error) == ("reading\nfrom disk\n", False)
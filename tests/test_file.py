@@ -0,0 +1,58 @@
+import pytest
+import haxeFile
+
+LINES = ["first", "", "third line", "4", "the last one"]
+
+
+@pytest.fixture
+def path(tmp_path, monkeypatch):
+    # chunks shorter than a line, so lines are split across reads
+    monkeypatch.setattr(haxeFile, "CHUNK_SIZE", 4)
+    path = tmp_path / "lines.txt"
+    path.write_text("\n".join(LINES))
+    return str(path)
+
+
+def test_read_line_across_chunks(run, path):
+    result = run("""
+var input = sys.io.File.read(path);
+var line = input.readLine();
+while (line != nil) { print "<" + line + ">"; line = input.readLine(); }
+print input.eof();
+""", {"path": path})
+    assert (result.output, result.had_runtime_error) == \
+        ("".join(f"<{line}>\n" for line in LINES) + "True\n", False)
+
+
+def test_read_lines_in_batches(run, path):
+    result = run("""
+var input = sys.io.File.read(path);
+print input.readLines(2).length;
+print input.readLine();
+var rest = input.readLines(10);
+print rest.length;
+print rest[1];
+print input.readLines(3).length;
+""", {"path": path})
+    assert (result.output, result.had_runtime_error) == \
+        ("2\nthird line\n2\nthe last one\n0\n", False)
+
+
+def test_read_all_after_lines(run, path):
+    result = run("""
+var input = sys.io.File.read(path);
+input.readLine();
+print input.hasNext();
+print input.readAll();
+""", {"path": path})
+    assert (result.output, result.had_runtime_error) == \
+        ("True\n" + "\n".join(LINES[1:]) + "\n", False)
+
+
+def test_trailing_newline_ends_the_last_line(run, tmp_path, monkeypatch):
+    monkeypatch.setattr(haxeFile, "CHUNK_SIZE", 3)
+    path = tmp_path / "ended.txt"
+    path.write_text("ab\ncd\n")
+    result = run("var input = sys.io.File.read(path);\nvar lines = input.readLines(5);\n"
+                 "print lines.length;\nprint lines;", {"path": str(path)})
+    assert (result.output, result.had_runtime_error) == ("2\n[ab,cd]\n", False)
@@ -0,0 +1,47 @@
+import os
+import sys
+import subprocess
+
+SUM = "function f(n) { if (n == 0) return 0; return n + f(n - 1); }\n"
+
+
+def test_deep_recursion(run):
+    result = run(SUM + "print f(1000);")
+    assert (result.output, result.had_runtime_error) == ("500500\n", False)
+
+
+def test_deep_recursion_in_thread(run):
+    result = run(SUM + "function worker() { print f(1000); }\n"
+                       "sys.thread.Thread.create(worker).join();")
+    assert (result.output, result.had_runtime_error) == ("500500\n", False)
+
+
+def test_unbounded_recursion_overflows(run):
+    result = run("function g(n) { return g(n + 1); }\ng(0);")
+    assert result.had_runtime_error
+    assert "Stack overflow." in result.output
+
+
+def run_cli(tmp_path, source: str):
+    # in a process of its own, as a crash would take the test run down
+    script = tmp_path / "script.hx"
+    script.write_text(source)
+    haxepy = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          "haxepy.py")
+    return subprocess.run([sys.executable, haxepy, str(script)], capture_output=True,
+                          text=True, timeout=300)
+
+
+def test_printing_deeply_nested_array_overflows(tmp_path):
+    completed = run_cli(tmp_path, "var a = []; var i = 0;\n"
+                                  "while (i < 300000) { a = [a]; i = i + 1; }\nprint a;\n")
+    assert completed.returncode == 0
+    assert completed.stdout == "[line 3] Runtime error: Stack overflow.\n"
+
+
+def test_recursion_through_sort_overflows(tmp_path):
+    completed = run_cli(tmp_path, "var a = [2, 1];\n"
+                                  "function cmp(x, y) { a.sort(cmp); return x - y; }\n"
+                                  "a.sort(cmp);\n")
+    assert completed.returncode == 0
+    assert "Runtime error: Stack overflow." in completed.stdout
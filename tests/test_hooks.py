@@ -0,0 +1,51 @@
+import io
+from errorHandler import ErrorHandler
+from hookEvent import HookEvent
+from interpreter import Interpreter, TracingInterpreter
+from program import Program
+
+
+def traced(source: str):
+    output = io.StringIO()
+    interpreter = Interpreter(ErrorHandler(output), output)
+    events = []
+
+    def hook(event, token, value):
+        events.append((event, token.line, value))
+
+    interpreter.add_hook(hook)
+    assert type(interpreter) is TracingInterpreter
+    Program.compile(source, ErrorHandler()).execute(interpreter)
+    interpreter.remove_hook(hook)
+    assert type(interpreter) is Interpreter
+    return events
+
+
+def test_statements_and_writes():
+    events = traced("var x = 1;\nx = x + 2;\nprint x;")
+    assert [(event, line) for event, line, _ in events if event is HookEvent.STATEMENT] == \
+        [(HookEvent.STATEMENT, 1), (HookEvent.STATEMENT, 2), (HookEvent.STATEMENT, 3)]
+    assert [(line, value) for event, line, value in events
+            if event is HookEvent.VARIABLE_WRITE] == [(1, 1), (2, 3)]
+    assert (HookEvent.EXPRESSION, 2, 3) in events
+
+
+def test_runtime_error_is_reported_once():
+    events = traced("function f() { return 1 / 0; }\nfunction g() { return f(); }\nprint g();")
+    # raised on line 1, and not reported again by the calls it unwinds
+    assert [line for event, line, _ in events if event is HookEvent.RUNTIME_ERROR] == [1]
+
+
+def test_removed_hook_sees_nothing_more():
+    output = io.StringIO()
+    interpreter = Interpreter(ErrorHandler(output), output)
+    program = Program.compile("var x = 1;", ErrorHandler())
+    events = []
+
+    def hook(event, token, value):
+        events.append(event)
+
+    interpreter.add_hook(hook)
+    interpreter.remove_hook(hook)
+    program.execute(interpreter)
+    assert events == []
@@ -0,0 +1,21 @@
+from errorHandler import ErrorHandler
+from program import Program
+from programImage import write_image, read_image
+
+SOURCE = """
+var total = 0;
+var i = 0;
+while (i < 10) {
+    total = total + (i > 4 ? i : 0 - i);
+    i = i + 1;
+}
+function twice(n) { return n * 2; }
+print twice(total);
+"""
+
+
+def test_image_runs_like_its_source(tmp_path):
+    program = Program.compile(SOURCE, ErrorHandler())
+    path = str(tmp_path / "program.image")
+    write_image(program, path)
+    assert read_image(path).run().output == program.run().output == "50\n"
@@ -0,0 +1,45 @@
+import io
+import json
+from errorHandler import ErrorHandler
+from interpreter import Interpreter
+from memStats import MemoryStats
+from server import EvaluationServer
+
+MAIN = "import Util;\nprint twice(21);\n"
+
+
+def write_module(tmp_path, factor: int):
+    (tmp_path / "Util.hx").write_text(f"function twice(n) {{ return n * {factor}; }}\n")
+
+
+def test_server_links_imports_and_relinks_changed_modules(tmp_path):
+    write_module(tmp_path, 2)
+    script = tmp_path / "main.hx"
+    script.write_text(MAIN)
+    server = EvaluationServer(str(tmp_path / "socket"), 1)
+    try:
+        request = json.dumps({"path": str(script)}).encode()
+        assert server.evaluate(request) == {"output": "42\n", "status": 0}
+        write_module(tmp_path, 3)
+        assert server.evaluate(request) == {"output": "63\n", "status": 0}
+        assert len(server.programs) == 1
+    finally:
+        server.executor.shutdown()
+
+
+def test_server_finds_imports_of_a_source_in_the_class_path(tmp_path):
+    write_module(tmp_path, 2)
+    server = EvaluationServer(str(tmp_path / "socket"), 1, class_path=str(tmp_path))
+    try:
+        request = json.dumps({"source": MAIN}).encode()
+        assert server.evaluate(request) == {"output": "42\n", "status": 0}
+    finally:
+        server.executor.shutdown()
+
+
+def test_mem_stats_links_imports(tmp_path):
+    write_module(tmp_path, 2)
+    output = io.StringIO()
+    interpreter = Interpreter(ErrorHandler(output), output)
+    MemoryStats().run(MAIN, interpreter, str(tmp_path / "main.hx"))
+    assert output.getvalue() == "42\n"
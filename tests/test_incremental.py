@@ -0,0 +1,43 @@
+import random
+from incremental import Document
+
+
+def edited(source: str, old: str, new: str) -> Document:
+    document = Document(source)
+    start = document.source.index(old)
+    document.edit(start, start + len(old), new)
+    return document
+
+
+def test_conditional_closed_after_last_token():
+    document = edited('x = a ? 1 : 2;\n:le (a < 3) {...}\n', ': 2', ' 2')
+    assert document.diagnostics == Document(document.source).diagnostics
+
+
+def test_conditional_closed_in_gap():
+    document = edited('if (a) print 1; else print 2;\nx = a ? 1 : 2;\n', '? 1', '; ')
+    document.edit(0, 0, '?\n')
+    assert document.diagnostics == Document(document.source).diagnostics
+
+
+def test_edit_before_first_declaration():
+    document = edited(':le (a < 3) {...}\nwhile (a < 3) {print a;}\n', ':', '')
+    assert document.diagnostics == Document(document.source).diagnostics
+
+
+def test_random_edits_match_full_parse():
+    pieces = ['x = a ? 1 : 2;\n', 'print a;\n', 'while (a < 3) {print a;}\n',
+              'x = a ? 1 (2;\n', ':le (a < 3) {...}\n', 'if (a) print 1; else print 2;\n',
+              'var s = "str";\n', '/* c */\n']
+    fragments = ['?', ':', '(', ')', ';', '{', '}', '"', '/*', ' ', '\n', 'a', 'else']
+    for seed in range(500):
+        generator = random.Random(seed)
+        document = Document(''.join(generator.choice(pieces) for _ in range(4)))
+        for _ in range(3):
+            start = generator.randrange(len(document.source) + 1)
+            end = min(len(document.source), start + generator.randrange(4))
+            document.edit(start, end, ''.join(generator.choice(fragments)
+                                              for _ in range(generator.randrange(3))))
+            full = Document(document.source)
+            assert document.diagnostics == full.diagnostics, (seed, document.source)
+            assert len(document.statements) == len(full.statements), (seed, document.source)
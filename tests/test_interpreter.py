@@ -0,0 +1,40 @@
+import gc
+import io
+import weakref
+from errorHandler import ErrorHandler
+from program import Program
+from haxepy import haxe
+
+
+def test_bools_never_equal_numbers(run):
+    assert run("print 1 == true;\nprint 0 == false;\nprint 1 != true;").output == \
+        "False\nFalse\nTrue\n"
+
+
+def test_equality_within_a_kind(run):
+    result = run('print true == true;\nprint 2 == 4 / 2;\nprint "a" == "a";\nprint false != true;')
+    assert result.output == "True\nTrue\nTrue\nTrue\n"
+
+
+def test_nil_equals_only_nil(run):
+    result = run('print nil == nil;\nprint nil == 0;\nprint nil == false;\nprint "" != nil;')
+    assert result.output == "True\nFalse\nFalse\nTrue\n"
+
+
+def test_values_of_different_kinds_are_unequal(run):
+    assert run('print "1" == 1;\nprint [1] == 1;').output == "False\nFalse\n"
+
+
+def test_compile_reports_errors_to_the_given_handler():
+    output = io.StringIO()
+    assert haxe().compile("print ;", ErrorHandler(output)) is None
+    assert "Expect expression." in output.getvalue()
+
+
+def test_runs_of_a_program_keep_no_callee():
+    program = Program.compile("function f() { return 1; }\nf();", ErrorHandler())
+    result = program.run()
+    function = weakref.ref(result.globals["f"])
+    del result
+    gc.collect()
+    assert function() is None
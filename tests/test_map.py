@@ -0,0 +1,58 @@
+def test_bools_and_numbers_are_different_keys(run):
+    result = run("""
+var m = Map();
+m.set(true, 1);
+m.set(1, 2);
+m[false] = 3;
+m[0] = 4;
+print m.get(true);
+print m[1];
+print m[false];
+print m.get(0);
+print m.exists(true);
+m.remove(1);
+print m.exists(true);
+print m.keys();
+print m;
+""")
+    assert (result.output, result.had_runtime_error) == \
+        ("1\n2\n3\n4\nTrue\nTrue\n[True,False,0]\n{True => 1, False => 3, 0 => 4}\n", False)
+
+
+def test_whole_floats_and_ints_are_the_same_key(run):
+    result = run("""
+var m = Map();
+m.set(3, "int");
+print m.get(6 / 2);
+var ints = IntMap();
+ints[2.0] = "two";
+print ints.get(2);
+print ints.keys();
+""")
+    assert (result.output, result.had_runtime_error) == ("int\ntwo\n[2]\n", False)
+
+
+def test_typed_maps_check_keys(run):
+    result = run('var m = StringMap();\nm.set(1, 2);')
+    assert (result.output, result.had_runtime_error) == \
+        ("[line 2] Runtime error: StringMap keys must be strings.\n", True)
+    result = run('var m = IntMap();\nm.set(true, 2);')
+    assert (result.output, result.had_runtime_error) == \
+        ("[line 2] Runtime error: IntMap keys must be whole numbers.\n", True)
+    result = run('var m = IntMap();\nm.set(1, 2);\nprint m.get(true);')
+    assert (result.output, result.had_runtime_error) == ("nil\n", False)
+
+
+def test_set_all_keys_values(run):
+    result = run("""
+var m = Map();
+m.setAll([1, true, "a"], [10, 20, 30]);
+print m[1];
+print m[true];
+print m["a"];
+var copy = m.copy();
+m.clear();
+print copy.keys().length;
+print m.keys().length;
+""")
+    assert (result.output, result.had_runtime_error) == ("10\n20\n30\n3\n0\n", False)
@@ -0,0 +1,48 @@
+import io
+from errorHandler import ErrorHandler
+from interpreter import Interpreter
+from program import Program
+
+
+def test_array_argument_is_not_cached(run):
+    assert run("@:memo function s(x) { return x[0] + x[1]; }\n"
+               "var a = [1, 2];\nprint s(a);\na[0] = 10;\nprint s(a);").output == "3\n12\n"
+
+
+def test_numbers_share_entries_by_value():
+    output = io.StringIO()
+    interpreter = Interpreter(ErrorHandler(output), output)
+    program = Program.compile("@:memo function f(x) { return x; }\nf(3); f(6 / 2); f(1.5 * 2);",
+                              ErrorHandler())
+    program.execute(interpreter)
+    assert interpreter.memo_stats()["f"]["misses"] == 1
+
+
+def test_bools_and_numbers_are_apart(run):
+    source = ("@:memo function f(x) { return x; }\n"
+              "print f(1);\nprint f(true);\nprint f(0);\nprint f(false);")
+    assert run(source).output == "1\nTrue\n0\nFalse\n"
+
+
+def compile_errors(source: str) -> str:
+    output = io.StringIO()
+    Program.compile(source, ErrorHandler(output))
+    return output.getvalue()
+
+
+def test_calling_an_impure_function_is_impure():
+    assert "Can't memoize impure function 'f'." in compile_errors(
+        "var hits = 0;\nfunction bump() { hits = hits + 1; }\n"
+        "@:memo function f(x) { bump(); return x; }")
+    # through a chain of calls, to a function declared after the caller
+    assert "Can't memoize impure function 'f'." in compile_errors(
+        "@:memo function f(x) { return g(x); }\nfunction g(x) { h(); return x; }\n"
+        "function h() { print 1; }")
+    assert "Can't memoize impure function 'f'." in compile_errors(
+        "function outer() {\n var n = 0;\n function count() { n = n + 1; }\n"
+        " @:memo function f(x) { count(); return x; }\n return f;\n}")
+
+
+def test_calling_a_pure_function_is_pure(run):
+    assert run("function double(x) { return x * 2; }\n"
+               "@:memo function f(x) { return double(x) + 1; }\nprint f(3);").output == "7\n"
@@ -0,0 +1,120 @@
+import pytest
+from budget import Budget
+from optimizer import Optimizer
+
+
+@pytest.fixture
+def outcome(run):
+    # the output and failure of a run, with a time limit so that a loop
+    # the optimizer got wrong can't hang the tests
+    def outcome(source: str, optimizer: Optimizer = None):
+        result = run(source, budget=Budget(max_time=5), optimizer=optimizer)
+        return result.output, result.had_runtime_error
+    return outcome
+
+
+@pytest.fixture
+def optimized(outcome):
+    def optimized(source: str):
+        optimizer = Optimizer()
+        return outcome(source, optimizer), optimizer
+    return optimized
+
+
+def test_global_set_by_thread_is_read_each_iteration(optimized):
+    source = """
+var done = false;
+var spins = 0;
+function setter() { done = true; }
+sys.thread.Thread.create(setter);
+while (!done) { spins = spins + 1; }
+print done;
+"""
+    (output, failed), optimizer = optimized(source)
+    assert (output, failed) == ("True\n", False)
+    assert optimizer.loops == []
+
+
+def test_local_set_by_thread_is_read_each_iteration(optimized):
+    source = """
+function f() {
+    var done = false;
+    var spins = 0;
+    function g() {
+        var i = 0;
+        while (i < 1000) { i = i + 1; }
+        done = true;
+    }
+    sys.thread.Thread.create(g);
+    while (!done) { spins = spins + 1; }
+    return done;
+}
+print f();
+"""
+    (output, failed), optimizer = optimized(source)
+    assert (output, failed) == ("True\n", False)
+    assert optimizer.loops == []
+
+
+def test_same_output_as_unoptimized(outcome, optimized):
+    source = """
+function f(a, b) {
+    var total = 0;
+    var i = 0;
+    while (i < 10) {
+        total = total + (a * b + 1) + (a * b + 1) * i;
+        i = i + 1;
+    }
+    return total;
+}
+print f(3, 4);
+print f(0.5, 2);
+"""
+    (output, failed), optimizer = optimized(source)
+    assert (output, failed) == outcome(source) == ("715\n110\n", False)
+    assert optimizer.loops[0][1] == ["(a * b + 1)"]
+
+
+def test_hoisted_error_raised_where_it_was(outcome, optimized):
+    source = """
+function f(zero) {
+    var i = 0;
+    while (i < 3) {
+        print i;
+        if (i == 2) print 1 / zero + 1;
+        i = i + 1;
+    }
+}
+f(0);
+"""
+    (output, failed), optimizer = optimized(source)
+    assert (output, failed) == outcome(source)
+    assert output == "0\n1\n2\n[line 6] Runtime error: Division by zero.\n"
+    assert optimizer.loops
+
+
+def test_zero_trip_loop_evaluates_nothing(outcome, optimized):
+    source = """
+function f(zero) {
+    var i = 0;
+    while (i < 0) {
+        print 1 / zero + 1;
+        i = i + 1;
+    }
+    print "done";
+}
+f(0);
+"""
+    (output, failed), optimizer = optimized(source)
+    assert (output, failed) == outcome(source) == ("done\n", False)
+    assert optimizer.loops
+
+
+def test_shared_subexpressions_computed_once_per_statement(outcome, optimized):
+    source = """
+function f(a, b) { return (a + b) * (a + b) - (a + b); }
+print f(2, 3);
+"""
+    (output, failed), optimizer = optimized(source)
+    assert (output, failed) == outcome(source) == ("20\n", False)
+    assert optimizer.statements[0][1] == ["a + b"]
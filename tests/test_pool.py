@@ -0,0 +1,78 @@
+import time
+from errorHandler import ErrorHandler
+from interpreter import Interpreter
+from pool import InterpreterPool
+from program import Program
+
+
+def compile(source: str) -> Program:
+    return Program.compile(source, ErrorHandler())
+
+
+def test_reset_keeps_natives_and_drops_globals():
+    pool = InterpreterPool(1)
+    with pool.checkout() as interpreter:
+        natives = dict(interpreter.natives)
+    pool.run(compile("var leaked = 1;"))
+    with pool.checkout() as interpreter:
+        assert "leaked" not in interpreter.globals
+        for name, value in natives.items():
+            assert interpreter.globals[name] is value
+
+
+def test_reset_drops_hooks():
+    pool = InterpreterPool(1)
+    with pool.checkout() as interpreter:
+        interpreter.add_hook(lambda event, token, value: None)
+    with pool.checkout() as interpreter:
+        assert interpreter.hooks == []
+        assert type(interpreter) is Interpreter
+    assert pool.run(compile("print 1 + 2;")).output == "3\n"
+
+
+def test_no_system_natives_by_default():
+    result = InterpreterPool(1).run(compile('sys.io.File.saveContent("/tmp/x", "y");'))
+    assert result.had_runtime_error
+    assert "Undefined variable sys." in result.output
+
+
+def test_system_natives_when_allowed():
+    pool = InterpreterPool(1, system=True)
+    result = pool.run(compile("print sys.thread.Mutex();"))
+    assert not result.had_runtime_error
+
+
+def test_thread_outliving_its_run_is_cut_off():
+    pool = InterpreterPool(1, system=True)
+    leaky = compile('var lock = sys.thread.Lock();\n'
+                    'function t() { lock.tryWait(0.2); print "from A"; print 1 / 0; }\n'
+                    'sys.thread.Thread.create(t);\nprint "A";')
+    first = pool.run(leaky)
+    assert (first.output, first.had_runtime_error) == ("A\n", False)
+    time.sleep(0.4)
+    second = pool.run(compile('print "B";'))
+    assert (second.output, second.had_runtime_error) == ("B\n", False)
+
+
+def test_run_ends_with_its_statements():
+    pool = InterpreterPool(1, system=True)
+    consumer = compile('var queue = sys.thread.Deque();\n'
+                       'function consume() { while (true) { print queue.pop(true); } }\n'
+                       'sys.thread.Thread.create(consume);\n'
+                       'queue.add(1);\nprint "done";')
+    start = time.perf_counter()
+    result = pool.run(consumer)
+    assert time.perf_counter() - start < 1
+    assert result.output.endswith("done\n")
+
+
+def test_thread_of_failed_run_is_cut_off():
+    pool = InterpreterPool(1, system=True)
+    failing = compile('var lock = sys.thread.Lock();\n'
+                      'function t() { lock.tryWait(0.2); print "late"; }\n'
+                      'sys.thread.Thread.create(t);\nprint 1 / 0;')
+    assert pool.run(failing).had_runtime_error
+    with pool.checkout() as interpreter:
+        time.sleep(0.4)
+        assert interpreter.output.getvalue() == ""
+        assert not interpreter.error_handler.had_runtime_error
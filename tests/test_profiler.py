@@ -0,0 +1,41 @@
+import sys
+from errorHandler import ErrorHandler
+from program import Program
+from profiler import Profiler
+
+FIB = """
+function fib(n) {
+    if (n < 2) return n;
+    return fib(n - 1) + fib(n - 2);
+}
+print fib(18);
+"""
+
+
+def test_samples_are_folded_by_function(tmp_path):
+    program = Program.compile(FIB, ErrorHandler())
+    profiler = Profiler(0.0005)
+    profiler.start()
+    try:
+        while profiler.samples < 20:
+            program.run()
+    finally:
+        profiler.stop()
+    path = tmp_path / "fib.folded"
+    profiler.write(str(path))
+    lines = path.read_text().splitlines()
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == profiler.samples
+    assert all(line.startswith("main;") or line.startswith("main ") for line in lines)
+    assert any("function fib" in line for line in lines)
+    # labelled stacks of the last sample are dropped once stopped
+    assert profiler.frames == [None] and profiler.positions == {}
+
+
+def test_reentrant_sample_is_dropped():
+    profiler = Profiler()
+    profiler.sampling = True
+    profiler.sample(None, sys._getframe())
+    assert profiler.samples == 0
+    profiler.sampling = False
+    profiler.sample(None, sys._getframe())
+    assert profiler.samples == 1 and profiler.stacks == {("main",): 1}
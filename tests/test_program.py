@@ -0,0 +1,83 @@
+import io
+import threading
+import pytest
+import parallelParse
+import program as program_module
+from errorHandler import ErrorHandler
+from program import Program
+from tokens import Token
+
+# small chunks, so a short source is parsed in parallel
+CHUNK = 2048
+
+
+def dump(node):
+    # the whole tree as plain values, to compare two parses
+    if isinstance(node, (list, tuple)):
+        return [dump(item) for item in node]
+    if isinstance(node, Token):
+        return (node.type, node.lexeme, node.literal, node.line)
+    if hasattr(node, "__dict__"):
+        return (type(node).__name__, {name: dump(value) for name, value in vars(node).items()})
+    return node
+
+
+DECLARATIONS = """
+function f{0}(n) {{
+    var total = 0;
+    while (n > 0) {{ total = total + n; n = n - 1; }}
+    return total > 10 ? total : "small";
+}}
+/* f{0}; }} not a cut */
+var s{0} = "a ; string";
+if (f{0}(3) == "small") print s{0}; else print f{0}(5);
+"""
+SOURCE = "".join(DECLARATIONS.format(i) for i in range(4 * CHUNK // len(DECLARATIONS)))
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(parallelParse, "MIN_CHUNK", CHUNK)
+    monkeypatch.setattr(program_module, "MIN_CHUNK", CHUNK)
+
+
+def test_parallel_parse_matches_sequential(small_chunks):
+    sequential = Program.compile(SOURCE, ErrorHandler())
+    parallel = Program.compile(SOURCE, ErrorHandler(), jobs=4)
+    assert dump(parallel.statements) == dump(sequential.statements)
+    assert parallel.run().output == sequential.run().output
+
+
+def test_parallel_parse_reports_lines_of_the_whole_source(small_chunks):
+    source = SOURCE + "print ;\n"
+    errors = []
+    for jobs in (1, 4):
+        output = io.StringIO()
+        assert Program.compile(source, ErrorHandler(output), jobs=jobs) is None
+        errors.append(output.getvalue())
+    assert errors[0] == errors[1] and f"[line {source.count(chr(10))}]" in errors[0]
+
+
+def test_concurrent_runs_are_isolated():
+    program = Program.compile("""
+var total = 0;
+var i = 0;
+while (i < 2000) { total = total + step; i = i + 1; }
+@:memo function scaled(x) { return x * step; }
+print total + scaled(1);
+""", ErrorHandler())
+    start = threading.Barrier(8)
+    results = {}
+
+    def run(step: int):
+        start.wait()
+        results[step] = program.run({"step": step})
+
+    threads = [threading.Thread(target=run, args=(step,)) for step in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for step, result in results.items():
+        assert (result.output, result.had_runtime_error) == (f"{2001 * step}\n", False)
+        assert result.globals["total"] == 2000 * step
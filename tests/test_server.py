@@ -0,0 +1,42 @@
+import json
+import socket
+import threading
+import client
+from server import EvaluationServer
+
+
+def test_internal_error_is_a_failed_response(tmp_path, monkeypatch):
+    server = EvaluationServer(str(tmp_path / "socket"), 1)
+    try:
+        def broken(program, bindings=None, timeout=None):
+            raise KeyError("slot")
+
+        monkeypatch.setattr(server.pool, "run", broken)
+        response = server.evaluate(json.dumps({"source": "print 1;"}).encode())
+        assert response == {"output": "Internal error: KeyError: 'slot'\n", "status": 1}
+        assert json.dumps(response)
+    finally:
+        server.executor.shutdown()
+
+
+def test_client_reports_dropped_connection(tmp_path, capsys):
+    path = str(tmp_path / "socket")
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen()
+
+    def drop():
+        connection, _ = listener.accept()
+        connection.makefile("rb").readline()
+        connection.close()
+
+    dropper = threading.Thread(target=drop)
+    dropper.start()
+    try:
+        script = tmp_path / "main.hx"
+        script.write_text("print 1;\n")
+        assert client.main(path, [str(script)]) == 1
+    finally:
+        dropper.join()
+        listener.close()
+    assert "the server closed the connection" in capsys.readouterr().err
@@ -0,0 +1,75 @@
+import io
+import os
+import pytest
+from errorHandler import ErrorHandler
+from interpreter import Interpreter
+from program import Program
+from snapshot import SnapshotError, save_snapshot, load_snapshot
+
+
+def interpreter_with(source: str) -> Interpreter:
+    output = io.StringIO()
+    interpreter = Interpreter(ErrorHandler(output), output)
+    Program.compile(source, ErrorHandler()).execute(interpreter)
+    return interpreter
+
+
+def test_failed_save_keeps_earlier_snapshot(tmp_path):
+    path = str(tmp_path / "session.snapshot")
+    save_snapshot(interpreter_with("var kept = 42;"), path)
+    unpicklable = interpreter_with("var kept = 1;")
+    unpicklable.globals["file"] = open(path, 'rb')
+    try:
+        with pytest.raises(SnapshotError):
+            save_snapshot(unpicklable, path)
+    finally:
+        unpicklable.globals["file"].close()
+    assert os.listdir(tmp_path) == ["session.snapshot"]
+    restored = interpreter_with("")
+    load_snapshot(restored, path)
+    assert restored.globals["kept"] == 42
+
+
+def test_native_module_members_are_saved_by_name(tmp_path):
+    path = str(tmp_path / "session.snapshot")
+    save_snapshot(interpreter_with("var File = sys.io.File;\nvar Timer = haxe.Timer;\n"
+                                   "var Thread = sys.thread;"), path)
+    restored = interpreter_with("")
+    load_snapshot(restored, path)
+    natives = restored.natives
+    assert restored.globals["File"] is natives["sys"].members["io"].members["File"]
+    assert restored.globals["Timer"] is natives["haxe"].members["Timer"]
+    assert restored.globals["Thread"] is natives["sys"].members["thread"]
+
+
+def test_values_that_cant_be_loaded_fail_the_save(tmp_path):
+    path = str(tmp_path / "session.snapshot")
+    for source in ("var a = [1];\nvar push = a.push;", "var m = sys.thread.Mutex();"):
+        with pytest.raises(SnapshotError):
+            save_snapshot(interpreter_with(source), path)
+    assert os.listdir(tmp_path) == []
+
+
+def test_session_round_trips(tmp_path):
+    path = str(tmp_path / "session.snapshot")
+    save_snapshot(interpreter_with("""
+var later;
+var numbers = [1, 2, 3];
+var mixed = [1, "two", nil];
+var m = Map();
+m.set(true, "yes");
+m.set(1, "one");
+var base = 10;
+function add(n) { return n + base; }
+@:memo function square(n) { return n * n; }
+square(4);
+"""), path)
+    restored = interpreter_with("")
+    load_snapshot(restored, path)
+    assert restored.globals["later"] is Interpreter.unititialized
+    result = Program.compile("print numbers; print mixed; print m;\n"
+                             "print add(1); print square(4);",
+                             ErrorHandler()).execute(restored)
+    assert result.output == ("[1,2,3]\n[1,two,nil]\n{True => yes, 1 => one}\n"
+                             "11\n16\n")
+    assert restored.memo_stats()["square"]["hits"] == 1
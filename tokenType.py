@@ -1,7 +1,7 @@
 from enum import Enum
 
 TokenType = Enum("TokenType",
-                "LEFT_PAREN RIGHT_PAREN LEFT_BRACE RIGHT_BRACE\
+                "LEFT_PAREN RIGHT_PAREN LEFT_BRACE RIGHT_BRACE LEFT_BRACKET RIGHT_BRACKET\
                     COMMA DOT MINUS PLUS SEMICOLON SLASH STAR QUESTION\
                         BANG BANG_EQUAL\
                             EQUAL EQUAL_EQUAL\
@@ -10,4 +10,4 @@ TokenType = Enum("TokenType",
                                         IDENTIFIER STRING NUMBER\
                                             AND ELSE FALSE FOR IF NULL OR\
                                                 PRINT RETURN TRUE WHILE BREAK\
-                                                    EOF VAR")
\ No newline at end of file
+                                                    EOF VAR FUNCTION META PACKAGE IMPORT")
\ No newline at end of file
@@ -2,6 +2,9 @@ from tokenType import TokenType
 
 
 class Token():
+    # a large script has millions of tokens, kept small without a __dict__
+    __slots__ = ("type", "lexeme", "literal", "line")
+
     def __init__(self, type: int, lexeme: str, literal: object, line: int):
         self.type = type
         self.lexeme = lexeme
@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
 #from stmt import Stmt, Expression,Print, Var, Block, If, While, Break, Fun, Return, Class
-from stmt import Stmt, Expression, Var, Block, If, While, Break, Print
-from expr import Expr, Assign, BinaryExpr, ConditionalExpr, GroupingExpr, LiteralExpr, LogicalExpr, UnaryExpr, VariableExpr
+from stmt import Stmt, Expression, Var, Block, If, While, Break, Print, Function, Return, Package, Import
+from expr import Expr, Assign, BinaryExpr, ConditionalExpr, GroupingExpr, Call, LiteralExpr, LogicalExpr, UnaryExpr, VariableExpr, ArrayExpr, IndexExpr, SetIndexExpr, GetExpr, HoistedExpr, CommonExpr, SharedExpr
 
 
 class Visitor(ABC):
@@ -37,6 +37,38 @@ class Visitor(ABC):
     def visit_variable_expr(self, expr: VariableExpr):
         pass
 
+    @abstractmethod
+    def visit_call_expr(self, expr: Call):
+        pass
+
+    @abstractmethod
+    def visit_array_expr(self, expr: ArrayExpr):
+        pass
+
+    @abstractmethod
+    def visit_index_expr(self, expr: IndexExpr):
+        pass
+
+    @abstractmethod
+    def visit_set_index_expr(self, expr: SetIndexExpr):
+        pass
+
+    @abstractmethod
+    def visit_get_expr(self, expr: GetExpr):
+        pass
+
+    @abstractmethod
+    def visit_hoisted_expr(self, expr: HoistedExpr):
+        pass
+
+    @abstractmethod
+    def visit_common_expr(self, expr: CommonExpr):
+        pass
+
+    @abstractmethod
+    def visit_shared_expr(self, expr: SharedExpr):
+        pass
+
     @abstractmethod
     def visit_expression_stmt(self, stmt: Expression):
         pass
@@ -64,3 +96,19 @@ class Visitor(ABC):
     @abstractmethod
     def visit_print_stmt(self, stmt: Print):
         pass
+
+    @abstractmethod
+    def visit_function_stmt(self, stmt: Function):
+        pass
+
+    @abstractmethod
+    def visit_return_stmt(self, stmt: Return):
+        pass
+
+    @abstractmethod
+    def visit_package_stmt(self, stmt: Package):
+        pass
+
+    @abstractmethod
+    def visit_import_stmt(self, stmt: Import):
+        pass